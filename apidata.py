@@ -0,0 +1,404 @@
+#!/usr/bin/python3
+"""
+n1mm_view API payloads
+
+The JSON documents behind webserver.py's /api/radio, /api/last_qso,
+/api/summary and /api/new_ops, built from an open database cursor. They live
+here, away from Flask, so headless.py can write the very same documents as
+static snapshot files (api_radio.json, ...) next to the PNGs each cycle.
+
+A copy of IMAGE_DIR pushed to a server without webserver.py (rsync through
+POST_FILE_COMMAND, PUBLISH_TARGETS) gets the snapshots with everything else,
+and index.html reads them whenever the live API can't be reached, so the
+sidebars and last-QSO header stay current for the price of a few kilobytes
+instead of fresh PNGs. A snapshot is only rewritten when its content (not
+just its server_time) changed.
+
+The chart payloads (/api/chart/<name>) carry the data behind the main
+headless charts in one generic shape that webserver.py's /charts page draws
+in the browser as SVG:
+
+    {"chart": name, "title": ..., "type": "bar" | "stacked" | "line" | "progress",
+     "labels": [...], "series": [{"name": ..., "values": [...]}, ...]}
+
+"line" labels are epoch seconds; "progress" has worked/total instead of
+series. BROWSER_CHARTS maps each headless PNG they replace to its payload.
+"""
+
+import datetime
+import json
+import logging
+import os
+import time
+
+from config import Config
+import constants
+import dataaccess
+import imagewriter
+
+__author__ = 'Tom Schaefer NY4I'
+__copyright__ = 'Copyright 2026 Thomas M. Schaefer'
+__license__ = 'Simplified BSD'
+
+config = Config()
+
+# A radio whose last_update is older than this is considered stale: the
+# dashboard greys it out and it no longer participates in duplicate detection.
+# Matches the 60s dim threshold used by headless.py and graphics.draw_radio_info.
+STALE_SECONDS = 60
+
+
+def annotate_radios(radios):
+    """Add band, mode_group, source and a duplicate band/mode flag to each radio.
+
+    Two or more radios sharing the same band + simple mode group (CW/PHONE/DATA)
+    are flagged dup=True so the dashboard can alert -- at Field Day that means two
+    transmitters in one category (a rule violation), and it also surfaces a
+    station-name collision.
+    """
+    now = int(time.time())
+    for r in radios:
+        r['band'] = constants.Bands.freq_to_band(r.get('freq'))
+        r['mode_group'] = constants.Modes.get_simple_mode_name(r.get('mode') or '')
+        r['source'] = r.get('source') or 'radioinfo'
+        # Out of band: outside every ham band, or PHONE below the phone sub-band
+        # edge. Flag it so it's obvious (it's also excluded from dup matching).
+        r['offband'] = constants.Bands.is_out_of_band(r.get('freq'), r['mode_group'])
+    # Only live (non-stale) radios participate in collision detection. Stale rows
+    # are the greyed-out leftovers of stations that have gone away; counting them
+    # would falsely flag a live radio as a DUP of an old, idle one. Use the same
+    # 60s staleness window the renderer uses to grey a row out.
+    def _live(r):
+        return (now - (r.get('last_update') or now)) <= STALE_SECONDS
+    counts = {}
+    for r in radios:
+        if _live(r) and r['band'] and r['mode_group'] not in (None, 'N/A'):
+            counts[(r['band'], r['mode_group'])] = counts.get((r['band'], r['mode_group']), 0) + 1
+    for r in radios:
+        key = (r['band'], r['mode_group'])
+        r['dup'] = bool(_live(r) and r['band'] and r['mode_group'] not in (None, 'N/A')
+                        and counts.get(key, 0) > 1)
+    return radios
+
+
+def radio(cursor):
+    """/api/radio: the radio_info rows, less those hidden by RADIO_HIDE_SECONDS."""
+    radios = dataaccess.get_radio_info(cursor)
+    now = int(time.time())
+    hide = getattr(config, 'RADIO_HIDE_SECONDS', 0)
+    if hide and hide > 0:
+        radios = [r for r in radios if (now - r['last_update']) <= hide]
+    return {
+        'server_time': now,
+        'radios': annotate_radios(radios),
+    }
+
+
+def _band_title(band_id):
+    return constants.Bands.BANDS_TITLE[band_id] if 0 <= band_id < constants.Bands.count() else ''
+
+
+def _simple_mode(mode_id):
+    if 0 <= mode_id < len(constants.Modes.MODE_TO_SIMPLE_MODE):
+        return constants.Modes.SIMPLE_MODES_LIST[constants.Modes.MODE_TO_SIMPLE_MODE[mode_id]]
+    return ''
+
+
+def new_ops(cursor):
+    """
+    /api/new_ops: this event's operators flagged as "new" (name not in
+    PRIOR_DB_FILENAME's operator table), plus a summary count and the
+    prior event's total operator count. Each new-op entry includes the
+    timestamp/band/mode/callsign of their first event QSO.
+    """
+    cur_first = dataaccess.get_operator_first_qsos(cursor)
+    prior_names = dataaccess.get_prior_operators_from_consolidated_db(
+        getattr(config, 'PRIOR_OPERATORS_DB', ''))
+    # "Last event" count for the sidebar is PRIOR_DB_FILENAME only (the chosen
+    # reference event), NOT the union across every imported prior year.
+    last_event_names, _, _ = dataaccess.get_prior_operator_names(config.PRIOR_DB_FILENAME)
+    if not prior_names:
+        prior_names = last_event_names
+    ops = []
+    for r in cur_first:
+        if r['name'].strip().lower() in prior_names:
+            continue
+        ops.append({
+            'name': r['name'],
+            'first_ts': r['first_ts'],
+            'band': _band_title(r.get('band_id') or 0),
+            'mode': _simple_mode(r.get('mode_id') or 0),
+            'worked': r.get('worked') or '',
+        })
+    # prior_new = the prior reference event's *new*-operator count (year-over-year),
+    # so "N new this event" compares against new-vs-new (e.g. 2025 FD had 7 new,
+    # not its 25 total). Pulled from the same YoY computation the chart uses.
+    prior_new = None
+    try:
+        yoy = dataaccess.get_yoy_new_op_counts(
+            getattr(config, 'PRIOR_OPERATORS_DB', ''),
+            event_label_regex=getattr(config, 'YOY_EVENT_REGEX', None))
+        if yoy:
+            prior_new = yoy[-1][3]  # most recent prior event's new_ops
+    except Exception:
+        prior_new = None
+    return {
+        'server_time': int(time.time()),
+        'event_name': config.EVENT_NAME,
+        'prior_event_label': getattr(config, 'PRIOR_EVENT_LABEL', ''),
+        # prior_total = last reference event's TOTAL ops (e.g. 2025 FD = 25);
+        # prior_new   = that event's NEW ops year-over-year (e.g. 7);
+        # all_prior_total = union across every imported prior event (e.g. 75).
+        'prior_total': len(last_event_names) if last_event_names else None,
+        'prior_new': prior_new,
+        'all_prior_total': len(prior_names) if prior_names else None,
+        'total_ops': len(cur_first),
+        'total_new': len(ops),
+        'new_ops': ops,
+    }
+
+
+def last_qso(cursor):
+    """/api/last_qso: the most recent QSO (callsign, band, mode, operator,
+    etc.) so the dashboard header can show it without waiting for headless
+    to re-render."""
+    ts, message = dataaccess.get_last_qso(cursor)
+    cursor.execute(
+        'SELECT timestamp, callsign, exchange, section, operator.name, '
+        '       band_id, mode_id, station.name '
+        'FROM qso_log JOIN operator ON operator.id = operator_id '
+        'JOIN station ON station.id = station_id '
+        'ORDER BY timestamp DESC LIMIT 1;')
+    row = cursor.fetchone()
+    if not row:
+        return {'server_time': int(time.time()), 'last_qso': None}
+    return {
+        'server_time': int(time.time()),
+        'last_qso': {
+            'timestamp': row[0],
+            'callsign': row[1],
+            'exchange': row[2],
+            'section': row[3],
+            'operator': row[4],
+            'band_id': row[5],
+            'band': _band_title(row[5]),
+            'mode_id': row[6],
+            'mode': _simple_mode(row[6]),
+            'station': row[7],
+            'message': message,
+        },
+    }
+
+
+def summary(cursor):
+    """/api/summary: band x mode QSO counts (CW / Phone / Data / Total) plus
+    grand totals -- the 'QSOs Summary' grid, as JSON for the mobile view."""
+    grid = dataaccess.get_qso_band_modes(cursor)  # [band_id][0=n/a,1=cw,2=phone,3=data]
+    bands = []
+    tot = [0, 0, 0]  # cw, phone, data
+    for bid, row in enumerate(grid):
+        if bid == 0:  # 'No Band' / N/A -- skip
+            continue
+        cw, phone, data = row[1], row[2], row[3]
+        if (cw + phone + data) == 0:
+            continue  # omit bands with no QSOs to keep the phone list short
+        bands.append({
+            'band': constants.Bands.BANDS_TITLE[bid],
+            'cw': cw, 'phone': phone, 'data': data,
+            'total': cw + phone + data,
+        })
+        tot[0] += cw; tot[1] += phone; tot[2] += data
+    return {
+        'server_time': int(time.time()),
+        'bands': bands,
+        'totals': {'cw': tot[0], 'phone': tot[1], 'data': tot[2],
+                   'total': tot[0] + tot[1] + tot[2]},
+    }
+
+
+def _chart(name, title, kind, labels, series, **extra):
+    payload = {
+        'server_time': int(time.time()),
+        'chart': name,
+        'title': title,
+        'type': kind,
+        'labels': labels,
+        'series': series,
+    }
+    payload.update(extra)
+    return payload
+
+
+def chart_band_modes(cursor):
+    """QSOs by band, stacked by CW / Phone / Data (qso_bands_graph)."""
+    grid = dataaccess.get_qso_band_modes(cursor)
+    rows = [(constants.Bands.BANDS_TITLE[bid], row) for bid, row in enumerate(grid)
+            if bid and sum(row[1:4])]
+    series = [{'name': mode, 'values': [row[i] for _, row in rows]}
+              for i, mode in ((1, 'CW'), (2, 'Phone'), (3, 'Data'))]
+    return _chart('band_modes', 'QSOs by Band', 'stacked', [band for band, _ in rows], series)
+
+
+def _counts_chart(name, title, pairs):
+    """A bar chart of (label, count) pairs, largest first."""
+    pairs = sorted(pairs, key=lambda p: (-p[1], p[0]))
+    return _chart(name, title, 'bar', [p[0] for p in pairs],
+                  [{'name': 'QSOs', 'values': [p[1] for p in pairs]}])
+
+
+def chart_operators(cursor):
+    """QSOs by operator (qso_operators_graph)."""
+    return _counts_chart('operators', 'QSOs by Operator', dataaccess.get_operators_by_qsos(cursor))
+
+
+def chart_stations(cursor):
+    """QSOs by station (qso_stations_graph)."""
+    return _counts_chart('stations', 'QSOs by Station', dataaccess.get_station_qsos(cursor))
+
+
+def chart_classes(cursor):
+    """QSOs by the worked stations' class (qso_classes_graph)."""
+    return _counts_chart('classes', 'QSOs by Class',
+                         [(cls, count) for count, cls in dataaccess.get_qso_classes(cursor)])
+
+
+def chart_categories(cursor):
+    """QSOs by the worked stations' category letter (qso_categories_graph)."""
+    return _counts_chart('categories', 'QSOs by Category',
+                         [(constants.CATEGORY_NAMES.get(cat, cat), count)
+                          for count, cat in dataaccess.get_qso_categories(cursor)])
+
+
+def chart_rates(cursor):
+    """QSO rate per hour over time, one line per band worked (qso_rates_graph)."""
+    qsos_per_hour, qsos_per_band = dataaccess.get_qsos_per_hour_per_band(cursor)
+    labels = [int(rec[0].replace(tzinfo=datetime.timezone.utc).timestamp()) for rec in qsos_per_hour]
+    series = [{'name': constants.Bands.BANDS_TITLE[bid], 'values': [rec[bid] for rec in qsos_per_hour]}
+              for bid in range(1, constants.Bands.count()) if qsos_per_band[bid]]
+    return _chart('rates', 'QSO Rate Over Time', 'line', labels, series, units='QSOs/hour')
+
+
+def chart_mults(cursor):
+    """Multipliers worked out of those available (mults_progress)."""
+    mults = constants.get_mult_dictionary()
+    if config.MULTS == 'STATES':
+        worked = dataaccess.get_qsos_by_state(cursor)
+    elif config.MULTS == 'ITUZONES':
+        worked = dataaccess.get_qsos_by_ituzone(cursor)
+    elif config.MULTS == 'CQZONES':
+        worked = dataaccess.get_qsos_by_cqzone(cursor)
+    elif config.MULTS == 'GRID':
+        worked = dataaccess.get_qsos_by_grid(cursor)
+    else:
+        worked = dataaccess.get_qsos_by_section(cursor)
+    if mults:
+        count = sum(1 for mult in mults if worked.get(mult, 0) > 0)
+    else:  # GRID: no fixed set to count against
+        count = sum(1 for n in worked.values() if n > 0)
+    return _chart('mults', 'Multiplier Progress', 'progress', [], [],
+                  worked=count, total=len(mults) or None, mult_name=constants.get_mult_name())
+
+
+# Chart payloads in /charts page order.
+CHARTS = {
+    'rates': chart_rates,
+    'operators': chart_operators,
+    'stations': chart_stations,
+    'band_modes': chart_band_modes,
+    'classes': chart_classes,
+    'categories': chart_categories,
+    'mults': chart_mults,
+}
+
+# headless PNG basename -> the chart payload that can stand in for it.
+BROWSER_CHARTS = {
+    'qso_rates_graph': 'rates',
+    'qso_operators_graph': 'operators',
+    'qso_stations_graph': 'stations',
+    'qso_bands_graph': 'band_modes',
+    'qso_classes_graph': 'classes',
+    'qso_categories_graph': 'categories',
+    'mults_progress': 'mults',
+}
+
+
+def enabled_charts():
+    """Names of the chart payloads the current [FEATURES] settings show."""
+    hidden = set()
+    if not config.SHOW_QSOS_BY_STATION:
+        hidden.add('stations')
+    if not config.SHOW_QSOS_BY_CLASS:
+        hidden.add('classes')
+    if not config.SHOW_QSOS_BY_CATEGORY:
+        hidden.add('categories')
+    if not config.SHOW_MULT_PROGRESS:
+        hidden.add('mults')
+    return [name for name in CHARTS if name not in hidden]
+
+
+PAYLOADS = {
+    'radio': radio,
+    'last_qso': last_qso,
+    'summary': summary,
+    'new_ops': new_ops,
+}
+
+
+def snapshot_filename(name):
+    """File a payload is snapshotted to, e.g. api_radio.json for /api/radio."""
+    return 'api_%s.json' % name
+
+
+def encode(payload):
+    return json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+class SnapshotWriter:
+    """Writes the named payloads as static snapshot files in a directory."""
+
+    def __init__(self, directory, names, precompress=False):
+        self.directory = directory
+        self.names = [n for n in names if n in PAYLOADS]
+        self.precompress = precompress  # also write .gz/.br copies
+        self._content = {}  # name -> payload without server_time, as last written
+
+    def write_snapshots(self, cursor):
+        """Rebuild every payload and rewrite the snapshots that changed.
+        Returns the names written."""
+        written = []
+        for name in self.names:
+            try:
+                payload = PAYLOADS[name](cursor)
+            except Exception:
+                logging.exception('could not build the %s snapshot', name)
+                continue
+            content = encode({k: v for k, v in payload.items() if k != 'server_time'})
+            path = os.path.join(self.directory, snapshot_filename(name))
+            if self._content.get(name) == content and os.path.exists(path):
+                continue
+            try:
+                body = encode(payload)
+                imagewriter.write_atomic(path, body)
+                if self.precompress:
+                    imagewriter.write_precompressed(path, body)
+            except OSError:
+                logging.exception('could not write %s', path)
+                continue
+            self._content[name] = content
+            written.append(name)
+        return written
+
+
+def remove_snapshots(directory, keep=()):
+    """Delete snapshots left by an earlier run that are no longer updated
+    (all but those named in keep)."""
+    for name in PAYLOADS:
+        if name in keep:
+            continue
+        try:
+            os.unlink(os.path.join(directory, snapshot_filename(name)))
+            logging.info('removed stale %s from %s', snapshot_filename(name), directory)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logging.exception('could not remove %s from %s', snapshot_filename(name), directory)
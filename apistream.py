@@ -0,0 +1,211 @@
+#!/usr/bin/python3
+"""
+n1mm_view API push channel
+
+Server-Sent Events behind webserver.py's /api/stream. Polling browsers each
+open a database connection and rebuild /api/radio, /api/last_qso, ... every
+RADIO_POLL_SECONDS, so twenty phones mean twenty copies of the same queries.
+Here one Broadcaster thread builds each payload (apidata.PAYLOADS) at most
+once per TOPIC_INTERVALS period, only when the database has changed since
+(PRAGMA data_version) or REBUILD_SECONDS have passed, and pushes it to every
+subscriber only when its content (not just its server_time) changed.
+
+A subscriber holds at most one pending event per topic: a slow client skips
+to the newest payload instead of queueing old ones. The thread runs while
+anyone is subscribed and stops with the last of them. New subscribers get the
+current payloads straight away, with server_time set to now.
+
+The wire format is plain SSE, one named event per topic:
+
+    event: radio
+    data: {"radios": [...], "server_time": 1700000000}
+
+plus a comment line every HEARTBEAT_SECONDS so proxies keep the connection
+open and a dead client is noticed.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+
+from config import Config
+import apidata
+
+__author__ = 'Tom Schaefer NY4I'
+__copyright__ = 'Copyright 2026 Thomas M. Schaefer'
+__license__ = 'Simplified BSD'
+
+config = Config()
+
+# Rebuild a payload at least this often even when the database hasn't changed:
+# radio staleness, dup flags and RADIO_HIDE_SECONDS all move with the clock.
+REBUILD_SECONDS = 15
+HEARTBEAT_SECONDS = 15
+# How long a browser waits before reconnecting a dropped stream.
+RETRY_MS = 5000
+
+
+def topic_intervals():
+    """Shortest time between two builds of each payload. Radio and last QSO
+    follow RADIO_POLL_SECONDS; summary and new ops were polled less often."""
+    poll = max(1, getattr(config, 'RADIO_POLL_SECONDS', 2))
+    return {
+        'radio': poll,
+        'last_qso': poll,
+        'summary': max(poll, 10),
+        'new_ops': max(poll, 30),
+    }
+
+
+def format_event(name, data):
+    """One SSE event; data is single-line JSON bytes (apidata.encode)."""
+    return b'event: ' + name.encode('ascii') + b'\ndata: ' + data + b'\n\n'
+
+
+class _Topic:
+    def __init__(self, name, build, interval):
+        self.name = name
+        self.build = build
+        self.interval = interval
+        self.built = None      # time.monotonic() of the last build
+        self.version = None    # data_version the last build saw
+        self.content = None    # payload without server_time, as last pushed
+        self.payload = None
+
+
+class Subscriber:
+    """One /api/stream client: its topics and the events not yet sent to it."""
+
+    def __init__(self, topics):
+        self.topics = set(topics)
+        self.pending = {}  # topic -> event bytes, newest only
+
+
+class Broadcaster:
+    """Builds the API payloads once and fans them out to every subscriber."""
+
+    def __init__(self, database=None, payloads=None, intervals=None, max_clients=50):
+        self.database = database
+        self.payloads = payloads if payloads is not None else apidata.PAYLOADS
+        intervals = intervals if intervals is not None else topic_intervals()
+        self.topics = {name: _Topic(name, build, intervals.get(name, REBUILD_SECONDS))
+                       for name, build in self.payloads.items()}
+        self.max_clients = max_clients
+        self.subscribers = []
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def subscribe(self, topics):
+        """A Subscriber for the known topics among those named, or None if
+        max_clients are already connected."""
+        topics = [t for t in topics if t in self.topics]
+        now = int(time.time())
+        with self._cond:
+            if len(self.subscribers) >= self.max_clients:
+                return None
+            sub = Subscriber(topics)
+            for name in sub.topics:
+                topic = self.topics[name]
+                if topic.payload is not None:
+                    sub.pending[name] = format_event(name, apidata.encode(dict(topic.payload, server_time=now)))
+            self.subscribers.append(sub)
+            if self._thread is None and self.database:
+                self._thread = threading.Thread(target=self._run, name='apistream', daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._cond:
+            if sub in self.subscribers:
+                self.subscribers.remove(sub)
+        self._wake.set()
+
+    def wait(self, sub, timeout):
+        """The events pending for sub, waiting up to timeout seconds for some."""
+        with self._cond:
+            if not sub.pending:
+                self._cond.wait(timeout)
+            events = list(sub.pending.values())
+            sub.pending.clear()
+        return events
+
+    def stream(self, sub):
+        """SSE bytes for sub until the client goes away."""
+        try:
+            yield b'retry: %d\n\n' % RETRY_MS
+            while True:
+                events = self.wait(sub, HEARTBEAT_SECONDS)
+                yield b''.join(events) if events else b': ping\n\n'
+        finally:
+            self.unsubscribe(sub)
+
+    def wanted(self):
+        with self._cond:
+            return set().union(*(s.topics for s in self.subscribers))
+
+    def poll_once(self, cursor, version):
+        """Build the wanted topics that are due and push those that changed.
+        Returns the names pushed."""
+        now = time.monotonic()
+        pushed = []
+        for name in sorted(self.wanted()):
+            topic = self.topics[name]
+            if topic.built is not None:
+                age = now - topic.built
+                if age < topic.interval or (version == topic.version and age < REBUILD_SECONDS):
+                    continue
+            topic.built, topic.version = now, version
+            try:
+                payload = topic.build(cursor)
+            except Exception:
+                logging.exception('could not build the %s stream payload', name)
+                continue
+            content = apidata.encode({k: v for k, v in payload.items() if k != 'server_time'})
+            if content == topic.content:
+                continue
+            topic.content, topic.payload = content, payload
+            event = format_event(name, apidata.encode(payload))
+            with self._cond:
+                for sub in self.subscribers:
+                    if name in sub.topics:
+                        sub.pending[name] = event
+                self._cond.notify_all()
+            pushed.append(name)
+        return pushed
+
+    def next_due(self):
+        """Seconds until the soonest wanted topic may be built again."""
+        now = time.monotonic()
+        waits = [self.topics[n].interval - (now - self.topics[n].built)
+                 for n in self.wanted() if self.topics[n].built is not None]
+        return max(0.2, min(waits)) if waits else 1.0
+
+    def _run(self):
+        db = None
+        try:
+            db = sqlite3.connect(self.database, check_same_thread=False)
+            cursor = db.cursor()
+            while True:
+                with self._cond:
+                    if not self.subscribers:
+                        self._thread = None
+                        for topic in self.topics.values():
+                            topic.built = topic.version = topic.content = topic.payload = None
+                        return
+                try:
+                    version = cursor.execute('PRAGMA data_version').fetchone()[0]
+                    self.poll_once(cursor, version)
+                except sqlite3.Error:
+                    logging.exception('API stream could not read %s', self.database)
+                self._wake.wait(self.next_due())
+                self._wake.clear()
+        except Exception:
+            logging.exception('API stream stopped')
+            with self._cond:
+                self._thread = None
+        finally:
+            if db is not None:
+                db.close()
@@ -478,6 +478,7 @@ def message_processor(q, event):
     logging.info('collector message_processor starting.')
     message_count = 0
     seen = set()
+    hooks = None
     db = sqlite3.connect(config.DATABASE_FILENAME)
     try:
         cursor = db.cursor()
@@ -512,6 +513,8 @@ def message_processor(q, event):
                 logging.debug('message processor stopping due to keyboard interrupt')
                 thread_run = False
     finally:
+        if hooks is not None:
+            hooks.close()
         db.close()
         logging.info('db closed')
         run = False
@@ -0,0 +1,119 @@
+#!/usr/bin/python3
+"""
+n1mm_view response compression
+
+An after_request hook for webserver.py and hubserver.py that gzips (or,
+with the brotli module, brotli-compresses) HTML, JSON and other text
+responses for clients that accept it, over congested field-site Wi-Fi.
+
+Responses smaller than COMPRESS_MIN_SIZE go out as they are, and so do
+streams (/api/stream) and files sent with send_file: IMAGE_DIR's text files
+have their own precompressed copies (imagewriter.write_precompressed).
+Compressed bodies are kept by content hash, so a page whose HTML never
+changes after startup (the /m, /kiosk and /charts templates) or an unchanged
+cached /api body is compressed once, not on every request. A compressed
+response's strong ETag is made weak: If-None-Match is compared weakly, so
+304s still work, and the identity bytes keep the strong one.
+
+Per endpoint it counts requests, the bytes before and after compression, and
+how many were served from the compressed-body cache; see stats().
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+import imagewriter
+
+__author__ = 'Tom Schaefer NY4I'
+__copyright__ = 'Copyright 2026 Thomas M. Schaefer'
+__license__ = 'Simplified BSD'
+
+COMPRESSIBLE = ('text/html', 'text/plain', 'text/css', 'text/javascript',
+                'application/javascript', 'application/json', 'image/svg+xml')
+
+
+class Compressor:
+    """Compresses a Flask app's text responses; see the module docstring."""
+
+    def __init__(self, min_size=1024, cache_entries=64):
+        self.min_size = min_size
+        self.cache_entries = cache_entries
+        self._cache = OrderedDict()  # (sha1, encoding) -> compressed bytes
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.after_request(self.after_request)
+
+    def encoding(self):
+        """The best Content-Encoding the request accepts, or None."""
+        for encoding, _ in imagewriter.PRECOMPRESSED:
+            if encoding == 'br' and imagewriter.brotli is None:
+                continue
+            if request.accept_encodings[encoding]:
+                return encoding
+        return None
+
+    def _compressed(self, data, encoding):
+        """(compressed data, whether it came from the cache)."""
+        key = (hashlib.sha1(data).digest(), encoding)
+        with self._lock:
+            packed = self._cache.get(key)
+            if packed is not None:
+                self._cache.move_to_end(key)
+                return packed, True
+        packed = imagewriter.compress(data, encoding)
+        with self._lock:
+            self._cache[key] = packed
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+        return packed, False
+
+    def _count(self, size, packed_size, cached):
+        endpoint = request.endpoint or '(none)'
+        with self._lock:
+            entry = self._stats.setdefault(endpoint, {'requests': 0, 'compressed': 0, 'cached': 0,
+                                                      'bytes_in': 0, 'bytes_out': 0})
+            entry['requests'] += 1
+            entry['bytes_in'] += size
+            entry['bytes_out'] += packed_size
+            if packed_size != size:
+                entry['compressed'] += 1
+            if cached:
+                entry['cached'] += 1
+
+    def after_request(self, response):
+        if (request.method == 'HEAD' or response.status_code != 200 or response.direct_passthrough
+                or response.is_streamed or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE):
+            return response
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        encoding = self.encoding()
+        if encoding is None or len(data) < self.min_size:
+            self._count(len(data), len(data), False)
+            return response
+        try:
+            packed, cached = self._compressed(data, encoding)
+        except Exception:
+            logging.exception('could not %s-compress the %s response', encoding, request.endpoint)
+            return response
+        response.set_data(packed)
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        self._count(len(data), len(packed), cached)
+        return response
+
+    def stats(self):
+        """Per endpoint: requests, compressed, cached, bytes_in, bytes_out and
+        saved (bytes_in - bytes_out), largest saving first."""
+        with self._lock:
+            rows = {name: dict(entry, saved=entry['bytes_in'] - entry['bytes_out'])
+                    for name, entry in self._stats.items()}
+        return dict(sorted(rows.items(), key=lambda item: -item[1]['saved']))
@@ -184,6 +184,15 @@ class Config(metaclass = Singleton):
         self.DISPLAY_DWELL_TIME = cfg.getint('GLOBAL','DISPLAY_DWELL_TIME',fallback=6)
         self.DATA_DWELL_TIME = cfg.getint('GLOBAL','DATA_DWELL_TIME',fallback=60)
         self.HEADLESS_DWELL_TIME = cfg.getint('GLOBAL','HEADLESS_DWELL_TIME',fallback=180)
+        # Wake headless as soon as the collector logs (or deletes) a QSO rather
+        # than waiting out HEADLESS_DWELL_TIME, which then only bounds how
+        # stale the map's grey line gets. A burst of QSOs is debounced into one
+        # render: wait until the log has been quiet this many seconds.
+        self.HEADLESS_WAKE_ON_CHANGE = cfg.getboolean('GLOBAL', 'HEADLESS_WAKE_ON_CHANGE', fallback=True)
+        self.HEADLESS_DEBOUNCE_SECONDS = max(0.0, cfg.getfloat('GLOBAL', 'HEADLESS_DEBOUNCE_SECONDS', fallback=2.0))
+        # Thin-client dashboard: show the PNGs headless writes to IMAGE_DIR
+        # (re-read when they change) instead of rendering the charts again.
+        self.DASHBOARD_FROM_IMAGE_DIR = cfg.getboolean('GLOBAL', 'DASHBOARD_FROM_IMAGE_DIR', fallback=False)
         self.SKIP_TIMESTAMP_CHECK = cfg.getboolean('DEBUG','SKIP_TIMESTAMP_CHECK',fallback=False)
         
         
@@ -191,6 +200,76 @@ class Config(metaclass = Singleton):
         self.IMAGE_DIR = cfg.get('HEADLESS INFO','IMAGE_DIR',fallback='/mnt/ramdisk/n1mm_view/html')
         self.HEADLESS = cfg.getboolean('HEADLESS INFO','HEADLESS',fallback = False) #False
         self.POST_FILE_COMMAND = cfg.get('HEADLESS INFO','POST_FILE_COMMAND', fallback=None)
+        # Where to copy IMAGE_DIR after each render (see publisher.py): local
+        # directories and/or http(s) URLs taking PUT, comma or newline
+        # separated. Only changed files are sent, in the background, with
+        # retry backoff up to PUBLISH_RETRY_MAX_SECONDS. POST_FILE_COMMAND, if
+        # set, is also run by the publisher, and only when something changed.
+        self.PUBLISH_TARGETS = cfg.get('HEADLESS INFO', 'PUBLISH_TARGETS', fallback='')
+        self.PUBLISH_RETRY_MAX_SECONDS = cfg.getint('HEADLESS INFO', 'PUBLISH_RETRY_MAX_SECONDS', fallback=300)
+        # PNG output (see imagewriter.py). zlib level 0-9; scanline filter
+        # NONE | SUB | UP (NONE is fastest and fine for the flat-colour charts);
+        # PNG_ENCODE_THREADS > 0 compresses on a thread pool while the next
+        # chart renders (0 = encode synchronously, the historical behaviour).
+        self.PNG_COMPRESS_LEVEL = cfg.getint('HEADLESS INFO', 'PNG_COMPRESS_LEVEL', fallback=6)
+        self.PNG_FILTER = cfg.get('HEADLESS INFO', 'PNG_FILTER', fallback='NONE').strip().upper()
+        if self.PNG_FILTER not in ('NONE', 'SUB', 'UP'):
+            logging.warning('Invalid PNG_FILTER value "%s", defaulting to NONE' % self.PNG_FILTER)
+            self.PNG_FILTER = 'NONE'
+        self.PNG_ENCODE_THREADS = cfg.getint('HEADLESS INFO', 'PNG_ENCODE_THREADS', fallback=0)
+        # Smaller copies of every chart PNG for phones and thumbnails (see
+        # imagewriter.VARIANTS): any of half, thumb. The web pages pick one
+        # with srcset. Empty (default) writes only the full-size image.
+        self.IMAGE_VARIANTS = [v.strip().lower() for v in
+                               cfg.get('HEADLESS INFO', 'IMAGE_VARIANTS', fallback='').split(',') if v.strip()]
+        for v in self.IMAGE_VARIANTS:
+            if v not in ('half', 'thumb'):
+                logging.warning('Unknown IMAGE_VARIANTS entry "%s" ignored (use half, thumb)' % v)
+        self.IMAGE_VARIANTS = [v for v in self.IMAGE_VARIANTS if v in ('half', 'thumb')]
+        # Write IMAGE_DIR/manifest.json (a content hash per PNG) so index.html
+        # can load charts by hash under long-lived cache headers and poll only
+        # the manifest (see publisher.ImageManifest).
+        self.IMAGE_MANIFEST = cfg.getboolean('HEADLESS INFO', 'IMAGE_MANIFEST', fallback=True)
+        # Write the /api/radio, /api/last_qso, /api/summary and /api/new_ops
+        # documents as IMAGE_DIR/api_*.json each cycle (see apidata.py), for
+        # copies of the site that have no webserver.py to ask.
+        self.API_SNAPSHOTS = cfg.getboolean('HEADLESS INFO', 'API_SNAPSHOTS', fallback=True)
+        # Leave the charts webserver.py's /charts page draws in the browser
+        # (apidata.BROWSER_CHARTS) out of headless, and show that page's
+        # drawings in index.html instead. Only for sites viewed through
+        # webserver.py: copies elsewhere lose those charts.
+        self.BROWSER_CHARTS = cfg.getboolean('HEADLESS INFO', 'BROWSER_CHARTS', fallback=False)
+        # Also write gzip (and, with python3-brotli, brotli) copies of
+        # index.html, manifest.json and the api_*.json snapshots
+        # (imagewriter.write_precompressed); webserver.py sends them to
+        # browsers that accept them.
+        self.PRECOMPRESS = cfg.getboolean('HEADLESS INFO', 'PRECOMPRESS', fallback=False)
+        # Number of worker processes headless renders charts on (see
+        # renderpool.py). 0 = render in-process one after another, the
+        # historical behaviour; 3 suits a 4-core Pi 4/5 (each worker holds its
+        # own matplotlib/Cartopy, roughly 150MB).
+        self.RENDER_WORKERS = max(0, cfg.getint('HEADLESS INFO', 'RENDER_WORKERS', fallback=0))
+        # Replace the render workers after this many cycles, or once one of them
+        # grows past this RSS, starting the replacements a cycle early. Either
+        # one set moves rendering into a worker even with RENDER_WORKERS = 0.
+        # 0 (default) never recycles.
+        self.RENDER_RECYCLE_CYCLES = max(0, cfg.getint('HEADLESS INFO', 'RENDER_RECYCLE_CYCLES', fallback=0))
+        self.RENDER_RECYCLE_RSS_MB = max(0, cfg.getint('HEADLESS INFO', 'RENDER_RECYCLE_RSS_MB', fallback=0))
+        # Skip re-rendering a chart whose input data (and the config/version)
+        # is unchanged since its PNG was written. Fingerprints are kept in
+        # IMAGE_DIR/.chart_fingerprints.json so a restart doesn't re-render all.
+        self.CHART_FINGERPRINTS = cfg.getboolean('HEADLESS INFO', 'CHART_FINGERPRINTS', fallback=True)
+        # Per-cycle render budget in seconds (see scheduler.py). When the due
+        # charts' measured render times exceed it, normal/low priority charts
+        # wait for a later cycle. 0 = no budget, render everything that's due.
+        self.RENDER_BUDGET_SECONDS = max(0.0, cfg.getfloat('HEADLESS INFO', 'RENDER_BUDGET_SECONDS', fallback=0))
+        # Keep per-cycle timings (queries, chart builds, encodes, publish), RSS
+        # and gc counts for this many recent cycles in IMAGE_DIR/.render_stats.json;
+        # the webserver admin page shows p50/p95 per chart. 0 turns it off.
+        self.RENDER_STATS_CYCLES = max(0, cfg.getint('HEADLESS INFO', 'RENDER_STATS_CYCLES', fallback=100))
+        # Per-chart refresh policy overrides, keyed by PNG basename, e.g.
+        # sections_worked_map = every 180, high (see scheduler.RefreshPolicy).
+        self.RENDER_SCHEDULE = dict(cfg.items('RENDER SCHEDULE')) if cfg.has_section('RENDER SCHEDULE') else {}
 
         # Built-in HTTP server that serves IMAGE_DIR and exposes a /api/radio
         # JSON endpoint for near-realtime sidebar updates. Disable if Apache or
@@ -198,8 +277,39 @@ class Config(metaclass = Singleton):
         self.WEBSERVER_ENABLED = cfg.getboolean('WEBSERVER', 'ENABLED', fallback=True)
         self.WEBSERVER_BIND = cfg.get('WEBSERVER', 'BIND', fallback='0.0.0.0')
         self.WEBSERVER_PORT = cfg.getint('WEBSERVER', 'PORT', fallback=8080)
+        # werkzeug: Flask's development server, one thread per connection.
+        # gunicorn: gunicorn's threaded worker (apt install python3-gunicorn),
+        # which parks idle keep-alive connections instead of giving each a
+        # thread, runs at most THREADS requests at once and sends static files
+        # with sendfile(). MAX_CONNECTIONS and KEEPALIVE (seconds an idle
+        # connection is kept) apply to gunicorn only.
+        self.WEBSERVER_SERVER = cfg.get('WEBSERVER', 'SERVER', fallback='werkzeug').strip().lower()
+        self.WEBSERVER_THREADS = max(2, cfg.getint('WEBSERVER', 'THREADS', fallback=32))
+        self.WEBSERVER_MAX_CONNECTIONS = max(10, cfg.getint('WEBSERVER', 'MAX_CONNECTIONS', fallback=500))
+        self.WEBSERVER_KEEPALIVE = max(1, cfg.getint('WEBSERVER', 'KEEPALIVE', fallback=30))
         # Browser poll interval for /api/radio, in seconds.
         self.RADIO_POLL_SECONDS = cfg.getint('WEBSERVER', 'RADIO_POLL_SECONDS', fallback=2)
+        # How long browsers may reuse a chart image from IMAGE_DIR, requested
+        # without a matching ?v= content hash, before asking again (by
+        # ETag/Last-Modified, usually answered with a 304). 0 = always ask:
+        # renders follow the database, so a chart can change at any moment.
+        # -1 = HEADLESS_DWELL_TIME. index.html, manifest.json and api_*.json
+        # are always revalidated.
+        self.STATIC_MAX_AGE = cfg.getint('WEBSERVER', 'STATIC_MAX_AGE', fallback=0)
+        if self.STATIC_MAX_AGE < 0:
+            self.STATIC_MAX_AGE = self.HEADLESS_DWELL_TIME
+        # gzip (brotli with python3-brotli) the HTML and JSON responses of
+        # webserver.py and hubserver.py for browsers that accept it, when
+        # they are at least COMPRESS_MIN_SIZE bytes (see compression.py).
+        self.COMPRESS = cfg.getboolean('WEBSERVER', 'COMPRESS', fallback=True)
+        self.COMPRESS_MIN_SIZE = max(0, cfg.getint('WEBSERVER', 'COMPRESS_MIN_SIZE', fallback=1024))
+        # /api/stream pushes radio, last-QSO, summary and new-ops updates to
+        # index.html and /m as Server-Sent Events, built once for every client
+        # (apistream.py); the pages poll only while it is unavailable. Each
+        # stream holds a server thread, so past API_STREAM_MAX_CLIENTS clients
+        # are refused and poll instead.
+        self.API_STREAM = cfg.getboolean('WEBSERVER', 'API_STREAM', fallback=True)
+        self.API_STREAM_MAX_CLIENTS = max(1, cfg.getint('WEBSERVER', 'API_STREAM_MAX_CLIENTS', fallback=50))
         self.VIEW_FONT = cfg.getint('FONT INFO','VIEW_FONT',fallback=64)
         self.BIGGER_FONT = cfg.getint('FONT INFO','BIGGER_FONT',fallback=180)
 
@@ -297,8 +407,15 @@ class Config(metaclass = Singleton):
         self.HOOK_BAND_CHANGE_SCRIPT = cfg.get('HOOKS', 'BAND_CHANGE_SCRIPT', fallback='').strip()
         # Seconds before a runaway hook script is killed.
         self.HOOK_TIMEOUT = cfg.getint('HOOKS', 'TIMEOUT', fallback=10)
-        # Cap on concurrently-running hook processes (event-storm protection).
+        # Cap on concurrently-running hook processes (event-storm protection):
+        # the number of hook worker threads.
         self.HOOK_MAX_CONCURRENT = cfg.getint('HOOKS', 'MAX_CONCURRENT', fallback=4)
+        # Events waiting for a free worker, at most; past it HOOK_OVERFLOW
+        # decides: coalesce (the new event replaces the newest queued one of
+        # its type for the same station and multiplier, or is dropped) or
+        # drop_oldest (the oldest, least important one goes).
+        self.HOOK_QUEUE_SIZE = cfg.getint('HOOKS', 'QUEUE_SIZE', fallback=32)
+        self.HOOK_OVERFLOW = cfg.get('HOOKS', 'OVERFLOW', fallback='coalesce').strip().lower()
         # Count a multiplier as "new" per-band (True) or once overall (False,
         # the default, matching the dashboard's distinct-value multiplier count).
         self.HOOK_MULT_PER_BAND = cfg.getboolean('HOOKS', 'MULT_PER_BAND', fallback=False)
@@ -17,6 +17,8 @@ import time
 from config import Config
 import constants
 import dataaccess
+import dbwatch
+import framestore
 import graphics
 
 __author__ = 'Jeffrey B. Otterson, N1KDO'
@@ -44,14 +46,38 @@ OPERATOR_LEADERBOARD_INDEX = 15
 HQ_STATIONS_INDEX = 16
 IMAGE_COUNT = 17
 
+# headless's file for each image, for DASHBOARD_FROM_IMAGE_DIR
+IMAGE_FILES = {
+    QSO_COUNTS_TABLE_INDEX: 'qso_summary_table.png',
+    QSO_RATES_TABLE_INDEX: 'qso_rates_table.png',
+    QSO_OPERATORS_PIE_INDEX: 'qso_operators_graph.png',
+    QSO_OPERATORS_TABLE_INDEX: 'qso_operators_table.png',
+    QSO_STATIONS_PIE_INDEX: 'qso_stations_graph.png',
+    QSO_BANDS_PIE_INDEX: 'qso_bands_graph.png',
+    QSO_MODES_PIE_INDEX: 'qso_modes_graph.png',
+    QSO_CLASSES_PIE_INDEX: 'qso_classes_graph.png',
+    QSO_CATEGORIES_PIE_INDEX: 'qso_categories_graph.png',
+    QSO_RATE_CHART_IMAGE_INDEX: 'qso_rates_graph.png',
+    SECTIONS_WORKED_MAP_INDEX: 'sections_worked_map.png',
+    RADIO_INFO_INDEX: 'radio_info.png',
+    MULTS_PROGRESS_INDEX: 'mults_progress.png',
+    MULTS_REMAINING_INDEX: 'mults_remaining.png',
+    OPERATOR_LEADERBOARD_INDEX: 'operator_leaderboard.png',
+    HQ_STATIONS_INDEX: 'hq_stations.png',
+}
+
 IMAGE_MESSAGE = 1
 CRAWL_MESSAGE = 2
+FRAME_MESSAGE = 3
 
 SAVE_PNG = False
 
 # Module-level tracking for new mult alerts
 _previous_mults = set()
 
+# Shared-memory frame store the chart process writes into (see framestore.py)
+_frame_store = None
+
 def load_data(size, q, last_qso_timestamp):
     """
     load data from the database tables
@@ -108,33 +134,14 @@ def load_data(size, q, last_qso_timestamp):
 
         # load QSOs by Section/State
         # This has to be done even if no new QSO to advance gray line and since the map is always drawn.
-        if config.MULTS == 'STATES':
-            qsos_by_section = dataaccess.get_qsos_by_state(cursor)
-        elif config.MULTS == 'ITUZONES':
-            qsos_by_section = dataaccess.get_qsos_by_ituzone(cursor)
-        elif config.MULTS == 'CQZONES':
-            qsos_by_section = dataaccess.get_qsos_by_cqzone(cursor)
-        elif config.MULTS == 'GRID':
-            qsos_by_section = dataaccess.get_qsos_by_grid(cursor)
-        else:
-            qsos_by_section = dataaccess.get_qsos_by_section(cursor)
+        qsos_by_section = get_qsos_by_mult(cursor)
 
         # load IARU HQ-station multiplier counts (independent of the zone map)
         qsos_by_hq = dataaccess.get_qsos_by_hq(cursor) if config.SHOW_HQ_STATIONS else {}
 
         # Check for new multipliers and send alert
         if config.SHOW_MULT_ALERT:
-            global _previous_mults
-            current_mults = set(code for code, count in qsos_by_section.items() if count > 0)
-            new_mults = current_mults - _previous_mults
-            if new_mults and _previous_mults:  # Only alert if we had previous mults (not first load)
-                mult_dict = constants.get_mult_dictionary()
-                for mult_code in new_mults:
-                    mult_name = mult_dict.get(mult_code, mult_code)
-                    alert_msg = f'NEW MULT: {mult_code} - {mult_name}!'
-                    q.put((CRAWL_MESSAGE, 5, alert_msg, graphics.YELLOW, graphics.RED))
-                    logging.info(f'New multiplier alert: {alert_msg}')
-            _previous_mults = current_mults
+            alert_new_mults(q, qsos_by_section)
 
         # load radio info
         radio_info = dataaccess.get_radio_info(cursor)
@@ -143,12 +150,7 @@ def load_data(size, q, last_qso_timestamp):
 
         logging.debug('load data done')
     except sqlite3.OperationalError as error:
-        if error.args is not None and error.args[0].startswith('no such table'):
-            q.put((CRAWL_MESSAGE, 0, 'database not ready', graphics.YELLOW, graphics.RED))
-        else:
-            logging.error(error.args[0])
-            logging.exception(error)
-            q.put((CRAWL_MESSAGE, 0, 'database read error', graphics.YELLOW, graphics.RED))
+        report_database_error(q, error)
         return
     finally:
         if db is not None:
@@ -257,11 +259,74 @@ def load_data(size, q, last_qso_timestamp):
     return last_qso_time
 
 
+def get_qsos_by_mult(cursor):
+    """
+    QSO counts by multiplier (section, state, zone or grid, per config.MULTS)
+    """
+    if config.MULTS == 'STATES':
+        return dataaccess.get_qsos_by_state(cursor)
+    elif config.MULTS == 'ITUZONES':
+        return dataaccess.get_qsos_by_ituzone(cursor)
+    elif config.MULTS == 'CQZONES':
+        return dataaccess.get_qsos_by_cqzone(cursor)
+    elif config.MULTS == 'GRID':
+        return dataaccess.get_qsos_by_grid(cursor)
+    return dataaccess.get_qsos_by_section(cursor)
+
+
+def alert_new_mults(q, qsos_by_section):
+    """
+    put a NEW MULT alert on the crawl for each multiplier first worked since the last call
+    """
+    global _previous_mults
+    current_mults = set(code for code, count in qsos_by_section.items() if count > 0)
+    new_mults = current_mults - _previous_mults
+    if new_mults and _previous_mults:  # Only alert if we had previous mults (not first load)
+        mult_dict = constants.get_mult_dictionary()
+        for mult_code in new_mults:
+            mult_name = mult_dict.get(mult_code, mult_code)
+            alert_msg = f'NEW MULT: {mult_code} - {mult_name}!'
+            q.put((CRAWL_MESSAGE, 5, alert_msg, graphics.YELLOW, graphics.RED))
+            logging.info(f'New multiplier alert: {alert_msg}')
+    _previous_mults = current_mults
+
+
+def report_database_error(q, error):
+    """
+    put a database problem on the crawl
+    """
+    if error.args is not None and error.args[0].startswith('no such table'):
+        q.put((CRAWL_MESSAGE, 0, 'database not ready', graphics.YELLOW, graphics.RED))
+    else:
+        logging.error(error.args[0])
+        logging.exception(error)
+        q.put((CRAWL_MESSAGE, 0, 'database read error', graphics.YELLOW, graphics.RED))
+
+
 def enqueue_image(q, image_id, image_data, size):
     if image_data is not None:
+        if _frame_store is not None and _frame_store.fits(memoryview(image_data).nbytes):
+            # copy the pixels into shared memory and send only the slot number
+            seq = _frame_store.write(image_id, image_data, size)
+            q.put((FRAME_MESSAGE, image_id, seq))
+            return
+        # matplotlib charts come back as a memoryview of the Agg buffer, which
+        # can't be pickled onto the queue; take the bytes here.
+        if isinstance(image_data, memoryview):
+            image_data = image_data.tobytes()
         q.put((IMAGE_MESSAGE, image_id, image_data, size))
 
 
+def create_frame_store(size):
+    """Shared memory for IMAGE_COUNT frames of up to size (w, h) RGBA pixels,
+    or None if the platform can't provide it (images then go over the queue)."""
+    try:
+        return framestore.FrameStore(IMAGE_COUNT, size[0] * size[1] * 4)
+    except (OSError, ValueError) as e:
+        logging.warning('shared memory frame store unavailable, sending images by queue: %s', e)
+        return None
+
+
 def delta_time_to_string(delta_time):
     """
     return a string that represents delta time
@@ -298,9 +363,25 @@ def update_crawl_message(crawl_messages):
         crawl_messages.set_message_colors(2, graphics.RED, graphics.BLACK)
 
 
+def native_surface(surf):
+    """
+    convert a surface to the display's pixel format so blitting it is a plain copy
+    """
+    try:
+        if surf.get_flags() & pygame.SRCALPHA:
+            return surf.convert_alpha()
+        return surf.convert()
+    except pygame.error:  # no display mode set
+        return surf
+
+
 class CrawlMessages:
     """
     class to manage a crawl of varied text messages on the bottom of the display
+
+    Each message is rendered once and cached until its text or colors change,
+    and the messages on screen are composed into one strip surface that is only
+    rebuilt when a message scrolls on or off. Each frame is then a single blit.
     """
 
     def __init__(self, screen, size):
@@ -308,7 +389,9 @@ class CrawlMessages:
         self.size = size
         self.messages = [''] * 10
         self.message_colors = [(graphics.GREEN, graphics.BLACK)] * 10
+        self.message_cache = [None] * 10
         self.message_surfaces = None
+        self.strip = None
         self.last_added_index = -1
         self.first_x = -1
 
@@ -320,48 +403,80 @@ class CrawlMessages:
         if index >= 0 and index < len(self.messages):
             self.message_colors[index] = (fg, bg)
 
+    def message_surface(self, index):
+        """
+        the rendered surface for a message, re-rendered only when it has changed
+        """
+        key = (self.messages[index], self.message_colors[index])
+        cached = self.message_cache[index]
+        if cached is None or cached[0] != key:
+            fg, bg = self.message_colors[index]
+            surf = native_surface(graphics.view_font.render(' ' + self.messages[index] + ' ', True, fg, bg))
+            cached = self.message_cache[index] = (key, surf)
+        return cached[1]
+
     def crawl_message(self):
+        """
+        advance the crawl one step and draw it. returns the screen rect drawn.
+        """
         if self.message_surfaces is None:
-            self.message_surfaces = [graphics.view_font.render(' ' + self.messages[0] + ' ', True,
-                                                               self.message_colors[0][0],
-                                                               self.message_colors[0][1])]
+            self.message_surfaces = [self.message_surface(0)]
             self.first_x = self.size[0]
             self.last_added_index = 0
+            self.strip = None
 
         self.first_x -= 4  # doubled step: 4px * 30fps = 120px/sec same as 2px * 60fps
-        rect = self.message_surfaces[0].get_rect()
-        if self.first_x + rect.width < 0:
+        if self.first_x + self.message_surfaces[0].get_width() < 0:
             self.message_surfaces = self.message_surfaces[1:]
             self.first_x = 0
-        x = self.first_x
-        for surf in self.message_surfaces:
-            rect = surf.get_rect()
-            x = x + rect.width
+            self.strip = None
+        x = self.first_x + sum(surf.get_width() for surf in self.message_surfaces)
 
-        while x < self.size[0]:
+        skipped = 0
+        while x < self.size[0] and skipped < len(self.messages):
             self.last_added_index += 1
             if self.last_added_index >= len(self.messages):
                 self.last_added_index = 0
             if self.messages[self.last_added_index] != '':
-                surf = graphics.view_font.render(' ' + self.messages[self.last_added_index] + ' ', True,
-                                                 self.message_colors[self.last_added_index][0],
-                                                 self.message_colors[self.last_added_index][1])
-                rect = surf.get_rect()
+                surf = self.message_surface(self.last_added_index)
                 self.message_surfaces.append(surf)
-                x += rect.width
-
-        x = self.first_x
-        for surf in self.message_surfaces:
-            rect = surf.get_rect()
-            rect.bottom = self.size[1] - 1
-            rect.left = x
-            self.screen.blit(surf, rect)
-            x += rect.width
-            if x >= self.size[0]:
-                break
+                x += surf.get_width()
+                self.strip = None
+                skipped = 0
+            else:
+                skipped += 1
+
+        if not self.message_surfaces:
+            # every message is empty: draw nothing, start over from the right
+            self.message_surfaces = None
+            return pygame.Rect(0, self.size[1] - 1, 0, 0)
+
+        if self.strip is None:
+            width = sum(surf.get_width() for surf in self.message_surfaces)
+            height = max(surf.get_height() for surf in self.message_surfaces)
+            self.strip = native_surface(pygame.Surface((max(width, 1), height)))
+            x = 0
+            for surf in self.message_surfaces:
+                self.strip.blit(surf, (x, height - surf.get_height()))
+                x += surf.get_width()
+
+        rect = self.strip.get_rect()
+        rect.bottom = self.size[1] - 1
+        rect.left = self.first_x
+        return self.screen.blit(self.strip, rect)
+
+
+def attach_frame_store(frame_store_name, size):
+    global _frame_store
+    if frame_store_name is not None:
+        try:
+            _frame_store = framestore.FrameStore.attach(frame_store_name, IMAGE_COUNT, size[0] * size[1] * 4)
+        except OSError as e:
+            logging.warning('cannot attach frame store %s: %s', frame_store_name, e)
 
 
-def update_charts(q, event, size):
+def update_charts(q, event, size, frame_store_name=None):
+    attach_frame_store(frame_store_name, size)
     try:
         os.nice(10)
     except AttributeError:
@@ -384,6 +499,100 @@ def update_charts(q, event, size):
     except Exception as e:
         logging.exception('Exception in update_charts', exc_info=e)
         q.put((CRAWL_MESSAGE, 4, 'Chart engine failed.', graphics.YELLOW, graphics.RED))
+    finally:
+        if _frame_store is not None:
+            _frame_store.close()
+
+
+def load_image_file(filename, size):
+    """
+    read a PNG written by headless, shrinking it to fit size if it is bigger.
+    returns (raw_data, size) like the chart builders.
+    """
+    surf = pygame.image.load(filename)
+    width, height = surf.get_size()
+    scale = min(size[0] / width, size[1] / height)
+    if scale < 1:
+        if surf.get_bitsize() < 24:  # smoothscale wants 24 or 32 bit pixels
+            full = pygame.Surface((width, height), pygame.SRCALPHA, 32)
+            full.blit(surf, (0, 0))
+            surf = full
+        surf = pygame.transform.smoothscale(surf, (max(1, int(width * scale)), max(1, int(height * scale))))
+    return pygame.image.tobytes(surf, graphics.image_format), surf.get_size()
+
+
+def update_database_messages(q):
+    """
+    thin-client counterpart of load_data's crawl messages: the last QSO, new
+    multiplier alerts and the database status, if the database is reachable
+    from here. returns True if the database was read.
+    """
+    try:
+        db = sqlite3.connect('file:%s?mode=ro' % os.path.abspath(config.DATABASE_FILENAME), uri=True)
+    except sqlite3.Error as e:
+        logging.debug('no database for the crawl: %s', e)
+        return False
+    cursor = db.cursor()
+    try:
+        last_qso_time, message = dataaccess.get_last_qso(cursor)
+        q.put((CRAWL_MESSAGE, 3, message))
+        if config.SHOW_MULT_ALERT:
+            alert_new_mults(q, get_qsos_by_mult(cursor))
+        q.put((CRAWL_MESSAGE, 0, ''))
+        return True
+    except sqlite3.OperationalError as error:
+        report_database_error(q, error)
+        return False
+    finally:
+        cursor.close()
+        db.close()
+
+
+def watch_images(q, event, size, frame_store_name=None):
+    """
+    thin-client replacement for update_charts: show the charts headless writes
+    to IMAGE_DIR instead of rendering them again. Each file is re-read only
+    when its size or mtime changes; headless replaces them atomically. The
+    crawl's database messages are refreshed when a QSO is logged, every
+    DATA_DWELL_TIME like load_data, and every second while the database
+    can't be read.
+    """
+    attach_frame_store(frame_store_name, size)
+    logging.info('showing images from %s', config.IMAGE_DIR)
+    seen = {}
+    watcher = dbwatch.DatabaseWatcher(config.DATABASE_FILENAME, probe=dataaccess.get_qso_signature)
+    watcher.poll()
+    read = update_database_messages(q)
+    read_at = time.monotonic()
+    try:
+        while not event.is_set():
+            for index, name in IMAGE_FILES.items():
+                filename = os.path.join(config.IMAGE_DIR, name)
+                try:
+                    st = os.stat(filename)
+                except OSError:
+                    continue
+                stamp = (st.st_mtime_ns, st.st_size)
+                if seen.get(index) == stamp:
+                    continue
+                seen[index] = stamp
+                try:
+                    image_data, image_size = load_image_file(filename, size)
+                    enqueue_image(q, index, image_data, image_size)
+                    logging.debug('loaded %s', filename)
+                except (pygame.error, OSError) as e:
+                    logging.warning('could not load %s: %s', filename, e)
+            if watcher.poll() or not read or time.monotonic() - read_at >= config.DATA_DWELL_TIME:
+                read = update_database_messages(q)
+                read_at = time.monotonic()
+            event.wait(1.0)
+    except Exception as e:
+        logging.exception('Exception in watch_images', exc_info=e)
+        q.put((CRAWL_MESSAGE, 4, 'Image watcher failed.', graphics.YELLOW, graphics.RED))
+    finally:
+        watcher.close()
+        if _frame_store is not None:
+            _frame_store.close()
 
 
 def change_image(screen, size, images, image_index, delta):
@@ -418,16 +627,23 @@ def main():
 
     logging.debug('display setup')
 
-    images[LOGO_IMAGE_INDEX] = pygame.image.load(config.LOGO_FILENAME)
+    images[LOGO_IMAGE_INDEX] = native_surface(pygame.image.load(config.LOGO_FILENAME))
     crawl_messages = CrawlMessages(screen, size)
     update_crawl_message(crawl_messages)
 
-    proc = multiprocessing.Process(name='image-updater', target=update_charts, args=(q, process_event, display_size))
+    frame_store = create_frame_store(display_size)
+    # With DASHBOARD_FROM_IMAGE_DIR the charts come from headless's IMAGE_DIR
+    # instead of being rendered here as well.
+    updater = watch_images if config.DASHBOARD_FROM_IMAGE_DIR else update_charts
+    proc = multiprocessing.Process(name='image-updater', target=updater,
+                                   args=(q, process_event, display_size,
+                                         frame_store.name if frame_store is not None else None))
     proc.start()
 
     try:
         image_index = LOGO_IMAGE_INDEX
         graphics.show_graph(screen, size, images[LOGO_IMAGE_INDEX])
+        pygame.display.update()
 
         pygame.time.set_timer(pygame.USEREVENT, 1000)
         run = True
@@ -438,6 +654,7 @@ def main():
         crawl_rect = pygame.Rect(0, size[1] - graphics.view_font_height, size[0], graphics.view_font_height)
 
         while run:
+            full_update = False
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     run = False
@@ -447,8 +664,10 @@ def main():
                     if display_update_timer < 1:
                         if paused:
                             graphics.show_graph(screen, size, images[image_index])
+                            full_update = True
                         else:
                             image_index = change_image(screen, size, images, image_index, 1)
+                            full_update = True
                         display_update_timer = config.DISPLAY_DWELL_TIME
                     update_crawl_message(crawl_messages)
                 elif event.type == pygame.KEYDOWN:
@@ -458,15 +677,18 @@ def main():
                     elif event.key == pygame.K_n or event.key == 275 or event.key == pygame.K_RIGHT:
                         logging.debug('next key pressed')
                         image_index = change_image(screen, size, images, image_index, 1)
+                        full_update = True
                         display_update_timer = config.DISPLAY_DWELL_TIME
                     elif event.key == pygame.K_p or event.key == 276 or event.key == pygame.K_LEFT:
                         logging.debug('prev key pressed')
                         image_index = change_image(screen, size, images, image_index, -1)
+                        full_update = True
                         display_update_timer = config.DISPLAY_DWELL_TIME
                     elif event.key == 302 or event.key == pygame.K_SCROLLLOCK:
                         logging.debug('scroll lock key pressed')
                         if paused:
                             image_index = change_image(screen, size, images, image_index, 1)
+                            full_update = True
                             display_update_timer = config.DISPLAY_DWELL_TIME
                         paused = not paused
                     else:
@@ -480,6 +702,14 @@ def main():
                         image_size = payload[3]
                         images[n] = pygame.image.frombuffer(image, image_size, graphics.image_format)
                         logging.debug('received image %d', n)
+                    elif message_type == FRAME_MESSAGE:
+                        n = payload[1]
+                        frame = frame_store.read(n)
+                        if frame is not None:
+                            view, image_size, seq = frame
+                            # the surface wraps the shared buffer; nothing is copied
+                            images[n] = pygame.image.frombuffer(view, image_size, graphics.image_format)
+                            logging.debug('received frame %d of image %d', seq, n)
                     elif message_type == CRAWL_MESSAGE:
                         n = payload[1]
                         message = payload[2]
@@ -493,8 +723,12 @@ def main():
                         crawl_messages.set_message_colors(n, fg, bg)
 
             screen.fill((0, 0, 0), crawl_rect)
-            crawl_messages.crawl_message()
-            pygame.display.update()
+            drawn = crawl_messages.crawl_message()
+            if full_update:
+                pygame.display.update()
+            else:
+                # only the crawl moved
+                pygame.display.update([crawl_rect, drawn])
 
             clock.tick(30)
 
@@ -511,6 +745,9 @@ def main():
         logging.warning('chart engine did not exit upon request, killing.')
         proc.terminate()
     logging.debug('update thread has stopped.')
+    if frame_store is not None:
+        images = None  # surfaces hold views into the shared memory
+        frame_store.close()
     logging.info('dashboard exit')
 
 
@@ -585,6 +585,14 @@ def get_last_qso(cursor):
     return last_qso_time, message
 
 
+def get_qso_signature(cursor):
+    """(newest QSO timestamp, QSO count): changes when a QSO is added or
+    deleted. A cheap change token for readers polling the log (dbwatch)."""
+    cursor.execute('SELECT MAX(timestamp), COUNT(*) FROM qso_log')
+    row = cursor.fetchone()
+    return (row[0], row[1]) if row else (None, 0)
+
+
 def get_qso_count(cursor):
     """Return the total number of rows in qso_log.
 
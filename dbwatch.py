@@ -0,0 +1,157 @@
+#!/usr/bin/python3
+"""
+n1mm_view database change watcher
+
+A cheap "has the collector written anything?" signal for the processes that
+only read the database.
+
+SQLite bumps PRAGMA data_version on a connection whenever *another*
+connection commits to the database, and reading it costs no I/O beyond the
+file's change counter. DatabaseWatcher keeps one read-only connection open
+and polls that counter, so a reader can find out within a second that there
+is new data without re-running any of its aggregate queries.
+
+The collector also commits radio status several times a minute, so a watcher
+can be given a probe: a function of a cursor returning a small token (for
+headless, the last QSO time and QSO count). When data_version moves the probe
+is run, and only a changed token counts as a change.
+
+A probe that fails (None) leaves the last token in place, so a locked or
+half-created database doesn't look like new data once it reads again.
+
+The watcher reconnects if the database file is replaced (e.g. wiped and
+recreated), and simply reports no change while the file doesn't exist yet.
+"""
+
+import logging
+import os
+import sqlite3
+import time
+
+__author__ = 'Tom Schaefer NY4I'
+__copyright__ = 'Copyright 2026 Thomas M. Schaefer'
+__license__ = 'Simplified BSD'
+
+
+class DatabaseWatcher:
+    """Poll a SQLite database for commits made by other connections."""
+
+    def __init__(self, filename, probe=None):
+        self.filename = filename
+        self.probe = probe
+        self._db = None
+        self._inode = None
+        self._version = None
+        self._token = None
+        self._started = False
+
+    def _connect(self):
+        try:
+            inode = os.stat(self.filename).st_ino
+        except OSError:
+            self.close()
+            return None
+        if self._db is not None and inode == self._inode:
+            return self._db
+        self.close()
+        try:
+            uri = 'file:%s?mode=ro' % os.path.abspath(self.filename)
+            self._db = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self._inode = inode
+            logging.debug('watching %s for changes', self.filename)
+        except sqlite3.Error as e:
+            logging.debug('cannot open %s to watch it: %s', self.filename, e)
+            self._db = None
+        return self._db
+
+    def close(self):
+        if self._db is not None:
+            try:
+                self._db.close()
+            except sqlite3.Error:
+                pass
+        self._db = None
+        self._inode = None
+        self._version = None
+
+    def data_version(self):
+        """The database's change counter as seen from this connection, or
+        None if the database can't be opened. Changes whenever another
+        connection commits (and when the file is replaced)."""
+        db = self._connect()
+        if db is None:
+            return None
+        try:
+            return (self._inode, db.execute('PRAGMA data_version').fetchone()[0])
+        except sqlite3.Error as e:
+            logging.debug('data_version on %s failed: %s', self.filename, e)
+            self.close()
+            return None
+
+    def _probe(self):
+        if self.probe is None:
+            return None
+        db = self._connect()
+        if db is None:
+            return None
+        cursor = db.cursor()
+        try:
+            return self.probe(cursor)
+        except sqlite3.Error as e:
+            # e.g. 'no such table' before the collector has created it
+            logging.debug('change probe on %s failed: %s', self.filename, e)
+            return None
+        finally:
+            cursor.close()
+
+    def poll(self):
+        """True if the database changed since the last poll (for a watcher
+        with a probe: if the probe's token changed). The first poll only
+        records the starting point and returns False; if there is no database
+        yet, that starting point is empty and its appearance is a change. A
+        failed probe counts as no change, and the probe is retried at the next
+        poll."""
+        version = self.data_version()
+        first = not self._started
+        self._started = True
+        if version is None or version == self._version:
+            return False
+        if self.probe is None:
+            self._version = version
+            return not first
+        token = self._probe()
+        if token is None:
+            return False
+        self._version = version
+        if token == self._token:
+            return False
+        self._token = token
+        return not first
+
+    def wait_for_change(self, timeout, poll_interval=1.0, debounce=2.0, max_delay=10.0):
+        """Sleep until the database changes or timeout seconds pass.
+
+        After the first change, keep waiting until it has been quiet for
+        `debounce` seconds (but no longer than `max_delay`), so a burst of
+        QSOs is answered with one render. Returns True on a change, False on
+        timeout.
+        """
+        start = time.monotonic()
+        deadline = start + timeout
+        # A change since the previous call (e.g. a QSO logged while the last
+        # render ran) counts too.
+        changed_at = last_change = start if self.poll() else None
+        while True:
+            now = time.monotonic()
+            if changed_at is not None:
+                if now - last_change >= debounce or now - changed_at >= max_delay:
+                    logging.debug('database changed; settled after %.1fs', now - changed_at)
+                    return True
+            elif now >= deadline:
+                return False
+            time.sleep(min(poll_interval, max(0.05, deadline - now)) if changed_at is None
+                       else min(poll_interval, debounce))
+            if self.poll():
+                last_change = time.monotonic()
+                if changed_at is None:
+                    changed_at = last_change
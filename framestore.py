@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+"""
+n1mm_view frame store
+
+Shared-memory transport for chart pixels between the dashboard's chart
+process and its display loop.
+
+One shared-memory segment holds a small header plus two pixel buffers for
+each image slot (dashboard's *_INDEX constants). The chart process copies a
+finished chart straight out of the renderer's buffer into the slot's idle
+buffer, flips the slot's active buffer and bumps its sequence number, then
+sends only (slot, sequence) over the queue. The display loop wraps the
+active buffer in a pygame surface with no copy at all -- instead of the
+multi-megabyte pickle / pipe write / unpickle per chart the queue used to
+carry.
+
+Double buffering keeps the surface on screen intact while the next frame for
+the same slot is written: the writer always fills the buffer the reader is
+not using, and before reusing a buffer it waits (briefly) for the reader to
+acknowledge that it has moved to the newer one.
+
+There is no lock between the processes, so each side writes only its own
+part of a slot's header, each with one struct write: the writer the
+published frame (sequence, active buffer, size), the reader the sequence it
+has acknowledged. Neither can put back a stale copy of the other's field.
+
+The segment is created by the display process, which also unlinks it at
+exit; the chart process attaches by name. Pages of /dev/shm are only
+committed when written, so slots that are never used cost nothing.
+"""
+
+import logging
+import struct
+import time
+from multiprocessing import shared_memory
+
+__author__ = 'Tom Schaefer NY4I'
+__copyright__ = 'Copyright 2026 Thomas M. Schaefer'
+__license__ = 'Simplified BSD'
+
+# per-slot header, in one 64-byte line: the writer's published frame --
+# sequence, active buffer (0/1), width, height, byte count -- and, in a word
+# of its own, the sequence the reader has acknowledged
+_PUBLISHED = struct.Struct('<QIIIxxxxQ')
+_ACKED = struct.Struct('<Q')
+_ACKED_OFFSET = 32
+_SLOT_HEADER_BYTES = 64
+
+ACK_WAIT_SECONDS = 2.0
+
+
+class FrameStore:
+    """Double-buffered RGBA/RGB frames in shared memory, one slot per image."""
+
+    def __init__(self, slots, max_frame_bytes, name=None):
+        self.slots = slots
+        self.max_frame_bytes = max_frame_bytes
+        self._header_bytes = slots * _SLOT_HEADER_BYTES
+        total = self._header_bytes + slots * 2 * max_frame_bytes
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=total)
+            self._owner = True
+            self._shm.buf[:self._header_bytes] = bytes(self._header_bytes)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+        self.name = self._shm.name
+
+    @classmethod
+    def attach(cls, name, slots, max_frame_bytes):
+        """Open an existing store (in the writer process)."""
+        return cls(slots, max_frame_bytes, name=name)
+
+    def _published(self, slot):
+        """(seq, active, width, height, nbytes) the writer last published."""
+        offset = slot * _SLOT_HEADER_BYTES
+        fields = _PUBLISHED.unpack_from(self._shm.buf, offset)
+        while True:
+            # read until two reads agree, in case a publish was half-way through
+            again = _PUBLISHED.unpack_from(self._shm.buf, offset)
+            if again == fields:
+                return fields
+            fields = again
+
+    def _publish(self, slot, seq, active, width, height, nbytes):
+        _PUBLISHED.pack_into(self._shm.buf, slot * _SLOT_HEADER_BYTES, seq, active, width, height, nbytes)
+
+    def _acked(self, slot):
+        return _ACKED.unpack_from(self._shm.buf, slot * _SLOT_HEADER_BYTES + _ACKED_OFFSET)[0]
+
+    def _ack(self, slot, seq):
+        _ACKED.pack_into(self._shm.buf, slot * _SLOT_HEADER_BYTES + _ACKED_OFFSET, seq)
+
+    def _offset(self, slot, buffer):
+        return self._header_bytes + (slot * 2 + buffer) * self.max_frame_bytes
+
+    def fits(self, nbytes):
+        return nbytes <= self.max_frame_bytes
+
+    def write(self, slot, pixels, size):
+        """Copy a frame into the slot's idle buffer and publish it.
+
+        pixels is any buffer (e.g. a memoryview of the Agg renderer).
+        Returns the new sequence number to pass to the reader.
+        """
+        view = memoryview(pixels).cast('B')
+        nbytes = len(view)
+        if not self.fits(nbytes):
+            raise ValueError('frame of %d bytes exceeds slot size %d' % (nbytes, self.max_frame_bytes))
+        seq, active, _, _, _ = self._published(slot)
+        if seq and self._acked(slot) != seq:
+            # The reader may still be showing the buffer we are about to
+            # overwrite; give it a moment to pick up the previous frame.
+            deadline = time.monotonic() + ACK_WAIT_SECONDS
+            while self._acked(slot) != seq and time.monotonic() < deadline:
+                time.sleep(0.02)
+            if self._acked(slot) != seq:
+                logging.debug('frame slot %d: reader has not taken frame %d; overwriting', slot, seq)
+        target = 1 - active if seq else 0
+        offset = self._offset(slot, target)
+        self._shm.buf[offset:offset + nbytes] = view
+        seq += 1
+        self._publish(slot, seq, target, int(size[0]), int(size[1]), nbytes)
+        return seq
+
+    def read(self, slot):
+        """Return (memoryview, size, seq) of the slot's current frame and
+        acknowledge it, or None if nothing was ever written. The view aliases
+        shared memory: wrap it (pygame.image.frombuffer) rather than copy it,
+        and drop it before close()."""
+        seq, active, width, height, nbytes = self._published(slot)
+        if not seq:
+            return None
+        offset = self._offset(slot, active)
+        view = self._shm.buf[offset:offset + nbytes]
+        self._ack(slot, seq)
+        return view, (width, height), seq
+
+    def close(self):
+        try:
+            self._shm.close()
+        except BufferError:
+            logging.debug('frame store still has live views at close')
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
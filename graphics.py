@@ -21,6 +21,7 @@ from matplotlib.dates import HourLocator, DateFormatter, AutoDateLocator
 
 from config import Config
 from constants import *
+import imagewriter
 
 __author__ = 'Jeffrey B. Otterson, N1KDO'
 __copyright__ = 'Copyright 2016, 2019, 2021, 2024, 2025 Jeffrey B. Otterson and n1mm_view maintainers'
@@ -62,10 +63,13 @@ strip_label_font = pygame.font.Font('VeraMoBd.ttf', STRIP_LABEL_FONT_SIZE)
 strip_status_font = pygame.font.Font('VeraMoBd.ttf', STRIP_STATUS_FONT_SIZE)
 view_font_height = view_font.get_height()
 
+# Raw pixel layout handed around by the chart builders. RGBA is the Agg
+# renderer's native layout (and a native PNG one), so charts can be returned as
+# a view of the renderer buffer with no conversion copy; see _canvas_image().
 if matplotlib.__version__.startswith('3.6'):  # hack for raspberry pi.
     image_format = 'RGB'
 else:
-    image_format = 'ARGB'
+    image_format = 'RGBA'
 
 logging.warning(f'set image format to {image_format}')
 _map = None
@@ -127,13 +131,44 @@ def show_graph(screen, size, surf):
     logging.debug('show_graph() done')
 
 
+# PNG output for save_image(). See imagewriter.py: pixels are encoded straight
+# from the builder's buffer and written atomically (temp file + rename).
+_image_writer = imagewriter.ImageWriter(config.PNG_COMPRESS_LEVEL, config.PNG_FILTER,
+                                        config.PNG_ENCODE_THREADS, config.IMAGE_VARIANTS)
+
+
 def save_image(image_data, image_size, filename):
     if not all(image_size):
        logging.debug('Returning early from save_image since image_size is {0,0}')
        return
-    surface = pygame.image.frombuffer(image_data, image_size, image_format)
     logging.debug('Saving file to %s', filename)
-    pygame.image.save(surface, filename)
+    _image_writer.save(image_data, image_size, image_format, filename)
+
+
+def wait_for_saved_images():
+    """Block until every image queued by save_image() is on disk. Only needed
+    when PNG_ENCODE_THREADS > 0; otherwise save_image() is already synchronous.
+    Returns the filenames that could not be written."""
+    return _image_writer.wait()
+
+
+def encode_seconds(filename):
+    """Encode and write time of the last save_image() of filename, once it has
+    finished (see wait_for_saved_images()), or None."""
+    return _image_writer.encode_seconds(filename)
+
+
+def _canvas_image(canvas):
+    """Return (raw_data, size) for a drawn Agg canvas, in image_format.
+
+    For RGBA this is a flat memoryview of the renderer's own buffer -- no copy.
+    The view keeps the renderer alive, so it stays valid after plt.close(fig).
+    """
+    if image_format == 'RGBA':
+        raw_data = canvas.buffer_rgba().cast('B')
+    else:
+        raw_data = canvas.get_renderer().tostring_rgb()
+    return raw_data, canvas.get_width_height()
 
 
 def make_blank_chart(size, title, message='— no data yet —'):
@@ -197,12 +232,7 @@ def make_barh(size, values, labels, title):
 
     canvas = agg.FigureCanvasAgg(fig)
     canvas.draw()
-    renderer = canvas.get_renderer()
-    canvas_size = canvas.get_width_height()
-    if image_format == 'ARGB':
-        raw_data = renderer.tostring_argb()
-    else:
-        raw_data = renderer.tostring_rgb()
+    raw_data, canvas_size = _canvas_image(canvas)
 
     plt.close(fig)
     logging.debug('make_barh(...,...,%s) done', title)
@@ -240,12 +270,7 @@ def make_pie(size, values, labels, title):
 
     canvas = agg.FigureCanvasAgg(fig)
     canvas.draw()
-    renderer = canvas.get_renderer()
-    canvas_size = canvas.get_width_height()
-    if image_format == 'ARGB':
-        raw_data = renderer.tostring_argb()
-    else:
-        raw_data = renderer.tostring_rgb()
+    raw_data, canvas_size = _canvas_image(canvas)
 
     plt.close(fig)
 
@@ -569,14 +594,9 @@ def qso_rates_graph(size, qsos_per_hour):
         ax.xaxis.set_major_formatter(DateFormatter('%H'))
     canvas = agg.FigureCanvasAgg(fig)
     canvas.draw()
-    renderer = canvas.get_renderer()
-    if image_format == 'ARGB':
-        raw_data = renderer.tostring_argb()
-    else:
-        raw_data = renderer.tostring_rgb()
+    raw_data, canvas_size = _canvas_image(canvas)
 
     plt.close(fig)
-    canvas_size = canvas.get_width_height()
     return raw_data, canvas_size
 
 
@@ -1633,11 +1653,10 @@ def draw_new_ops_race(size, current_first_qsos, prior_op_names, prior_curve,
     if title_bb.width > fig_px * 0.98:
         ax.title.set_fontsize(ax.title.get_fontsize() * fig_px * 0.98 / title_bb.width)
         canvas.draw()
-        renderer = canvas.get_renderer()
 
-    raw_data = renderer.tostring_argb() if image_format == 'ARGB' else renderer.tostring_rgb()
+    raw_data, canvas_size = _canvas_image(canvas)
     plt.close(fig)
-    return raw_data, canvas.get_width_height()
+    return raw_data, canvas_size
 
 
 def draw_new_ops_yoy(size, yoy_rows, current_year=None, current_new_count=None,
@@ -1712,10 +1731,9 @@ def draw_new_ops_yoy(size, yoy_rows, current_year=None, current_new_count=None,
 
     canvas = agg.FigureCanvasAgg(fig)
     canvas.draw()
-    renderer = canvas.get_renderer()
-    raw_data = renderer.tostring_argb() if image_format == 'ARGB' else renderer.tostring_rgb()
+    raw_data, canvas_size = _canvas_image(canvas)
     plt.close(fig)
-    return raw_data, canvas.get_width_height()
+    return raw_data, canvas_size
 
 
 def draw_new_ops_roster(size, current_first_qsos, prior_op_names,
@@ -1957,14 +1975,9 @@ def draw_map(size, qsos_by_section):
 
     canvas = agg.FigureCanvasAgg(fig)
     canvas.draw()
-    renderer = canvas.get_renderer()
-    if image_format == 'ARGB':
-        raw_data = renderer.tostring_argb()
-    else:
-        raw_data = renderer.tostring_rgb()
+    raw_data, canvas_size = _canvas_image(canvas)
 
     fig.clf()
     plt.close(fig)
-    canvas_size = canvas.get_width_height()
     logging.debug('draw_map() done')
     return raw_data, canvas_size
@@ -5,7 +5,6 @@ create images from contest data
 non-interactive version.  This creates files on the disk and updates them periodically.
 """
 
-import gc
 import json
 import logging
 import os
@@ -15,10 +14,17 @@ import sys
 import time
 #import subprocess
 
-from config import Config, VERSION
+from config import Config, VERSION, CONFIG_NAMES
+import apidata
 import constants
 import dataaccess
 import graphics
+import dbwatch
+import imagewriter
+import publisher
+import renderpool
+import scheduler
+import telemetry
 
 __author__ = 'Jeffrey B. Otterson, N1KDO'
 __copyright__ = 'Copyright 2017 Jeffrey B. Otterson'
@@ -45,6 +51,25 @@ THEME = {
     'sidebar_min_width': '310px', # Sidebar minimum width
 }
 
+# Size of the headless chart PNGs (and the new-ops sidebar chart).
+CHART_SIZE = (1280, 1024)
+SIDEBAR_CHART_SIZE = (600, 360)
+# Displayed width of a carousel slide, for srcset (the sidebar moves below
+# the carousel on narrow screens).
+SLIDE_SIZES = '(max-width: 700px) 95vw, calc(95vw - %s)' % THEME['sidebar_width']
+
+
+def img_srcset(src, width, sizes):
+    """srcset/sizes attributes offering the IMAGE_VARIANTS of a chart PNG
+    that is width pixels wide, or '' when no variants are written."""
+    if not config.IMAGE_VARIANTS:
+        return ''
+    candidates = ['%s %dw' % (imagewriter.variant_filename(src, v), width // imagewriter.VARIANTS[v])
+                  for v in config.IMAGE_VARIANTS]
+    candidates.append('%s %dw' % (src, width))
+    return ' srcset="%s" sizes="%s"' % (', '.join(candidates), sizes)
+
+
 def makePNGTitle(image_dir, title):
     if image_dir is None:
         image_dir = './images'
@@ -53,20 +78,121 @@ def makePNGTitle(image_dir, title):
     # return ''.join([image_dir, '/', re.sub('[^\w\-_]', '_', title), '.png'])
 
 
-def save_chart(image_dir, basename, image_data, image_size, blank_size, blank_title):
-    """Persist a freshly-built chart, or a blank placeholder if the builder
-    returned no data.
-
-    The count-based chart builders return (None, ...) when there are no rows to
-    plot (e.g. every QSO was deleted). Without this, the renderer would simply
-    skip the save and leave the previous -- now stale -- PNG on disk, so a wiped
-    or fully-deleted dataset keeps showing the old contacts. Writing a blank
-    instead clears the slot to a clean placeholder.
-    """
-    if image_data is None:
-        image_data, image_size = graphics.make_blank_chart(blank_size, blank_title)
-    filename = makePNGTitle(image_dir, basename)
-    graphics.save_image(image_data, image_size, filename)
+# Default refresh policies (see scheduler.py). The map and radio panel are
+# redrawn every cycle for the grey line / staleness; the rest only when the
+# data they are built from changed.
+ON_CHANGE = scheduler.RefreshPolicy('change')
+ON_CHANGE_LOW = scheduler.RefreshPolicy('change', priority='low')
+EVERY_CYCLE = scheduler.RefreshPolicy('always')
+EVERY_CYCLE_HIGH = scheduler.RefreshPolicy('always', priority='high')
+OFF = scheduler.RefreshPolicy('off')
+
+_render_pool = None
+_scheduler = None
+_publisher = None
+_fingerprints = None
+_environment = None
+_stats = None
+_image_manifest = None
+_snapshots = None
+
+
+def _get_render_pool():
+    """The RENDER_WORKERS process pool, created on first use and kept warm
+    across cycles; None when rendering in-process. Recycling
+    (RENDER_RECYCLE_CYCLES / RENDER_RECYCLE_RSS_MB) needs a worker to
+    recycle, so it moves rendering onto one even with RENDER_WORKERS = 0."""
+    global _render_pool
+    recycle = config.RENDER_RECYCLE_CYCLES or config.RENDER_RECYCLE_RSS_MB
+    if _render_pool is None and (config.RENDER_WORKERS > 0 or recycle):
+        _render_pool = renderpool.RenderPool(max(1, config.RENDER_WORKERS),
+                                             config.RENDER_RECYCLE_CYCLES,
+                                             config.RENDER_RECYCLE_RSS_MB * 1000000)
+    return _render_pool
+
+
+def _get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = scheduler.RenderScheduler(config.RENDER_SCHEDULE, config.RENDER_BUDGET_SECONDS,
+                                               config.RENDER_WORKERS)
+    return _scheduler
+
+
+def _get_publisher(image_dir):
+    """The background publisher, or None if there is nothing to publish to."""
+    global _publisher
+    if _publisher is None:
+        targets = publisher.parse_targets(config.PUBLISH_TARGETS)
+        if config.POST_FILE_COMMAND:
+            targets.append(publisher.CommandTarget(config.POST_FILE_COMMAND))
+        if targets:
+            directory = image_dir if image_dir is not None else './images'
+            _publisher = publisher.Publisher(directory, targets, config.PUBLISH_RETRY_MAX_SECONDS)
+    return _publisher
+
+
+def _get_fingerprints(image_dir):
+    """The chart fingerprint store, kept as a dotfile next to the PNGs."""
+    global _fingerprints
+    if _fingerprints is None:
+        directory = image_dir if image_dir is not None else './images'
+        _fingerprints = renderpool.FingerprintStore(os.path.join(directory, '.chart_fingerprints.json'))
+    return _fingerprints
+
+
+def _get_stats(image_dir):
+    """The rolling render stats file (RENDER_STATS_CYCLES), or None if off."""
+    global _stats
+    if _stats is None and config.RENDER_STATS_CYCLES > 0:
+        directory = image_dir if image_dir is not None else './images'
+        _stats = telemetry.StatsFile(os.path.join(directory, telemetry.STATS_FILENAME),
+                                     config.RENDER_STATS_CYCLES)
+    return _stats
+
+
+def _get_image_manifest(image_dir):
+    """The IMAGE_DIR/manifest.json writer (IMAGE_MANIFEST), or None if off."""
+    global _image_manifest
+    if _image_manifest is None and config.IMAGE_MANIFEST:
+        directory = image_dir if image_dir is not None else './images'
+        _image_manifest = publisher.ImageManifest(directory, precompress=config.PRECOMPRESS)
+    return _image_manifest
+
+
+def _snapshot_names():
+    """The API snapshots index.html can use with the current config."""
+    names = ['last_qso', 'summary']
+    if config.SHOW_RADIO_SIDEBAR:
+        names.append('radio')
+    if config.SHOW_NEW_OPS_ROSTER:
+        names.append('new_ops')
+    return names
+
+
+def _get_snapshots(image_dir):
+    """The api_*.json snapshot writer (API_SNAPSHOTS), or None if off."""
+    global _snapshots
+    if _snapshots is None and config.API_SNAPSHOTS:
+        directory = image_dir if image_dir is not None else './images'
+        _snapshots = apidata.SnapshotWriter(directory, _snapshot_names(), precompress=config.PRECOMPRESS)
+    return _snapshots
+
+
+def _render_environment():
+    """Everything besides a chart's own data that changes how it renders:
+    the n1mm_view version, the config file and the graphics code. Folded into
+    every fingerprint so editing n1mm_view.ini or upgrading re-renders all."""
+    global _environment
+    if _environment is None:
+        parts = [VERSION]
+        for path in CONFIG_NAMES + [graphics.__file__]:
+            try:
+                parts.append('%s:%d' % (path, os.stat(path).st_mtime_ns))
+            except OSError:
+                pass
+        _environment = parts
+    return _environment
 
 
 def create_images(size, image_dir, last_qso_timestamp):
@@ -88,6 +214,8 @@ def create_images(size, image_dir, last_qso_timestamp):
 
     db = None
     data_updated = False
+    stats = telemetry.CycleStats()
+    timed = stats.timed
 
     try:
         logging.debug('connecting to database')
@@ -102,7 +230,7 @@ def create_images(size, image_dir, last_qso_timestamp):
         #      logging.debug('QSO: %s\t%s\t%s\t%s\t%s' % (row[0], row[1], row[2], row[3], row[4])) 
               
         # get timestamp from the last record in the database
-        last_qso_time, message = dataaccess.get_last_qso(cursor)
+        last_qso_time, message = timed(dataaccess.get_last_qso, cursor)
 
         # Also track the total QSO count. The last-timestamp check alone misses a
         # contactdelete that removes any QSO other than the newest (MAX(timestamp)
@@ -110,7 +238,7 @@ def create_images(size, image_dir, last_qso_timestamp):
         # sidebar would keep showing the deleted contact). Folding the count into
         # the signature forces a full regeneration whenever a QSO is added OR
         # deleted.
-        qso_count = dataaccess.get_qso_count(cursor)
+        qso_count = timed(dataaccess.get_qso_count, cursor)
         signature = (last_qso_time, qso_count)
 
         logging.debug('old_signature = %s, signature = %s' % (last_qso_timestamp, signature))
@@ -122,57 +250,62 @@ def create_images(size, image_dir, last_qso_timestamp):
             data_updated = True
 
             # load qso_operators
-            qso_operators = dataaccess.get_operators_by_qsos(cursor)
+            qso_operators = timed(dataaccess.get_operators_by_qsos, cursor)
 
             # load qso_stations -- maybe useless chartjunk
-            qso_stations = dataaccess.get_station_qsos(cursor)
+            qso_stations = timed(dataaccess.get_station_qsos, cursor)
 
             # get something else.
-            qso_band_modes = dataaccess.get_qso_band_modes(cursor)
+            qso_band_modes = timed(dataaccess.get_qso_band_modes, cursor)
 
             # load QSOs per Hour by Operator
-            operator_qso_rates = dataaccess.get_qsos_per_hour_per_operator(cursor, last_qso_time)
+            operator_qso_rates = timed(dataaccess.get_qsos_per_hour_per_operator, cursor, last_qso_time)
 
             # load QSO rates per Hour by Band
-            qsos_per_hour, qsos_per_band = dataaccess.get_qsos_per_hour_per_band(cursor)
+            qsos_per_hour, qsos_per_band = timed(dataaccess.get_qsos_per_hour_per_band, cursor)
 
             # load qso exchange data: what class are the other stations?
-            qso_classes = dataaccess.get_qso_classes(cursor)
+            qso_classes = timed(dataaccess.get_qso_classes, cursor)
 
             # load qso exchange data by category (letter only)
-            qso_categories = dataaccess.get_qso_categories(cursor)
+            qso_categories = timed(dataaccess.get_qso_categories, cursor)
 
             # load last 10 qsos
-            qsos = dataaccess.get_last_N_qsos(cursor, 10) # Note this returns last 10 qsos in reverse order so oldest is first
+            qsos = timed(dataaccess.get_last_N_qsos, cursor, 10) # Note this returns last 10 qsos in reverse order so oldest is first
 
         # load QSOs by Section/State -- always load this since map is always drawn
         if config.MULTS == 'STATES':
-            qsos_by_section = dataaccess.get_qsos_by_state(cursor)
+            qsos_by_section = timed(dataaccess.get_qsos_by_state, cursor)
         elif config.MULTS == 'ITUZONES':
-            qsos_by_section = dataaccess.get_qsos_by_ituzone(cursor)
+            qsos_by_section = timed(dataaccess.get_qsos_by_ituzone, cursor)
         elif config.MULTS == 'CQZONES':
-            qsos_by_section = dataaccess.get_qsos_by_cqzone(cursor)
+            qsos_by_section = timed(dataaccess.get_qsos_by_cqzone, cursor)
         elif config.MULTS == 'GRID':
-            qsos_by_section = dataaccess.get_qsos_by_grid(cursor)
+            qsos_by_section = timed(dataaccess.get_qsos_by_grid, cursor)
         else:
-            qsos_by_section = dataaccess.get_qsos_by_section(cursor)
+            qsos_by_section = timed(dataaccess.get_qsos_by_section, cursor)
         logging.debug("get_qsos_by_section returned %s qsos" % (qsos_by_section))
 
         # load IARU HQ-station multiplier counts (independent of the zone map)
-        qsos_by_hq = dataaccess.get_qsos_by_hq(cursor) if config.SHOW_HQ_STATIONS else {}
+        qsos_by_hq = timed(dataaccess.get_qsos_by_hq, cursor) if config.SHOW_HQ_STATIONS else {}
 
         # load the WRTC special-callsign roster + worked counts. The roster file
         # is re-read every cycle so calls issued mid-event show up without a
         # restart; qsos_by_wrtc is the subset of that roster found in the log.
         if config.SHOW_WRTC:
             wrtc_calls = dataaccess.load_wrtc_callsigns(config.WRTC_CALLSIGNS_FILE)
-            qsos_by_wrtc = dataaccess.get_qsos_by_wrtc(cursor, wrtc_calls)
+            qsos_by_wrtc = timed(dataaccess.get_qsos_by_wrtc, cursor, wrtc_calls)
         else:
             wrtc_calls = []
             qsos_by_wrtc = {}
 
         # load radio info
-        radio_info = dataaccess.get_radio_info(cursor)
+        radio_info = timed(dataaccess.get_radio_info, cursor)
+
+        # static copies of the live API for mirrors without webserver.py
+        snapshots = _get_snapshots(image_dir)
+        if snapshots is not None:
+            timed(snapshots.write_snapshots, cursor)
 
         logging.info('load data done')
     except sqlite3.OperationalError as error:
@@ -185,103 +318,79 @@ def create_images(size, image_dir, last_qso_timestamp):
             db.close()
             db = None
 
+    # Every output for this cycle is described as a renderpool.ChartJob; the
+    # builders run afterwards, either here or on the render pool. A job with a
+    # blank placeholder writes it when the builder returns no data (e.g. all
+    # QSOs deleted), so the slot clears instead of keeping a stale PNG.
+    # Each job is fingerprinted from its builder and data, so an unchanged
+    # chart isn't re-rendered; volatile charts also depend on the clock.
+    # Jobs are offered to the scheduler with a default refresh policy that
+    # [RENDER SCHEDULE] in the ini can override per basename.
+    sched = _get_scheduler()
+
+    def chart(builder, args, basename, blank_title=None, kwargs=None, collect=False, volatile=False,
+              policy=ON_CHANGE, extra=None):
+        if config.BROWSER_CHARTS and basename in apidata.BROWSER_CHARTS:
+            policy = OFF  # drawn by the browser at /charts instead
+        blank = (size, blank_title) if blank_title is not None else None
+        kwargs = kwargs or {}
+        fp = None if volatile else renderpool.fingerprint(
+            _render_environment(), builder.__name__, args, kwargs, blank, extra)
+        job = renderpool.ChartJob(builder, args, kwargs, makePNGTitle(image_dir, basename),
+                                  blank, collect, fp)
+        sched.offer(basename, job, policy)
+
     if data_updated:
-        # (builder thunk, basename, blank-placeholder title). Builders are called
-        # lazily inside the try below so one failure can't skip the rest. When a
-        # builder returns no data (e.g. all QSOs deleted) save_chart() writes a
-        # blank so the slot clears instead of keeping the previous, stale PNG.
-        count_charts = [
-            (lambda: graphics.qso_summary_table(size, qso_band_modes),      'qso_summary_table',       'QSO Summary'),
-            (lambda: graphics.qso_rates_table(size, operator_qso_rates),    'qso_rates_table',         'QSO Rates'),
-            (lambda: graphics.qso_operators_graph(size, qso_operators),     'qso_operators_graph',     'QSOs by Operator'),
-            (lambda: graphics.qso_operators_table(size, qso_operators),     'qso_operators_table',     'Operator Totals'),
-            (lambda: graphics.qso_operators_table_all(size, qso_operators), 'qso_operators_table_all', 'All Operator Stats'),
-            (lambda: graphics.qso_bands_graph(size, qso_band_modes),        'qso_bands_graph',         'QSOs by Band'),
-            (lambda: graphics.qso_modes_graph(size, qso_band_modes),        'qso_modes_graph',         'QSOs by Mode'),
-            (lambda: graphics.qso_rates_graph(size, qsos_per_hour),         'qso_rates_graph',         'QSO Rate Over Time'),
-            (lambda: graphics.qso_table(size, qsos),                        'last_qso_table',          'Recent QSOs'),
-        ]
+        chart(graphics.qso_summary_table,       (size, qso_band_modes),     'qso_summary_table',       'QSO Summary')
+        chart(graphics.qso_rates_table,         (size, operator_qso_rates), 'qso_rates_table',         'QSO Rates')
+        chart(graphics.qso_operators_graph,     (size, qso_operators),      'qso_operators_graph',     'QSOs by Operator')
+        chart(graphics.qso_operators_table,     (size, qso_operators),      'qso_operators_table',     'Operator Totals')
+        chart(graphics.qso_operators_table_all, (size, qso_operators),      'qso_operators_table_all', 'All Operator Stats')
+        chart(graphics.qso_bands_graph,         (size, qso_band_modes),     'qso_bands_graph',         'QSOs by Band')
+        chart(graphics.qso_modes_graph,         (size, qso_band_modes),     'qso_modes_graph',         'QSOs by Mode')
+        chart(graphics.qso_rates_graph,         (size, qsos_per_hour),      'qso_rates_graph',         'QSO Rate Over Time')
+        chart(graphics.qso_table,               (size, qsos),               'last_qso_table',          'Recent QSOs')
         # Optional base charts (see config): skip the builder entirely when off,
         # so no PNG is generated and the slot won't appear in the carousel.
         if config.SHOW_QSOS_BY_STATION:
-            count_charts.append((lambda: graphics.qso_stations_graph(size, qso_stations),   'qso_stations_graph',    'QSOs by Station'))
+            chart(graphics.qso_stations_graph,   (size, qso_stations),   'qso_stations_graph',   'QSOs by Station')
         if config.SHOW_QSOS_BY_CLASS:
-            count_charts.append((lambda: graphics.qso_classes_graph(size, qso_classes),     'qso_classes_graph',     'QSOs by Class'))
+            chart(graphics.qso_classes_graph,    (size, qso_classes),    'qso_classes_graph',    'QSOs by Class')
         if config.SHOW_QSOS_BY_CATEGORY:
-            count_charts.append((lambda: graphics.qso_categories_graph(size, qso_categories), 'qso_categories_graph', 'QSOs by Category'))
-        for builder, basename, blank_title in count_charts:
-            try:
-                image_data, image_size = builder()
-                save_chart(image_dir, basename, image_data, image_size, size, blank_title)
-            except Exception as e:
-                logging.exception(e)
+            chart(graphics.qso_categories_graph, (size, qso_categories), 'qso_categories_graph', 'QSOs by Category')
 
-    # map gets updated every time so grey line moves
-    try:
-       # There is a memory leak in the next code -- is there?
-       image_data, image_size = graphics.draw_map(size, qsos_by_section)
-       if image_data is not None:
-          filename = makePNGTitle(image_dir, 'sections_worked_map')
-          graphics.save_image(image_data, image_size, filename)
-          gc.collect()
-       else:
-          logging.debug('image_data was None when drawing map')
-
-    except Exception as e:
-        logging.exception(e)
+    # map gets updated every time so grey line moves; collect afterwards since
+    # the Cartopy figure leaks otherwise
+    # The grey line moves, so the map's fingerprint includes the current
+    # HEADLESS_DWELL_TIME period as well: it is redrawn when the worked counts
+    # change, and at least once a dwell otherwise.
+    dwell_period = int(time.time() // max(1, config.HEADLESS_DWELL_TIME))
+    chart(graphics.draw_map, (size, qsos_by_section), 'sections_worked_map', collect=True,
+          policy=EVERY_CYCLE_HIGH, extra=dwell_period)
 
     if config.SHOW_RADIO_INFO:
-        try:
-            image_data, image_size = graphics.draw_radio_info(size, radio_info)
-            if image_data is not None:
-                filename = makePNGTitle(image_dir, 'radio_info')
-                graphics.save_image(image_data, image_size, filename)
-        except Exception as e:
-            logging.exception(e)
+        # volatile: radios dim once their last update is STALE seconds old
+        chart(graphics.draw_radio_info, (size, radio_info), 'radio_info', volatile=True,
+              policy=EVERY_CYCLE_HIGH)
 
     if config.SHOW_MULT_PROGRESS:
-        try:
-            image_data, image_size = graphics.draw_mults_progress(size, qsos_by_section)
-            if image_data is not None:
-                filename = makePNGTitle(image_dir, 'mults_progress')
-                graphics.save_image(image_data, image_size, filename)
-        except Exception as e:
-            logging.exception(e)
+        chart(graphics.draw_mults_progress, (size, qsos_by_section), 'mults_progress', policy=EVERY_CYCLE)
 
     if config.SHOW_MULT_REMAINING:
-        try:
-            image_data, image_size = graphics.draw_mults_remaining(size, qsos_by_section)
-            if image_data is not None:
-                filename = makePNGTitle(image_dir, 'mults_remaining')
-                graphics.save_image(image_data, image_size, filename)
-        except Exception as e:
-            logging.exception(e)
+        chart(graphics.draw_mults_remaining, (size, qsos_by_section), 'mults_remaining', policy=EVERY_CYCLE)
 
     if config.SHOW_HQ_STATIONS:
-        try:
-            image_data, image_size = graphics.draw_hq_stations(size, qsos_by_hq)
-            if image_data is not None:
-                filename = makePNGTitle(image_dir, 'hq_stations')
-                graphics.save_image(image_data, image_size, filename)
-        except Exception as e:
-            logging.exception(e)
+        chart(graphics.draw_hq_stations, (size, qsos_by_hq), 'hq_stations', policy=EVERY_CYCLE)
 
     if config.SHOW_WRTC:
-        try:
-            image_data, image_size = graphics.draw_wrtc_stations(size, qsos_by_wrtc, wrtc_calls)
-            # save_chart writes a blank "WRTC Stations Worked" placeholder when
-            # the roster is still empty (calls not yet issued), so the slide is
-            # never a broken/stale image.
-            save_chart(image_dir, 'wrtc_stations', image_data, image_size, size, 'WRTC Stations Worked')
-        except Exception as e:
-            logging.exception(e)
+        # Blank "WRTC Stations Worked" placeholder while the roster is still
+        # empty (calls not yet issued), so the slide is never a broken/stale image.
+        chart(graphics.draw_wrtc_stations, (size, qsos_by_wrtc, wrtc_calls), 'wrtc_stations',
+              'WRTC Stations Worked', policy=EVERY_CYCLE)
 
     if data_updated and config.SHOW_OPERATOR_LEADERBOARD:
-        try:
-            image_data, image_size = graphics.draw_operator_leaderboard(size, qso_operators)
-            save_chart(image_dir, 'operator_leaderboard', image_data, image_size, size, 'Operator Leaderboard')
-        except Exception as e:
-            logging.exception(e)
+        chart(graphics.draw_operator_leaderboard, (size, qso_operators), 'operator_leaderboard',
+              'Operator Leaderboard')
 
     # New-operator displays: race-curve, roster, and YOY bar. Prior-ops data
     # comes from PRIOR_OPERATORS_DB (built by utils/import_prior_operators.py) with
@@ -310,64 +419,76 @@ def create_images(size, image_dir, last_qso_timestamp):
                 if config.SHOW_NEW_OPS_RACE else []
 
             if config.SHOW_NEW_OPS_RACE:
-                try:
-                    image_data, image_size = graphics.draw_new_ops_race(
-                        size, cur_first, prior_names, prior_curve,
-                        prior_new_curve=prior_new_curve,
-                        prior_event_label=config.PRIOR_EVENT_LABEL)
-                    if image_data is not None:
-                        filename = makePNGTitle(image_dir, 'new_ops_race')
-                        graphics.save_image(image_data, image_size, filename)
-                except Exception as e:
-                    logging.exception(e)
+                chart(graphics.draw_new_ops_race, (size, cur_first, prior_names, prior_curve), 'new_ops_race',
+                      kwargs=dict(prior_new_curve=prior_new_curve,
+                                  prior_event_label=config.PRIOR_EVENT_LABEL))
 
             if config.SHOW_NEW_OPS_ROSTER:
-                try:
-                    image_data, image_size = graphics.draw_new_ops_roster(
-                        size, cur_first, prior_names, event_label=config.EVENT_NAME)
-                    if image_data is not None:
-                        filename = makePNGTitle(image_dir, 'new_ops_roster')
-                        graphics.save_image(image_data, image_size, filename)
-                except Exception as e:
-                    logging.exception(e)
+                chart(graphics.draw_new_ops_roster, (size, cur_first, prior_names), 'new_ops_roster',
+                      kwargs=dict(event_label=config.EVENT_NAME))
 
             if config.SHOW_NEW_OPS_YOY:
-                try:
-                    yoy_rows = dataaccess.get_yoy_new_op_counts(
-                        getattr(config, 'PRIOR_OPERATORS_DB', ''),
-                        event_label_regex=getattr(config, 'YOY_EVENT_REGEX', None))
-                    cur_year = config.EVENT_START_TIME.year
-                    cur_new = sum(1 for r in cur_first
-                                  if r['name'].strip().lower() not in prior_names)
-                    cur_total = len(cur_first)
-                    # Sidebar-sized PNG (width ~ sidebar_width px, modest height).
-                    sidebar_size = (600, 360)
-                    image_data, image_size = graphics.draw_new_ops_yoy(
-                        sidebar_size, yoy_rows, current_year=cur_year,
-                        current_new_count=cur_new, current_total_count=cur_total)
-                    if image_data is not None:
-                        filename = makePNGTitle(image_dir, 'new_ops_yoy')
-                        graphics.save_image(image_data, image_size, filename)
-                    # Also render a slide-sized variant for the carousel.
-                    image_data, image_size = graphics.draw_new_ops_yoy(
-                        size, yoy_rows, current_year=cur_year,
-                        current_new_count=cur_new, current_total_count=cur_total)
-                    if image_data is not None:
-                        filename = makePNGTitle(image_dir, 'new_ops_yoy_slide')
-                        graphics.save_image(image_data, image_size, filename)
-                except Exception as e:
-                    logging.exception(e)
+                yoy_rows = dataaccess.get_yoy_new_op_counts(
+                    getattr(config, 'PRIOR_OPERATORS_DB', ''),
+                    event_label_regex=getattr(config, 'YOY_EVENT_REGEX', None))
+                cur_new = sum(1 for r in cur_first
+                              if r['name'].strip().lower() not in prior_names)
+                yoy_kwargs = dict(current_year=config.EVENT_START_TIME.year,
+                                  current_new_count=cur_new, current_total_count=len(cur_first))
+                # Sidebar-sized PNG (width ~ sidebar_width px, modest height).
+                sidebar_size = SIDEBAR_CHART_SIZE
+                chart(graphics.draw_new_ops_yoy, (sidebar_size, yoy_rows), 'new_ops_yoy', kwargs=yoy_kwargs,
+                      policy=ON_CHANGE_LOW)
+                # Also render a slide-sized variant for the carousel.
+                chart(graphics.draw_new_ops_yoy, (size, yoy_rows), 'new_ops_yoy_slide', kwargs=yoy_kwargs,
+                      policy=ON_CHANGE_LOW)
         except Exception as e:
             logging.exception(e)
 
-    #if data_updated:   # Data is always updated since the sections map is always updated. Let rsync command handle this.
-    if config.POST_FILE_COMMAND is not None:
-       logging.debug('Executing command %s' % (config.POST_FILE_COMMAND))
-       #subprocess is for a future change as os.system is deprecated
-       #args=[]
-       #args.append(config.POST_FILE_COMMAND)
-       #subprocess.run(args,capture_output=False);
-       os.system(config.POST_FILE_COMMAND)
+    fingerprints = None
+    if config.CHART_FINGERPRINTS and not config.SKIP_TIMESTAMP_CHECK:
+        fingerprints = _get_fingerprints(image_dir)
+    jobs = sched.select(is_current=fingerprints.is_current if fingerprints is not None else None)
+    render_start = time.perf_counter()
+    results = renderpool.run_jobs(jobs, _get_render_pool(), fingerprints)
+    stats.step('render', time.perf_counter() - render_start)
+    stats.add_results(results)
+    sched.record(results)
+
+    # Background PNG encodes (PNG_ENCODE_THREADS) must land before anything
+    # reads IMAGE_DIR.
+    wait_start = time.perf_counter()
+    graphics.wait_for_saved_images()
+    stats.step('encode_wait', time.perf_counter() - wait_start)
+
+    # Content hashes for index.html's image URLs, before anything is
+    # published so a mirror never gets a manifest without its images.
+    manifest = _get_image_manifest(image_dir)
+    if manifest is not None:
+        manifest_start = time.perf_counter()
+        manifest.update()
+        stats.step('manifest', time.perf_counter() - manifest_start)
+
+    # Hand IMAGE_DIR to the publisher (PUBLISH_TARGETS / POST_FILE_COMMAND).
+    # It works out what changed and sends it in the background.
+    pub = _get_publisher(image_dir)
+    if pub is not None:
+        publish_start = time.perf_counter()
+        pub.notify()
+        stats.step('publish', time.perf_counter() - publish_start)
+        statuses = pub.status()
+        stats.extra['publish'] = [{k: st[k] for k in ('target', 'pending', 'lag_seconds', 'last_error')}
+                                  for st in statuses]
+        for status in statuses:
+            if status['pending']:
+                logging.info('publish to %s behind by %.0fs (%d files pending%s)',
+                             status['target'], status['lag_seconds'], status['pending'],
+                             ', last error: %s' % status['last_error'] if status['last_error'] else '')
+
+    stats_file = _get_stats(image_dir)
+    if stats_file is not None:
+        stats.extra['data_updated'] = data_updated
+        stats_file.add(stats.finish())
 
     return signature
 
@@ -384,6 +505,7 @@ def write_index_html(image_dir):
     end_iso = config.EVENT_END_TIME.strftime('%Y-%m-%dT%H:%M:%SZ')
     event_name_json = json.dumps(event_name)
     radio_poll = max(1, getattr(config, 'RADIO_POLL_SECONDS', 2))
+    api_stream = 'true' if getattr(config, 'API_STREAM', False) else 'false'
 
     # Server-rendered fallback for the "Last QSO" header. The header is normally
     # populated live by polling /api/last_qso, but rsync'd remote copies have no
@@ -475,6 +597,16 @@ def write_index_html(image_dir):
     for title, url in getattr(config, 'EXTERNAL_SLIDES', []):
         slides.append((title, url, 'iframe'))
 
+    if config.BROWSER_CHARTS:
+        # show webserver.py's browser drawing in place of each PNG headless
+        # no longer renders (unless [RENDER SCHEDULE] brought it back)
+        sched = _get_scheduler()
+        for i, (title, src, kind) in enumerate(slides):
+            basename = src[:-len('.png')]
+            name = apidata.BROWSER_CHARTS.get(basename)
+            if kind == 'img' and name and sched.policy(basename, OFF).when == 'off':
+                slides[i] = (title, 'charts?chart=%s&embed=1' % name, 'iframe')
+
     def _slide_html(title, src, kind):
         title_esc = title.replace('<', '&lt;').replace('>', '&gt;')
         if kind == 'iframe':
@@ -497,10 +629,12 @@ def write_index_html(image_dir):
         return (
             f'  <div class="slide" data-kind="img">'
             f'<h2>{title_esc}</h2>\n'
-            f'    <img src="{src}" alt="{title_esc}"></div>'
+            f'    <img src="{src}"{img_srcset(src, CHART_SIZE[0], SLIDE_SIZES)} alt="{title_esc}"></div>'
         )
 
     slides_html = '\n'.join(_slide_html(t, s, k) for t, s, k in slides)
+    # the sidebar is full width on narrow screens, sidebar_width otherwise
+    sidebar_sizes = '(max-width: 700px) 100vw, %s' % THEME['sidebar_width']
 
     # Sidebar content - always visible.
     # The radio section keeps the static PNG (so rsync'd remote copies still
@@ -509,10 +643,10 @@ def write_index_html(image_dir):
     # HTML; otherwise the PNG stays visible.
     sidebar_radio = ''
     if config.SHOW_RADIO_SIDEBAR:
-        sidebar_radio = '''
+        sidebar_radio = f'''
       <div class="sidebar-section radio-section">
         <h3>Radio Status</h3>
-        <img id="sidebar-radio" src="radio_info.png" alt="Radio Status">
+        <img id="sidebar-radio" src="radio_info.png"{img_srcset('radio_info.png', CHART_SIZE[0], sidebar_sizes)} alt="Radio Status">
         <div id="radio-live" hidden></div>
       </div>'''
 
@@ -520,10 +654,10 @@ def write_index_html(image_dir):
     # #new-ops-live panel that the JS poller populates from /api/new_ops.
     sidebar_new_ops = ''
     if config.SHOW_NEW_OPS_ROSTER:
-        sidebar_new_ops = '''
+        sidebar_new_ops = f'''
       <div class="sidebar-section new-ops-section">
         <h3>New Operators</h3>
-        <img id="sidebar-new-ops" src="new_ops_roster.png" alt="New Operators">
+        <img id="sidebar-new-ops" src="new_ops_roster.png"{img_srcset('new_ops_roster.png', CHART_SIZE[0], sidebar_sizes)} alt="New Operators">
         <div id="new-ops-live" hidden></div>
       </div>'''
 
@@ -532,10 +666,10 @@ def write_index_html(image_dir):
     # reflects the live count).
     sidebar_yoy = ''
     if config.SHOW_NEW_OPS_YOY:
-        sidebar_yoy = '''
+        sidebar_yoy = f'''
       <div class="sidebar-section yoy-section">
         <h3>New Ops Year-Over-Year</h3>
-        <img id="sidebar-yoy" src="new_ops_yoy.png" alt="New Operators Year-Over-Year">
+        <img id="sidebar-yoy" src="new_ops_yoy.png"{img_srcset('new_ops_yoy.png', SIDEBAR_CHART_SIZE[0], sidebar_sizes)} alt="New Operators Year-Over-Year">
       </div>'''
 
     t = THEME  # Shorthand for template
@@ -919,7 +1053,7 @@ def write_index_html(image_dir):
 {sidebar_yoy}
     <div class="sidebar-section">
       <h3>Recent QSOs</h3>
-      <img id="sidebar-qsos" src="last_qso_table.png" alt="Recent QSOs">
+      <img id="sidebar-qsos" src="last_qso_table.png"{img_srcset('last_qso_table.png', CHART_SIZE[0], sidebar_sizes)} alt="Recent QSOs">
     </div>
   </div>
 
@@ -953,6 +1087,112 @@ def write_index_html(image_dir):
     if (data && data.server_time) clockSkewMs = data.server_time * 1000 - Date.now();
   }}
 
+  // --- Live API, or headless's snapshots of it --------------------------
+  // fetchApi('radio') asks webserver.py for the radio section. Calls made
+  // within batchMs of each other go out as one /api/dashboard request that
+  // carries the version of each section already held; a section the server
+  // reports unchanged is answered from that copy. A copy of this page on
+  // another web server has no API, so when that fails the page reads
+  // api_radio.json instead, the snapshot headless writes next to the charts
+  // (API_SNAPSHOTS); after a 404 it stops asking the API. A snapshot's
+  // server_time is when it was written, so it is moved to snapshot_time and
+  // replaced by now: radio ages keep counting when the snapshots stop, and the
+  // clock skew is not taken from it.
+  var apiMissing = false;
+  var snapshotMs = 30000;  // snapshots change at most once per headless cycle
+
+  function fetchSnapshot(name) {{
+    return fetch('api_' + name + '.json', {{cache: 'no-store'}}).then(function(resp) {{
+      if (!resp.ok) throw new Error('HTTP ' + resp.status);
+      return resp.json();
+    }}).then(function(data) {{
+      data.snapshot = true;
+      data.snapshot_time = data.server_time;
+      data.server_time = Math.floor((Date.now() + clockSkewMs) / 1000);
+      return data;
+    }});
+  }}
+
+  var held = {{}};    // section name -> {{version, data}} as last received
+  var batch = null;  // section name -> callers waiting on the next request
+  var batchMs = 50;
+
+  function flushBatch() {{
+    var waiting = batch;
+    batch = null;
+    var query = Object.keys(waiting).map(function(name) {{
+      return name + '=' + encodeURIComponent(held[name] ? held[name].version : '');
+    }}).join('&');
+    var ctrl = (typeof AbortController !== 'undefined') ? new AbortController() : null;
+    var timeoutId = ctrl ? setTimeout(function() {{ ctrl.abort(); }}, 4000) : null;
+    var opts = ctrl ? {{ signal: ctrl.signal, cache: 'no-store' }} : {{ cache: 'no-store' }};
+    fetch('api/dashboard?' + query, opts).then(function(resp) {{
+      if (resp.status === 404) apiMissing = true;
+      if (!resp.ok) throw new Error('HTTP ' + resp.status);
+      return resp.json();
+    }}).then(function(bundle) {{
+      if (timeoutId) clearTimeout(timeoutId);
+      Object.keys(waiting).forEach(function(name) {{
+        var section = bundle.sections[name];
+        if (section && section.data) held[name] = {{ version: section.version, data: section.data }};
+        waiting[name].forEach(function(caller) {{
+          if (section && held[name]) {{
+            caller.resolve(Object.assign({{}}, held[name].data, {{ server_time: bundle.server_time }}));
+          }} else {{
+            caller.reject(new Error('no ' + name + ' section'));
+          }}
+        }});
+      }});
+    }}).catch(function(err) {{
+      if (timeoutId) clearTimeout(timeoutId);
+      Object.keys(waiting).forEach(function(name) {{
+        waiting[name].forEach(function(caller) {{ caller.reject(err); }});
+      }});
+    }});
+  }}
+
+  function fetchApi(name) {{
+    if (apiMissing) return fetchSnapshot(name);
+    return new Promise(function(resolve, reject) {{
+      if (!batch) {{
+        batch = {{}};
+        setTimeout(flushBatch, batchMs);
+      }}
+      (batch[name] = batch[name] || []).push({{ resolve: resolve, reject: reject }});
+    }}).catch(function() {{
+      return fetchSnapshot(name);
+    }});
+  }}
+
+  // --- Push channel ----------------------------------------------------
+  // Where webserver.py offers /api/stream (API_STREAM), one EventSource
+  // carries the radio, last-QSO and new-ops updates the moment they change,
+  // and the pollers below stand down while it is open. They take over again
+  // if it drops (the browser reconnects it by itself); a refused stream
+  // (404/503, or a copy of this page without the API) leaves them to it.
+  var stream = (function() {{
+    var handlers = {{}};
+    var self = {{ open: false }};
+    self.on = function(name, fn) {{ handlers[name] = fn; }};
+    self.start = function() {{
+      var names = Object.keys(handlers);
+      if (!{api_stream} || apiMissing || typeof EventSource === 'undefined' || !names.length) return;
+      var source = new EventSource('api/stream?topics=' + names.join(','));
+      source.onopen = function() {{ self.open = true; }};
+      source.onerror = function() {{ self.open = false; }};
+      names.forEach(function(name) {{
+        source.addEventListener(name, function(e) {{
+          var data;
+          try {{ data = JSON.parse(e.data); }} catch (err) {{ return; }}
+          self.open = true;
+          noteServerTime(data);
+          handlers[name](data);
+        }});
+      }});
+    }};
+    return self;
+  }})();
+
   // --- Clock + countdown ------------------------------------------------
   var startMs = Date.parse('{start_iso}');
   var endMs = Date.parse('{end_iso}');
@@ -1018,6 +1258,8 @@ def write_index_html(image_dir):
     cur = (n + slides.length) % slides.length;
     slides[cur].classList.add('active');
     dots[cur].classList.add('active');
+    versionSlide(cur);
+    versionSlide(cur + 1);  // preload the next slide
   }}
 
   function go(n) {{
@@ -1025,14 +1267,74 @@ def write_index_html(image_dir):
     resetTimer();
   }}
 
+  // --- Content-hashed images --------------------------------------------
+  // headless writes manifest.json ({{images: {{name: hash}}}}) as charts
+  // change. Images are then loaded as name.png?v=<hash>, which the server
+  // lets the browser cache for good, so a chart that did not change costs
+  // nothing and only the small manifest is polled. Slides are switched to a
+  // new hash one ahead of being shown (preloading the next slide), the
+  // sidebar straight away. Without a manifest (IMAGE_MANIFEST off, or an old
+  // copy of the site) imageHashes stays null and images are reloaded on a
+  // timer as before.
+  var imageHashes = null;
+
+  function versioned(url) {{
+    var name = url.split('?')[0];
+    var hash = imageHashes[name];
+    return hash ? name + '?v=' + hash : url;
+  }}
+
+  function versionImage(img) {{
+    var src = img.getAttribute('src');
+    if (src && versioned(src) !== src) img.setAttribute('src', versioned(src));
+    var srcset = img.getAttribute('srcset');
+    if (srcset) {{
+      var next = srcset.split(', ').map(function(c) {{
+        var p = c.split(' ');
+        return versioned(p[0]) + ' ' + p[1];
+      }}).join(', ');
+      if (next !== srcset) img.setAttribute('srcset', next);
+    }}
+  }}
+
+  function versionSlide(n) {{
+    if (!slides.length) return;
+    var img = slides[(n + slides.length) % slides.length].querySelector('img');
+    if (img && imageHashes) versionImage(img);
+  }}
+
+  function pollManifest() {{
+    fetch('manifest.json', {{cache: 'no-store'}}).then(function(resp) {{
+      if (!resp.ok) throw new Error('HTTP ' + resp.status);
+      return resp.json();
+    }}).then(function(data) {{
+      if (!data || !data.images) return;
+      imageHashes = data.images;
+      document.querySelectorAll('.sidebar img').forEach(versionImage);
+      versionSlide(cur);
+      versionSlide(cur + 1);
+    }}).catch(function() {{ /* keep the last hashes, or the timed reloads */ }});
+  }}
+
+  // Re-fetch an image, including whichever srcset size the browser chose.
+  function bust(img, t) {{
+    img.src = img.src.split('?')[0] + '?t=' + t;
+    if (img.srcset) {{
+      img.srcset = img.srcset.split(', ').map(function(c) {{
+        var p = c.split(' ');
+        return p[0].split('?')[0] + '?t=' + t + ' ' + p[1];
+      }}).join(', ');
+    }}
+  }}
+
   function advance() {{
     show(cur + 1);
     // reload carousel images when we wrap around to bust cache
-    if (cur === 0) {{
+    if (cur === 0 && !imageHashes) {{
       var t = Date.now();
       slides.forEach(function(s) {{
         var img = s.querySelector('img');
-        if (img) img.src = img.src.split('?')[0] + '?t=' + t;
+        if (img) bust(img, t);
       }});
     }}
   }}
@@ -1044,20 +1346,24 @@ def write_index_html(image_dir):
 
   // Refresh sidebar images periodically
   function refreshSidebar() {{
+    if (imageHashes) return;  // pollManifest keeps them current
     var t = Date.now();
     var radioImg = document.getElementById('sidebar-radio');
     var qsosImg = document.getElementById('sidebar-qsos');
-    if (radioImg) radioImg.src = radioImg.src.split('?')[0] + '?t=' + t;
-    if (qsosImg) qsosImg.src = qsosImg.src.split('?')[0] + '?t=' + t;
+    if (radioImg) bust(radioImg, t);
+    if (qsosImg) bust(qsosImg, t);
   }}
   setInterval(refreshSidebar, sidebarRefresh);
+  pollManifest();
+  setInterval(pollManifest, sidebarRefresh);
 
   // --- Live radio polling ----------------------------------------------
   // Tries /api/radio. When served from the Pi running webserver.py, it
   // succeeds and we swap the static radio_info.png for an HTML panel that
   // refreshes every {radio_poll}s. When the page is served from somewhere
-  // else (e.g. an rsync'd remote site), /api/radio 404s and we leave the
-  // PNG in place — same behavior as before this feature existed.
+  // else (e.g. an rsync'd remote site), /api/radio 404s and the panel is fed
+  // from api_radio.json instead; with neither we leave the PNG in place —
+  // same behavior as before this feature existed.
   (function setupRadioLive() {{
     var liveEl = document.getElementById('radio-live');
     var pngEl = document.getElementById('sidebar-radio');
@@ -1220,22 +1526,30 @@ def write_index_html(image_dir):
       liveEl.hidden = false;
     }}
 
+    var latest = null;
+    function apply(data) {{
+      latest = data;
+      enterLiveMode();
+      clearDisconnected();
+      renderRadios(data);
+    }}
+    stream.on('radio', apply);
+
     function poll() {{
-      var ctrl = (typeof AbortController !== 'undefined') ? new AbortController() : null;
-      var timeoutId = ctrl ? setTimeout(function() {{ ctrl.abort(); }}, 4000) : null;
-      var opts = ctrl ? {{ signal: ctrl.signal, cache: 'no-store' }} : {{ cache: 'no-store' }};
-      fetch('api/radio', opts).then(function(resp) {{
-        if (timeoutId) clearTimeout(timeoutId);
-        if (!resp.ok) throw new Error('HTTP ' + resp.status);
-        return resp.json();
-      }}).then(function(data) {{
-        noteServerTime(data);
-        enterLiveMode();
-        clearDisconnected();
-        renderRadios(data);
+      if (stream.open) {{
+        // Pushed only on change: keep the ages ticking in between.
+        if (latest) {{
+          latest.server_time = Math.floor((Date.now() + clockSkewMs) / 1000);
+          renderRadios(latest);
+        }}
         setTimeout(poll, pollMs);
+        return;
+      }}
+      fetchApi('radio').then(function(data) {{
+        if (!data.snapshot) noteServerTime(data);
+        apply(data);
+        setTimeout(poll, data.snapshot ? snapshotMs : pollMs);
       }}).catch(function() {{
-        if (timeoutId) clearTimeout(timeoutId);
         if (liveMode) {{
           markDisconnected();
           setTimeout(poll, pollMs);
@@ -1252,7 +1566,8 @@ def write_index_html(image_dir):
   // --- Live last-QSO header --------------------------------------------
   // Poll /api/last_qso on the same cadence as the radio panel so the header
   // surfaces "what did we just work" within ~RADIO_POLL_SECONDS of the QSO
-  // landing in the DB. Falls back silently if the endpoint isn't reachable.
+  // landing in the DB. Falls back to the api_last_qso.json snapshot, then
+  // silently to the baked-in QSO, if the endpoint isn't reachable.
   (function setupLastQsoHeader() {{
     var el = document.getElementById('last-qso-text');
     if (!el) return;
@@ -1260,7 +1575,7 @@ def write_index_html(image_dir):
     var retryMs = 30000;
     var liveMode = false;
     // Server-rendered fallback baked in at page-generation time (or null). This
-    // is what rsync'd remote copies show, since they can't reach /api/last_qso.
+    // is what rsync'd remote copies show until api_last_qso.json is read.
     var current = {last_qso_json};
 
     function pad2(n) {{ return (n < 10 ? '0' : '') + n; }}
@@ -1322,22 +1637,23 @@ def write_index_html(image_dir):
       }}
     }}
 
+    function apply(data) {{
+      liveMode = true;
+      current = (data && data.last_qso) ? data.last_qso : null;
+      render();
+    }}
+    stream.on('last_qso', apply);
+
     function poll() {{
-      var ctrl = (typeof AbortController !== 'undefined') ? new AbortController() : null;
-      var timeoutId = ctrl ? setTimeout(function() {{ ctrl.abort(); }}, 4000) : null;
-      var opts = ctrl ? {{ signal: ctrl.signal, cache: 'no-store' }} : {{ cache: 'no-store' }};
-      fetch('api/last_qso', opts).then(function(resp) {{
-        if (timeoutId) clearTimeout(timeoutId);
-        if (!resp.ok) throw new Error('HTTP ' + resp.status);
-        return resp.json();
-      }}).then(function(data) {{
-        noteServerTime(data);
-        liveMode = true;
-        current = (data && data.last_qso) ? data.last_qso : null;
-        render();
+      if (stream.open) {{
         setTimeout(poll, pollMs);
+        return;
+      }}
+      fetchApi('last_qso').then(function(data) {{
+        if (!data.snapshot) noteServerTime(data);
+        apply(data);
+        setTimeout(poll, data.snapshot ? snapshotMs : pollMs);
       }}).catch(function() {{
-        if (timeoutId) clearTimeout(timeoutId);
         setTimeout(poll, liveMode ? pollMs : retryMs);
       }});
     }}
@@ -1350,7 +1666,8 @@ def write_index_html(image_dir):
   // --- Live new-ops polling --------------------------------------------
   // /api/new_ops returns the same data the new_ops_roster PNG is built from.
   // When reachable we swap the PNG for an HTML list that updates every 30s.
-  // On rsync'd remote copies the endpoint 404s and we leave the PNG alone.
+  // On rsync'd remote copies the endpoint 404s and api_new_ops.json is used;
+  // without that either we leave the PNG alone.
   (function setupNewOpsLive() {{
     var liveEl = document.getElementById('new-ops-live');
     var pngEl = document.getElementById('sidebar-new-ops');
@@ -1409,20 +1726,21 @@ def write_index_html(image_dir):
       liveEl.hidden = false;
     }}
 
+    function apply(data) {{
+      enterLiveMode();
+      render(data);
+    }}
+    stream.on('new_ops', apply);
+
     function poll() {{
-      var ctrl = (typeof AbortController !== 'undefined') ? new AbortController() : null;
-      var timeoutId = ctrl ? setTimeout(function() {{ ctrl.abort(); }}, 4000) : null;
-      var opts = ctrl ? {{ signal: ctrl.signal, cache: 'no-store' }} : {{ cache: 'no-store' }};
-      fetch('api/new_ops', opts).then(function(resp) {{
-        if (timeoutId) clearTimeout(timeoutId);
-        if (!resp.ok) throw new Error('HTTP ' + resp.status);
-        return resp.json();
-      }}).then(function(data) {{
-        enterLiveMode();
-        render(data);
+      if (stream.open) {{
         setTimeout(poll, pollMs);
+        return;
+      }}
+      fetchApi('new_ops').then(function(data) {{
+        apply(data);
+        setTimeout(poll, data.snapshot ? Math.max(pollMs, snapshotMs) : pollMs);
       }}).catch(function() {{
-        if (timeoutId) clearTimeout(timeoutId);
         setTimeout(poll, liveMode ? pollMs : retryMs);
       }});
     }}
@@ -1430,6 +1748,8 @@ def write_index_html(image_dir):
     poll();
   }})();
 
+  stream.start();
+
   document.getElementById('prev').addEventListener('click', function() {{ go(cur - 1); }});
   document.getElementById('next').addEventListener('click', function() {{ go(cur + 1); }});
 
@@ -1461,6 +1781,8 @@ def write_index_html(image_dir):
     try:
         with open(index_path, 'w') as f:
             f.write(html)
+        if config.PRECOMPRESS:
+            imagewriter.write_precompressed(index_path, html.encode('utf-8'))
         logging.info('Wrote %s' % index_path)
     except Exception as e:
         logging.exception(e)
@@ -1468,7 +1790,7 @@ def write_index_html(image_dir):
 
 def main():
     logging.info('headless startup...')
-    size = (1280, 1024)
+    size = CHART_SIZE
     image_dir = config.IMAGE_DIR
     logging.debug("Checking for IMAGE_DIR")
     logging.info("IMAGE_DIR set to %s - checking if exists" % config.IMAGE_DIR)
@@ -1480,10 +1802,18 @@ def main():
         if not os.path.exists(config.IMAGE_DIR):
             sys.exit('Image %s directory could not be created' % config.IMAGE_DIR)
         write_index_html(config.IMAGE_DIR)
+        if not config.IMAGE_MANIFEST:
+            publisher.remove_image_manifest(config.IMAGE_DIR)
+        apidata.remove_snapshots(config.IMAGE_DIR, _snapshot_names() if config.API_SNAPSHOTS else ())
 
     logging.info('creating world...')
 #    base_map = graphics.create_map()
 
+    watcher = None
+    if config.HEADLESS_WAKE_ON_CHANGE:
+        watcher = dbwatch.DatabaseWatcher(config.DATABASE_FILENAME, probe=dataaccess.get_qso_signature)
+        watcher.poll()  # baseline before the first render reads the log
+
     run = True
     # (last_qso_time, qso_count) signature; sentinel forces a render on first pass.
     last_qso_timestamp = (None, -1)
@@ -1491,11 +1821,24 @@ def main():
     while run:
         try:
             last_qso_timestamp = create_images(size, image_dir, last_qso_timestamp)
-            time.sleep(config.HEADLESS_DWELL_TIME)
+            # Wake early if an interval / time-of-day chart comes due first.
+            dwell = config.HEADLESS_DWELL_TIME
+            next_due = _get_scheduler().next_due()
+            if next_due is not None and next_due < dwell:
+                logging.debug('next scheduled chart due in %.0fs', next_due)
+                dwell = max(1.0, next_due)
+            if watcher is None:
+                time.sleep(dwell)
+            elif watcher.wait_for_change(dwell, debounce=config.HEADLESS_DEBOUNCE_SECONDS):
+                logging.info('QSO log changed; rendering')
         except KeyboardInterrupt:
             logging.info('Keyboard interrupt, shutting down...')
             run = False
 
+    if _render_pool is not None:
+        _render_pool.shutdown()
+    if _publisher is not None:
+        _publisher.stop()
     logging.info('headless shutdown...')
 
 
@@ -0,0 +1,133 @@
+#!/usr/bin/python3
+"""
+n1mm_view vitals history
+
+Fixed-memory time series for hubserver.py, so that thermal throttling, swap
+pressure or a stalled collector partway through the event leaves a trace and
+not just the hub's one current reading.
+
+Each series is kept in TIERS of ring buffers: 5-second buckets for the last
+hour, 1-minute buckets for the last 12 hours and 5-minute buckets for the
+last two days, so a whole Field Day fits in a few thousand buckets per series
+however long the hub runs. Every sample goes into each tier's open bucket,
+which keeps the count, sum, minimum and maximum; a bucket is closed into its
+ring when the next sample falls in a later one.
+
+query() picks the finest tier that still holds the whole span asked for
+and merges neighbouring buckets down to at most `width` points -- one per
+pixel of a sparkline -- keeping each point's minimum and maximum, so a short
+spike still shows at any width.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+
+__author__ = 'Tom Schaefer NY4I'
+__copyright__ = 'Copyright 2026 Thomas M. Schaefer'
+__license__ = 'Simplified BSD'
+
+# (bucket seconds, buckets kept): 1 h at 5 s, 12 h at 1 min, 48 h at 5 min.
+TIERS = ((5, 720), (60, 720), (300, 576))
+
+
+class _Tier:
+    def __init__(self, step, size):
+        self.step = step
+        self.buckets = deque(maxlen=size)  # (start, count, total, low, high)
+        self.current = None
+
+    def covers(self, since):
+        """True if nothing after since has been dropped from the ring."""
+        return len(self.buckets) < self.buckets.maxlen or self.buckets[0][0] <= since
+
+    def add(self, t, value):
+        start = int(t - t % self.step)
+        cur = self.current
+        if cur is not None and cur[0] != start:
+            self.buckets.append(tuple(cur))
+            cur = None
+        if cur is None:
+            self.current = [start, 1, value, value, value]
+        else:
+            cur[1] += 1
+            cur[2] += value
+            cur[3] = min(cur[3], value)
+            cur[4] = max(cur[4], value)
+
+    def rows(self, since):
+        rows = [b for b in self.buckets if b[0] >= since]
+        if self.current is not None and self.current[0] >= since:
+            rows.append(tuple(self.current))
+        return rows
+
+
+def decimate(rows, width):
+    """Merge (start, count, total, low, high) buckets into at most width
+    [start, mean, low, high] points."""
+    if not rows:
+        return []
+    group = max(1, math.ceil(len(rows) / width)) if width else 1
+    points = []
+    for i in range(0, len(rows), group):
+        chunk = rows[i:i + group]
+        count = sum(r[1] for r in chunk)
+        points.append([chunk[0][0], round(sum(r[2] for r in chunk) / count, 3),
+                       round(min(r[3] for r in chunk), 3), round(max(r[4] for r in chunk), 3)])
+    return points
+
+
+class History:
+    """Named series of samples in tiered ring buffers; see the module docstring."""
+
+    def __init__(self, tiers=TIERS):
+        self.tiers = tiers
+        self._series = {}
+        self._totals = {}  # name -> (t, total) for record_rate
+        self._lock = threading.Lock()
+
+    def record(self, name, value, t=None):
+        """Add one sample of series name (None is a gap and is skipped)."""
+        if value is None:
+            return
+        t = time.time() if t is None else t
+        with self._lock:
+            tiers = self._series.get(name)
+            if tiers is None:
+                tiers = self._series[name] = [_Tier(step, size) for step, size in self.tiers]
+            for tier in tiers:
+                tier.add(t, float(value))
+
+    def record_rate(self, name, total, t=None, per=1.0):
+        """Record how fast a running total grows, per `per` seconds, from its
+        change since the last call. A total that went down (the counting
+        process restarted) starts over."""
+        if total is None:
+            return
+        t = time.time() if t is None else t
+        with self._lock:
+            last = self._totals.get(name)
+            self._totals[name] = (t, total)
+        if last is not None and t > last[0] and total >= last[1]:
+            self.record(name, (total - last[1]) / (t - last[0]) * per, t)
+
+    def names(self):
+        with self._lock:
+            return sorted(self._series)
+
+    def query(self, name, seconds=None, width=None, now=None):
+        """{'step': seconds per point, 'points': [[start, mean, low, high], ...]}
+        for the last `seconds` (everything kept if None) of series name, at
+        most `width` points long. None if there is no such series."""
+        now = time.time() if now is None else now
+        with self._lock:
+            tiers = self._series.get(name)
+            if tiers is None:
+                return None
+            since = now - seconds if seconds else 0
+            tier = next((t for t in tiers if t.covers(since)), tiers[-1])
+            rows = tier.rows(since)
+        points = decimate(rows, width)
+        group = max(1, math.ceil(len(rows) / width)) if width and rows else 1
+        return {'step': tier.step * group, 'points': points}
@@ -19,9 +19,21 @@ Design / safety notes
     (CGI / $_SERVER style), so a hook reads e.g. $N1MMV_NEW_MULTIPLIER,
     $N1MMV_CURRENT_OPERATOR, $N1MMV_NEW_CALL. The event name is also passed
     as argv[1] for easy `case "$1" in ...` dispatch in a shell script.
-  * Hooks run in daemon threads with a timeout, so a slow or hung script can
-    never stall the collector's real-time UDP ingest. Concurrency is bounded
-    so an event storm (e.g. a multiplier pileup) cannot fork-bomb the box.
+  * Hooks run on HOOK_MAX_CONCURRENT persistent worker threads with a
+    timeout, so a slow or hung script can never stall the collector's
+    real-time UDP ingest, and an event storm (e.g. a multiplier pileup)
+    cannot fork-bomb the box.
+  * Events wait in a bounded priority queue (HOOK_QUEUE_SIZE): new
+    multipliers go first, then operator changes, then band changes. A burst
+    of operator or band changes at one station is merged into one event,
+    from the first previous value to the latest current one (and dropped if
+    it ends where it started); new multipliers are each news and are never
+    merged. When the queue is full HOOK_OVERFLOW decides: 'coalesce' (the
+    default) lets the new event replace the newest queued one of its type
+    for the same station (and multiplier) and drops it if there is none,
+    'drop_oldest' drops the oldest event of the lowest priority.
+  * stats() counts, per event type, what was queued, merged, dropped and
+    how the scripts ended, with latency from the QSO to the script's exit.
   * Field values are sanitized (control characters stripped, length capped)
     and every failure is caught and logged. A misbehaving hook can never
     break contact collection.
@@ -31,11 +43,15 @@ QSO with a dict of fields; this module owns the change-detection state and
 decides which (if any) scripts to fire.
 """
 
+import collections
 import logging
 import os
 import re
 import subprocess
 import threading
+import time
+
+import telemetry
 
 # Strip ASCII control characters (incl. NUL, CR, LF, ESC) from field values so
 # nothing weird lands in a child process's environment or a downstream device.
@@ -49,6 +65,19 @@ _EVENT_SCRIPTS = (
     ('band_change', 'HOOK_BAND_CHANGE_SCRIPT'),
 )
 
+# Queue order, lowest first: a new multiplier is news, a band change less so.
+_PRIORITY = {'new_multiplier': 0, 'operator_change': 1, 'band_change': 2}
+# Events reporting a station's state: (current field, previous field). A
+# burst of one of these at one station merges into a single event.
+_STATE_FIELDS = {
+    'operator_change': ('operator', 'previous_operator'),
+    'band_change': ('band', 'previous_band'),
+}
+OVERFLOW_POLICIES = ('coalesce', 'drop_oldest')
+# Latencies kept per event type for the stats() percentiles.
+_LATENCY_SAMPLES = 200
+_OUTCOMES = ('queued', 'coalesced', 'dropped', 'ok', 'failed', 'timeout', 'error')
+
 
 def _sanitize(value):
     """Coerce any field value to a safe, bounded, control-char-free string."""
@@ -57,6 +86,23 @@ def _sanitize(value):
     return s[:_MAX_VALUE_LEN]
 
 
+class _Job:
+    """One queued hook run."""
+
+    def __init__(self, event, path, fields, seq):
+        self.event = event
+        self.path = path
+        self.fields = fields
+        self.station = fields.get('station') or ''
+        self.priority = _PRIORITY.get(event, len(_PRIORITY))
+        self.seq = seq
+        self.queued = time.monotonic()
+        self.merged = 1  # events this run stands for
+
+    def order(self):
+        return self.priority, self.seq
+
+
 class EventHooks:
     """
     Dispatch external scripts for contest events, and track the per-station
@@ -67,8 +113,18 @@ class EventHooks:
 
     def __init__(self, config):
         self.timeout = max(1, getattr(config, 'HOOK_TIMEOUT', 10))
-        max_conc = max(1, getattr(config, 'HOOK_MAX_CONCURRENT', 4))
-        self._sema = threading.BoundedSemaphore(max_conc)
+        self.workers = max(1, getattr(config, 'HOOK_MAX_CONCURRENT', 4))
+        self.queue_size = max(1, getattr(config, 'HOOK_QUEUE_SIZE', 32))
+        self.overflow = getattr(config, 'HOOK_OVERFLOW', 'coalesce')
+        if self.overflow not in OVERFLOW_POLICIES:
+            logging.warning('unknown HOOK_OVERFLOW %r, using coalesce', self.overflow)
+            self.overflow = 'coalesce'
+        self._queue = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._threads = []
+        self._closing = False
+        self._stats = {}
         self.mult_per_band = bool(getattr(config, 'HOOK_MULT_PER_BAND', False))
 
         # Resolve and validate each configured script path once, up front.
@@ -83,8 +139,9 @@ class EventHooks:
         self._last = {}
         self.enabled = bool(self._scripts)
         if self.enabled:
-            logging.info('Event hooks active (timeout=%ss, max_concurrent=%d, mult_per_band=%s)',
-                         self.timeout, max_conc, self.mult_per_band)
+            logging.info('Event hooks active (timeout=%ss, max_concurrent=%d, queue=%d, overflow=%s, '
+                         'mult_per_band=%s)', self.timeout, self.workers, self.queue_size,
+                         self.overflow, self.mult_per_band)
 
     @staticmethod
     def _resolve(raw):
@@ -141,17 +198,121 @@ class EventHooks:
             logging.exception('event hook on_contact failed')
 
     def fire(self, event, fields):
-        """Spawn the script for `event` (if configured) without blocking."""
+        """Queue the script for `event` (if configured) without blocking."""
         path = self._scripts.get(event)
         if not path:
             return
-        env = self._build_env(event, fields)
-        # Non-blocking acquire: if we're already at the concurrency cap a hung
-        # script is holding threads, so drop this event rather than pile up.
-        if not self._sema.acquire(blocking=False):
-            logging.warning('event hook concurrency limit reached; dropping %s event', event)
-            return
-        threading.Thread(target=self._run, args=(event, path, env), daemon=True).start()
+        with self._cond:
+            if self._closing:
+                return
+            if self._merge(event, fields):
+                return
+            self._seq += 1
+            job = _Job(event, path, fields, self._seq)
+            if len(self._queue) >= self.queue_size and not self._overflow(job):
+                return
+            self._queue.append(job)
+            self._count(event, 'queued')
+            self._start_workers()
+            self._cond.notify()
+
+    def _merge(self, event, fields):
+        """Fold a state event into a queued one for the same station. Called
+        with _cond held; True if it was."""
+        if event not in _STATE_FIELDS:
+            return False
+        station = fields.get('station') or ''
+        job = next((j for j in self._queue if j.event == event and j.station == station), None)
+        if job is None:
+            return False
+        current, previous = _STATE_FIELDS[event]
+        job.fields = dict(fields, **{previous: job.fields.get(previous)})
+        job.merged += 1
+        self._count(event, 'coalesced')
+        if job.fields.get(previous) == job.fields.get(current):
+            # back where it started: nothing changed after all
+            self._queue.remove(job)
+        return True
+
+    def _overflow(self, job):
+        """Make room for job in a full queue under the HOOK_OVERFLOW policy.
+        Called with _cond held; False if job is not to be queued."""
+        if self.overflow == 'coalesce':
+            same = [j for j in self._queue if j.event == job.event and j.station == job.station
+                    and (job.event != 'new_multiplier'
+                         or j.fields.get('mult_value') == job.fields.get('mult_value'))]
+            newest = max(same, key=_Job.order, default=None)
+            if newest is not None:
+                newest.fields, newest.path = job.fields, job.path
+                newest.merged += 1
+                self._count(job.event, 'coalesced')
+            else:
+                logging.warning('event hook queue full; dropping %s event', job.event)
+                self._count(job.event, 'dropped')
+            return False
+        victim = max(self._queue + [job], key=lambda j: (j.priority, -j.seq))
+        logging.warning('event hook queue full; dropping %s event', victim.event)
+        self._count(victim.event, 'dropped')
+        if victim is job:
+            return False
+        self._queue.remove(victim)
+        return True
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name='hook-%d' % len(self._threads), daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closing:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                job = min(self._queue, key=_Job.order)
+                self._queue.remove(job)
+            self._run(job)
+
+    def close(self, timeout=None):
+        """Run what is queued, stop the workers and log the stats."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            threads = list(self._threads)
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        for thread in threads:
+            thread.join(max(0, deadline - time.monotonic()))
+        for event, entry in self.stats().items():
+            logging.info('event hook %s: %s', event,
+                         ', '.join('%s=%s' % item for item in entry.items()))
+
+    def _count(self, event, outcome, latency=None):
+        with self._cond:
+            entry = self._stats.get(event)
+            if entry is None:
+                entry = self._stats[event] = dict.fromkeys(_OUTCOMES, 0)
+                entry['latency'] = collections.deque(maxlen=_LATENCY_SAMPLES)
+            entry[outcome] += 1
+            if latency is not None:
+                entry['latency'].append(latency)
+
+    def stats(self):
+        """Per event type: the _OUTCOMES counts and latency_p50, latency_p95
+        and latency_max in ms, from the first QSO a run stands for to the
+        script's exit."""
+        with self._cond:
+            out = {}
+            for event, entry in self._stats.items():
+                row = {k: entry[k] for k in _OUTCOMES}
+                latency = list(entry['latency'])
+                for name, value in (('p50', telemetry.percentile(latency, 50)),
+                                    ('p95', telemetry.percentile(latency, 95)),
+                                    ('max', max(latency, default=None))):
+                    row['latency_' + name] = None if value is None else round(value * 1000, 1)
+                out[event] = row
+            return out
 
     def _build_env(self, event, f):
         env = dict(os.environ)
@@ -178,9 +339,13 @@ class EventHooks:
         put('MULT_COUNT', f.get('mult_count', ''))
         put('QSO_COUNT', f.get('qso_count', ''))
         put('OPERATOR_QSO_COUNT', f.get('operator_qso_count', ''))
+        put('COALESCED', f.get('coalesced', 1))
         return env
 
-    def _run(self, event, path, env):
+    def _run(self, job):
+        event, path = job.event, job.path
+        env = self._build_env(event, dict(job.fields, coalesced=job.merged))
+        outcome = 'error'
         try:
             proc = subprocess.run(
                 [path, event], env=env, shell=False,
@@ -191,11 +356,14 @@ class EventHooks:
             if proc.returncode != 0:
                 err = (proc.stderr or b'').decode('utf-8', 'replace').strip()
                 logging.warning('event hook %s exited %d: %s', event, proc.returncode, err[:500])
+                outcome = 'failed'
             else:
                 logging.info('event hook %s fired ok (%s)', event, os.path.basename(path))
+                outcome = 'ok'
         except subprocess.TimeoutExpired:
             logging.warning('event hook %s timed out after %ss, killed: %s', event, self.timeout, path)
+            outcome = 'timeout'
         except Exception:
             logging.exception('event hook %s failed to run: %s', event, path)
         finally:
-            self._sema.release()
+            self._count(event, outcome, time.monotonic() - job.queued)
@@ -13,6 +13,14 @@ Runs on port 80 and gives a single view that:
   - Shows a few live figures from the QSO database (event name, total
     QSOs, last QSO).
 
+The probes behind all of this run on a background sampler thread (see
+sampler.py and PROBES below), each on its own interval and with its own
+timeout; the page and /api/status only read the latest snapshot, and every
+entry in it carries its age in seconds. Every HISTORY_SECONDS the sampler
+also adds the vitals, the QSO rate and the dashboard's request rate to a
+fixed-memory history (history.py), served to the page's sparklines by
+/api/history.
+
 This is deliberately separate from webserver.py: webserver.py serves the
 chart IMAGE_DIR; this is just a status/landing page. It binds port 80, so
 its systemd unit grants CAP_NET_BIND_SERVICE rather than running as root.
@@ -20,6 +28,8 @@ its systemd unit grants CAP_NET_BIND_SERVICE rather than running as root.
 Run standalone for testing on an unprivileged port:
     ./hubserver.py 8088
 """
+import functools
+import json
 import logging
 import os
 import shutil
@@ -27,12 +37,18 @@ import socket
 import sqlite3
 import subprocess
 import sys
+import threading
 import time
+import urllib.request
 from datetime import datetime, timezone
 
 from flask import Flask, jsonify, render_template_string, request
 
 from config import Config, VERSION
+import compression
+import history
+import sampler
+import servicestatus
 
 logging.basicConfig(level=logging.INFO)
 config = Config()
@@ -47,6 +63,11 @@ logging.getLogger('werkzeug').setLevel(
 
 app = Flask(__name__)
 
+# gzip/brotli for the page and /api/status (COMPRESS); see compression.py.
+compressor = compression.Compressor(min_size=config.COMPRESS_MIN_SIZE)
+if config.COMPRESS:
+    compressor.init_app(app)
+
 # The four station processes we care about, in display order. `port` is the
 # TCP port the service listens on (None = no listener, status from systemd
 # only). `link` controls whether the card offers an "Open" button.
@@ -122,19 +143,15 @@ _CHECKNET_KEYS = ('Already connected', 'Successfully connected', 'Switching Wi-F
                   'Leaving current Wi-Fi')
 
 
-def _run(cmd):
+def _run(cmd, timeout=3):
     """Run a command, return stdout stripped ('' on any failure)."""
     try:
         return subprocess.run(cmd, capture_output=True, text=True,
-                              timeout=3).stdout.strip()
+                              timeout=timeout).stdout.strip()
     except Exception:
         return ''
 
 
-# External IP requires an outbound call, so cache it (the page polls every 5s).
-_ext_ip_cache = {'ip': None, 'ts': 0}
-
-
 def _read_file(path):
     try:
         with open(path) as fh:
@@ -143,10 +160,11 @@ def _read_file(path):
         return ''
 
 
-def _system_info():
+def _host_info():
     """Host vitals for the landing page, mirroring the shell MOTD: load,
-    memory, temperature, uptime, process count, disk usage, NTP reference,
-    and (cached) external IP."""
+    memory, uptime, process count and disk usage. Temperature, the NTP
+    reference and the external IP are separate probes (_temperature,
+    _chrony_tracking, _external_ip)."""
     out = {}
     la = _read_file('/proc/loadavg').split()
     if len(la) >= 3:
@@ -173,9 +191,9 @@ def _system_info():
         out['mem_total_mb'] = total // 1024
         out['mem_free_mb'] = avail // 1024
         out['mem_pct'] = round((total - avail) / total * 100, 1)
-    temp = _run(['vcgencmd', 'measure_temp'])  # 'temp=47.7\'C'
-    if '=' in temp:
-        out['temp'] = temp.split('=', 1)[1].replace("'C", '°C').strip()
+    swap = _kb('SwapTotal')
+    if swap:
+        out['swap_pct'] = round((swap - _kb('SwapFree')) / swap * 100, 1)
     try:
         out['procs'] = sum(1 for p in os.listdir('/proc') if p.isdigit())
     except OSError:
@@ -186,22 +204,45 @@ def _system_info():
             out[label + '_pct'] = round(du.used / du.total * 100)
         except OSError:
             pass
-    for line in _run(['chronyc', 'tracking']).splitlines():
+    return out
+
+
+def _temperature(timeout=2):
+    """{'temp': '47.7°C'} from vcgencmd (empty off a Raspberry Pi)."""
+    temp = _run(['vcgencmd', 'measure_temp'], timeout)  # 'temp=47.7\'C'
+    if '=' in temp:
+        value = temp.split('=', 1)[1].replace("'C", '').strip()
+        out = {'temp': value + '°C'}
+        try:
+            out['temp_c'] = float(value)
+        except ValueError:
+            pass
+        return out
+    return {}
+
+
+def _chrony_tracking(timeout=3):
+    """NTP reference and last sync time from `chronyc tracking`."""
+    out = {}
+    for line in _run(['chronyc', 'tracking'], timeout).splitlines():
         if line.startswith('Reference ID'):
             out['ntp_ref'] = line.split(':', 1)[1].strip()
         elif line.startswith('Ref time'):
             # UTC time the last measurement from the time source was processed.
             out['ntp_sync'] = line.split(':', 1)[1].strip()
-    now = int(time.time())
-    if not _ext_ip_cache['ip'] or now - _ext_ip_cache['ts'] > 300:
-        ip = _run(['curl', '-s', '--max-time', '2', 'https://icanhazip.com'])
-        if ip:
-            _ext_ip_cache['ip'] = ip.strip()
-            _ext_ip_cache['ts'] = now
-    out['external_ip'] = _ext_ip_cache['ip']
     return out
 
 
+def _external_ip(timeout=3):
+    """The station's public address. Raises if there's no answer, so the
+    sampler keeps the last one it got."""
+    ip = _run(['curl', '-s', '--max-time', '%g' % max(1, timeout - 1),
+               'https://icanhazip.com'], timeout)
+    if not ip:
+        raise OSError('no answer from icanhazip.com')
+    return {'external_ip': ip.strip()}
+
+
 def _checknet_info():
     """Last run time + last meaningful result from checkNet.sh's log."""
     import re
@@ -276,14 +317,16 @@ def _net_info():
     return info
 
 
-def _service_status(unit):
-    """Return systemd state string: 'active' | 'inactive' | 'failed' | ..."""
-    try:
-        r = subprocess.run(['systemctl', 'is-active', unit],
-                           capture_output=True, text=True, timeout=3)
-        return (r.stdout or r.stderr).strip() or 'unknown'
-    except Exception as e:
-        return 'error: %s' % e
+def _webserver_requests(timeout=1):
+    """Requests the QSO dashboard has served since it started, from its
+    /api/health."""
+    port = next(s['port'] for s in SERVICES if s['unit'] == 'n1mm_view_webserver')
+    with urllib.request.urlopen('http://127.0.0.1:%d/api/health' % port, timeout=timeout) as r:
+        return json.load(r).get('requests')
+
+
+# systemd state of every SERVICES unit from one systemctl call.
+_service_states = servicestatus.ServiceStatus([s['unit'] for s in SERVICES], ttl=2, timeout=2)
 
 
 def _port_open(port, host='127.0.0.1', timeout=0.5):
@@ -359,21 +402,120 @@ def _db_stats():
     return out
 
 
+# What the sampler runs: (name, function, interval seconds, timeout seconds).
+# The interval is how long a reading stays good for; the page polls every 5s.
+def _probes():
+    probes = [
+        ('host', _host_info, 5, 2),
+        ('udp_ports', _udp_ports, 5, 2),
+        ('db', _db_stats, 5, 3),
+        ('net', _net_info, 10, 5),
+        ('temp', _temperature, 10, 2),
+        ('ntp', _chrony_tracking, 15, 3),
+        ('external_ip', _external_ip, 300, 3),
+        ('web_requests', _webserver_requests, HISTORY_SECONDS, 1),
+        ('services', _service_states.get, 5, 3),
+    ]
+    for s in SERVICES:
+        unit = s['unit']
+        if s.get('check') == 'tcp':
+            probes.append(('listen:' + unit, lambda port=s['port']: _port_open(port, timeout=0.5), 5, 1))
+        elif s.get('check') == 'ntp':
+            probes.append(('listen:' + unit, lambda port=s['port']: _ntp_serving(port=port, timeout=1.0), 5, 2))
+    return probes
+
+
+# How often the vitals go into the history: its finest resolution.
+HISTORY_SECONDS = 5
+# (series, probe, key of the probe's value); the rates are _record_history's.
+HISTORY_SERIES = (
+    ('load', 'host', 'load'),
+    ('mem_pct', 'host', 'mem_pct'),
+    ('swap_pct', 'host', 'swap_pct'),
+    ('root_pct', 'host', 'root_pct'),
+    ('temp', 'temp', 'temp_c'),
+)
+
+_history = history.History()
+
+
+def _record_history(source):
+    """Add the sampler's fresh readings to _history, plus the collector's
+    ingest rate (QSOs logged per minute) and the dashboard's requests per
+    second, from how their totals moved since the last reading."""
+    snap = source.snapshot()
+    now = time.time()
+
+    def fresh(name):
+        entry = snap.get(name)
+        if entry is None or entry['value'] is None or entry['stale']:
+            return None, None
+        return entry['value'], now - entry['age']
+
+    for series, probe, key in HISTORY_SERIES:
+        value, t = fresh(probe)
+        if value is not None and value.get(key) is not None:
+            number = value[key]
+            if isinstance(number, str):
+                number = float(number.split()[0])  # '0.32 0.94 0.90' -> 1 min load
+            _history.record(series, number, t)
+    db, t = fresh('db')
+    if db is not None and not db.get('error'):
+        _history.record_rate('qso_rate', db['qso_count'], t, per=60)
+    requests, t = fresh('web_requests')
+    _history.record_rate('web_rate', requests, t)
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def _get_sampler():
+    """The running status sampler, started (and given a few seconds for its
+    first readings) by the first request."""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = sampler.Sampler(workers=getattr(config, 'HUB_SAMPLER_WORKERS', 4))
+            for name, func, interval, timeout in _probes():
+                _sampler.add(name, func, interval, timeout)
+            _sampler.add('history', functools.partial(_record_history, _sampler), HISTORY_SECONDS, 1)
+            _sampler.start()
+            _sampler.wait_ready(3)
+    return _sampler
+
+
+def _oldest(entries):
+    """Age of the oldest of some snapshot entries (None if one never ran)."""
+    ages = [e['age'] for e in entries]
+    return None if None in ages else max(ages, default=None)
+
+
 def _collect_status():
-    """Assemble the full status payload used by both the page and /api/status."""
+    """Assemble the full status payload used by both the page and
+    /api/status from the sampler's latest snapshot. Services, db, net and sys
+    each carry 'age', the seconds since their oldest reading; 'samples' has
+    the age, error and staleness of every probe."""
+    snap = _get_sampler().snapshot()
+
+    def value(name, default):
+        entry = snap.get(name)
+        return default if entry is None or entry['value'] is None else entry['value']
+
     services = []
     up = 0
-    udp_ports = _udp_ports()  # one snapshot for all udp-checked services
+    udp_ports = value('udp_ports', set())  # one snapshot for all udp-checked services
     for s in SERVICES:
-        state = _service_status(s['unit'])
+        state = value('services', {}).get(s['unit'], 'unknown')
         check = s.get('check')
+        used = [snap['services']]
         # Honest "is it serving?" probe. None when there's nothing to probe.
-        if check == 'tcp':
-            listening = _port_open(s['port'])
-        elif check == 'ntp':
-            listening = _ntp_serving(port=s['port'])
+        if check in ('tcp', 'ntp'):
+            listening = value('listen:' + s['unit'], None)
+            used.append(snap['listen:' + s['unit']])
         elif check == 'udp':
             listening = s['port'] in udp_ports
+            used.append(snap['udp_ports'])
         else:
             listening = None
         # "ok" (green) means active AND, if probed, actually serving. A probe
@@ -385,23 +527,53 @@ def _collect_status():
             'unit': s['unit'], 'label': s['label'], 'desc': s['desc'],
             'port': s['port'], 'link': s['link'], 'check': check,
             'state': state, 'listening': listening, 'ok': ok,
+            'age': _oldest(used), 'stale': any(e['stale'] for e in used),
         })
+    db = dict(value('db', {'event': getattr(config, 'EVENT_NAME', '') or '',
+                           'qso_count': 0, 'last_qso': '—', 'error': 'not sampled yet'}),
+              age=snap['db']['age'])
+    net = dict(value('net', {}), age=snap['net']['age'])
+    sys_info = {}
+    for name in ('host', 'temp', 'ntp', 'external_ip'):
+        sys_info.update(value(name, {}))
+    sys_info['age'] = _oldest([snap['host'], snap['temp']])
     return {
         'server_time': int(time.time()),
         'services': services,
         'up': up,
         'total': len(SERVICES),
-        'db': _db_stats(),
-        'net': _net_info(),
-        'sys': _system_info(),
+        'db': db,
+        'net': net,
+        'sys': sys_info,
+        'samples': {name: {k: v for k, v in entry.items() if k != 'value'}
+                    for name, entry in snap.items()},
     }
 
 
+@app.route('/api/compression')
+def api_compression():
+    """Bytes saved by response compression so far, per endpoint."""
+    return jsonify({'enabled': config.COMPRESS, 'endpoints': compressor.stats()})
+
+
 @app.route('/api/status')
 def api_status():
     return jsonify(_collect_status())
 
 
+@app.route('/api/history')
+def api_history():
+    """Vitals history for sparklines. ?series=load,temp (all by default),
+    ?seconds= how far back (the whole history by default) and ?width= at
+    most this many points per series, one per pixel."""
+    width = min(max(request.args.get('width', 120, type=int), 1), 2000)
+    seconds = request.args.get('seconds', type=int)
+    names = _history.names()
+    wanted = [n for n in request.args.get('series', '').split(',') if n in names] or names
+    return jsonify({'server_time': int(time.time()),
+                    'series': {n: _history.query(n, seconds, width) for n in wanted}})
+
+
 PAGE = """<!doctype html>
 <html lang="en">
 <head>
@@ -500,6 +672,7 @@ PAGE = """<!doctype html>
     </div>
     <div class="net" id="net"></div>
     <div class="net" id="sys"></div>
+    <div class="net" id="history"></div>
     <div class="grid" id="grid"></div>
   </main>
 </div>
@@ -520,6 +693,8 @@ PAGE = """<!doctype html>
     } else {
       t += s.listening ? ', port ' + s.port + ' open' : ', port ' + s.port + ' DOWN';
     }
+    // A probe that is overdue or timing out keeps its last reading; say how old.
+    if (s.stale) t += s.age == null ? ' (no reading yet)' : ' (as of ' + Math.round(s.age) + 's ago)';
     return t;
   }
   function renderNet(n) {
@@ -559,7 +734,46 @@ PAGE = """<!doctype html>
     var rowHtml = rows.map(function (r) {
       return '<div class="row"><span class="k">' + r[0] + '</span><span class="v">' + r[1] + '</span></div>';
     }).join('');
-    document.getElementById('sys').innerHTML = '<h2>System</h2><div class="rows">' + rowHtml + '</div>';
+    var age = (s.age != null && s.age > 15) ? ' <span class="badge unknown">' + Math.round(s.age) + 's old</span>' : '';
+    document.getElementById('sys').innerHTML = '<h2>System' + age + '</h2><div class="rows">' + rowHtml + '</div>';
+  }
+  // Sparklines from /api/history: the mean as a line, the per-pixel maximum
+  // as a faint one above it so a short spike still shows.
+  var SERIES = [['load', 'Load (1 min)', ''], ['mem_pct', 'Memory', '%'],
+                ['swap_pct', 'Swap', '%'], ['temp', 'Temperature', '°C'],
+                ['root_pct', 'Root disk', '%'], ['qso_rate', 'QSOs / min', ''],
+                ['web_rate', 'Dashboard req/s', '']];
+  var SPARK_W = 160, SPARK_H = 26;
+  function spark(points) {
+    var hi = 0, t0 = points[0][0], span = Math.max(1, points[points.length - 1][0] - t0);
+    points.forEach(function (p) { hi = Math.max(hi, p[3]); });
+    hi = hi || 1;
+    function line(i) {
+      return points.map(function (p) {
+        return (SPARK_W * (p[0] - t0) / span).toFixed(1) + ',' +
+               (SPARK_H - 1 - (SPARK_H - 2) * p[i] / hi).toFixed(1);
+      }).join(' ');
+    }
+    return '<svg width="' + SPARK_W + '" height="' + SPARK_H + '" style="vertical-align:middle">' +
+      '<polyline fill="none" stroke="#1f6feb" stroke-opacity="0.45" points="' + line(3) + '"/>' +
+      '<polyline fill="none" stroke="#79c0ff" stroke-width="1.5" points="' + line(1) + '"/></svg>';
+  }
+  function renderHistory(data) {
+    var rows = SERIES.filter(function (s) {
+      var h = data.series[s[0]];
+      return h && h.points.length > 1;
+    }).map(function (s) {
+      var pts = data.series[s[0]].points, last = pts[pts.length - 1], peak = 0;
+      pts.forEach(function (p) { peak = Math.max(peak, p[3]); });
+      return '<div class="row"><span class="k">' + s[1] + '</span><span class="v" title="peak ' +
+        peak + s[2] + '">' + spark(pts) + ' ' + (+last[1].toFixed(1)) + s[2] + '</span></div>';
+    }).join('');
+    document.getElementById('history').innerHTML = rows
+      ? '<h2>History</h2><div class="rows">' + rows + '</div>' : '';
+  }
+  function pollHistory() {
+    fetch('/api/history?width=' + SPARK_W).then(function (r) { return r.json(); })
+      .then(renderHistory).catch(function () {});
   }
   function render(data) {
     renderNet(data.net || {});
@@ -621,6 +835,7 @@ PAGE = """<!doctype html>
   });
   tick(); setInterval(tick, 1000);
   poll(); setInterval(poll, 5000);
+  pollHistory(); setInterval(pollHistory, 30000);
 </script>
 </body>
 </html>
@@ -640,6 +855,7 @@ def main():
     port = int(sys.argv[1]) if len(sys.argv) > 1 else getattr(config, 'HUB_PORT', 80)
     bind = getattr(config, 'HUB_BIND', '0.0.0.0')
     logger.info('Starting n1mm_view station hub v%s on %s:%d', VERSION, bind, port)
+    _get_sampler()  # start sampling (and the history) before anyone asks
     app.run(host=bind, port=port, threaded=True, use_reloader=False)
 
 
@@ -0,0 +1,253 @@
+#!/usr/bin/python3
+"""
+n1mm_view image writer
+
+PNG encoding and file output for the rendered charts.
+
+The chart builders in graphics.py hand back raw pixels in graphics.image_format
+(RGBA, or RGB on the matplotlib 3.6 Raspberry Pi hack). Both are native PNG
+channel orders, so this module encodes them straight from the caller's buffer
+-- matplotlib's Agg buffer is passed through as a memoryview -- instead of
+wrapping the pixels in a pygame surface and having pygame.image.save copy and
+encode them again.
+
+  * encode_png()   -- pixels -> PNG bytes, with a configurable zlib level and
+                      scanline filter.
+  * write_atomic() -- write to a hidden temp file in the same directory, then
+                      rename over the target, so a web server or rsync never
+                      sees a half-written PNG.
+  * downscale()    -- box-filter the pixels down by an integer factor, for
+                      the smaller copies (VARIANTS) phones and thumbnails use.
+  * write_precompressed() -- .gz (and .br, with the brotli module) copies of
+                      a text file, which webserver.py sends to browsers that
+                      accept them instead of compressing on every request.
+  * ImageWriter    -- ties them together, optionally running the encode on
+                      a small thread pool (zlib releases the GIL) so the next
+                      chart can render while the previous one compresses.
+"""
+
+import gzip
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import brotli  # optional: apt install python3-brotli
+except ImportError:
+    brotli = None
+
+__author__ = 'Tom Schaefer NY4I'
+__copyright__ = 'Copyright 2026 Thomas M. Schaefer'
+__license__ = 'Simplified BSD'
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# pixel format -> (bytes per pixel, PNG colour type)
+PIXEL_FORMATS = {
+    'RGBA': (4, 6),
+    'RGB': (3, 2),
+}
+
+# PNG scanline filter types (PNG spec 9.2) we know how to produce.
+PNG_FILTERS = {
+    'NONE': 0,
+    'SUB': 1,
+    'UP': 2,
+}
+
+
+def _chunk(tag, data):
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+
+
+def encode_png(pixels, size, pixel_format='RGBA', level=6, png_filter='NONE'):
+    """Encode raw 8-bit pixels as a PNG and return the file contents.
+
+    pixels: any buffer (bytes, or a memoryview of the Agg renderer) holding
+    size[0] * size[1] pixels in pixel_format, rows top to bottom.
+    level: zlib compression level, 0-9.
+    png_filter: 'NONE' feeds each row to zlib directly out of the caller's
+    buffer; 'SUB' and 'UP' filter the image first (one numpy pass), which can
+    shrink photographic content such as the map at some CPU cost.
+    """
+    bpp, color_type = PIXEL_FORMATS[pixel_format]
+    width, height = int(size[0]), int(size[1])
+    stride = width * bpp
+    view = memoryview(pixels).cast('B')
+    if len(view) != stride * height:
+        raise ValueError('pixel buffer is %d bytes, expected %d for %dx%d %s'
+                         % (len(view), stride * height, width, height, pixel_format))
+    filter_type = PNG_FILTERS[png_filter]
+
+    compressor = zlib.compressobj(level)
+    parts = []
+    if filter_type == 0:
+        row_filter = b'\x00'
+        for offset in range(0, stride * height, stride):
+            parts.append(compressor.compress(row_filter))
+            parts.append(compressor.compress(view[offset:offset + stride]))
+    else:
+        import numpy as np  # matplotlib already depends on numpy
+        rows = np.frombuffer(view, dtype=np.uint8).reshape(height, stride)
+        filtered = np.empty((height, stride + 1), dtype=np.uint8)
+        filtered[:, 0] = filter_type
+        filtered[:, 1:] = rows
+        if filter_type == 1:
+            # uint8 arithmetic wraps, which is exactly the modulo-256 the spec wants
+            filtered[:, 1 + bpp:] -= rows[:, :-bpp]
+        else:
+            filtered[1:, 1:] -= rows[:-1]
+        parts.append(compressor.compress(filtered))
+    parts.append(compressor.flush())
+
+    header = struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0)
+    return b''.join((PNG_SIGNATURE,
+                     _chunk(b'IHDR', header),
+                     _chunk(b'IDAT', b''.join(parts)),
+                     _chunk(b'IEND', b'')))
+
+
+# Smaller copies ImageWriter can write next to each image: name -> the
+# factor width and height are divided by. qso_rates_graph.png gets
+# qso_rates_graph.half.png and qso_rates_graph.thumb.png.
+VARIANTS = {'half': 2, 'thumb': 4}
+
+
+def variant_filename(filename, variant):
+    root, ext = os.path.splitext(filename)
+    return '%s.%s%s' % (root, variant, ext)
+
+
+def downscale(pixels, size, pixel_format, factor):
+    """Shrink pixels by an integer factor, averaging each factor x factor
+    block. Returns (bytes, size); odd edge rows/columns are dropped."""
+    import numpy as np  # matplotlib already depends on numpy
+    bpp = PIXEL_FORMATS[pixel_format][0]
+    width, height = int(size[0]), int(size[1])
+    new_w, new_h = width // factor, height // factor
+    rows = np.frombuffer(memoryview(pixels).cast('B'), dtype=np.uint8).reshape(height, width, bpp)
+    blocks = rows[:new_h * factor, :new_w * factor].reshape(new_h, factor, new_w, factor, bpp)
+    area = factor * factor
+    total = blocks.sum(axis=(1, 3), dtype=np.uint32)
+    return ((total + area // 2) // area).astype(np.uint8).tobytes(), (new_w, new_h)
+
+
+def write_atomic(filename, data):
+    """Write data to filename via a temp file + rename.
+
+    The temp file is a dotfile in the target directory (same filesystem, so
+    os.replace is atomic, and a POST_FILE_COMMAND like `rsync html/*` skips
+    it). Readers see either the old file or the new one, never a partial PNG.
+    """
+    directory, base = os.path.split(filename)
+    tmp = os.path.join(directory, '.%s.%d.%d.tmp' % (base, os.getpid(), threading.get_ident()))
+    try:
+        with open(tmp, 'wb') as fh:
+            fh.write(data)
+        os.replace(tmp, filename)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+# Content-Encoding -> suffix of the precompressed copy, best first.
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+
+def compress(data, encoding):
+    """data compressed for a Content-Encoding in PRECOMPRESSED; None for br
+    without the brotli module."""
+    if encoding == 'gzip':
+        # mtime=0: the same input always gives the same bytes
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if encoding == 'br' and brotli is not None:
+        return brotli.compress(data, mode=brotli.MODE_TEXT)
+    return None
+
+
+def write_precompressed(filename, data):
+    """Write the PRECOMPRESSED copies of data (filename's new content) next
+    to it. Call after writing filename: a copy older than its original is
+    ignored by webserver.py."""
+    for encoding, suffix in PRECOMPRESSED:
+        packed = compress(data, encoding)
+        if packed is not None:
+            write_atomic(filename + suffix, packed)
+
+
+class ImageWriter:
+    """
+    Encode and write chart images, synchronously or on a thread pool.
+
+    With variants (names from VARIANTS) each image is also written downscaled
+    next to the original.
+
+    With threads=0 save() returns only once the file is on disk (the historical
+    behaviour). With threads > 0 save() queues the encode and returns at once;
+    call wait() before anything that reads the files (e.g. POST_FILE_COMMAND).
+    The queued pixel buffer is kept alive by the pending job, so callers may
+    drop their own reference straight away.
+    """
+
+    def __init__(self, level=6, png_filter='NONE', threads=0, variants=()):
+        self.level = min(9, max(0, int(level)))
+        self.png_filter = png_filter if png_filter in PNG_FILTERS else 'NONE'
+        self.variants = [v for v in variants if v in VARIANTS]
+        self._pool = None
+        if threads and threads > 0:
+            self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='png-encode')
+        self._pending = []
+        self._lock = threading.Lock()
+        self._encode_seconds = {}
+
+    def save(self, pixels, size, pixel_format, filename):
+        if self._pool is None:
+            self._write(pixels, size, pixel_format, filename)
+            return
+        future = self._pool.submit(self._write, pixels, size, pixel_format, filename)
+        with self._lock:
+            self._pending.append((filename, future))
+
+    def _write(self, pixels, size, pixel_format, filename):
+        start = time.perf_counter()
+        data = encode_png(pixels, size, pixel_format, self.level, self.png_filter)
+        write_atomic(filename, data)
+        for variant in self.variants:
+            small, small_size = downscale(pixels, size, pixel_format, VARIANTS[variant])
+            if all(small_size):
+                write_atomic(variant_filename(filename, variant),
+                             encode_png(small, small_size, pixel_format, self.level, self.png_filter))
+        seconds = time.perf_counter() - start
+        with self._lock:
+            if len(self._encode_seconds) > 256:  # nobody is collecting them
+                self._encode_seconds.clear()
+            self._encode_seconds[filename] = seconds
+        logging.debug('wrote %s (%d bytes) in %.3fs', filename, len(data), seconds)
+
+    def encode_seconds(self, filename):
+        """How long the last encode and write of filename took (once it has
+        finished), or None. Each timing is handed out once."""
+        with self._lock:
+            return self._encode_seconds.pop(filename, None)
+
+    def wait(self):
+        """Block until every queued image is written. Failures are logged, not
+        raised -- one bad chart must not stop the others being published --
+        and their filenames returned."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        failed = []
+        for filename, future in pending:
+            try:
+                future.result()
+            except Exception:
+                logging.exception('could not write %s', filename)
+                failed.append(filename)
+        return failed
@@ -0,0 +1,428 @@
+#!/usr/bin/python3
+"""
+n1mm_view publisher
+
+Copies what headless writes to IMAGE_DIR on to other places -- a web root, a
+remote server -- in the background, sending only what changed.
+
+After each render cycle headless calls Publisher.notify() and carries on.
+A scanner thread then hashes IMAGE_DIR into a manifest ({filename: sha1},
+re-hashing only files whose size or mtime moved), and every target compares
+that manifest with what it last published successfully and sends just the
+difference. Each target has its own thread, so a slow or unreachable site
+never holds up the others (or rendering), and its own retry with
+exponential backoff. What each target has published is kept in
+IMAGE_DIR/.publish_state.json, so a restart doesn't resend everything.
+
+Targets (PUBLISH_TARGETS in n1mm_view.ini):
+
+    /var/www/html/n1mm or file:///var/www/html/n1mm
+        copy into a local directory (written atomically)
+    http://host/path/  or  https://...
+        HTTP PUT each file to path/<filename>, DELETE removed ones
+    POST_FILE_COMMAND (its own setting)
+        run the command (e.g. rsync) once whenever anything changed
+
+ImageManifest writes IMAGE_DIR/manifest.json, a short content hash per
+PNG, which the generated index.html uses for cache-friendly image URLs
+(name.png?v=<hash>). Targets receive it after the PNGs it describes.
+
+Dotfiles (temp files, fingerprints, this module's state) are never
+published. status() reports, per target, how far behind it is: the age of
+the oldest change it has not yet published.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import imagewriter
+
+__author__ = 'Tom Schaefer NY4I'
+__copyright__ = 'Copyright 2026 Thomas M. Schaefer'
+__license__ = 'Simplified BSD'
+
+STATE_FILENAME = '.publish_state.json'
+MANIFEST_FILENAME = 'manifest.json'
+MANIFEST_HASH_LENGTH = 12
+
+RETRY_MIN_SECONDS = 2
+HTTP_TIMEOUT = 30
+COMMAND_TIMEOUT = 600
+
+CONTENT_TYPES = {
+    '.png': 'image/png',
+    '.html': 'text/html; charset=utf-8',
+    '.json': 'application/json',
+    '.js': 'application/javascript',
+    '.css': 'text/css',
+}
+
+
+def _file_digest(path):
+    sha = hashlib.sha1()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1 << 16), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class Manifest:
+    """Content hashes of the publishable files in a directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.files = {}        # name -> sha1
+        self.changed_at = {}   # name -> when that content was first seen
+        self._stat_cache = {}  # name -> (size, mtime_ns, sha1)
+
+    def scan(self):
+        """Re-read the directory. Returns True if anything changed."""
+        now = time.time()
+        files = {}
+        try:
+            names = os.listdir(self.directory)
+        except OSError as e:
+            logging.warning('cannot scan %s for publishing: %s', self.directory, e)
+            return False
+        for name in names:
+            if name.startswith('.'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+                if not os.path.isfile(path):
+                    continue
+                cached = self._stat_cache.get(name)
+                if cached is not None and cached[:2] == (st.st_size, st.st_mtime_ns):
+                    digest = cached[2]
+                else:
+                    digest = _file_digest(path)
+                    self._stat_cache[name] = (st.st_size, st.st_mtime_ns, digest)
+            except OSError:
+                continue  # replaced or removed while we looked
+            files[name] = digest
+            if self.files.get(name) != digest:
+                self.changed_at[name] = now
+        for name in set(self.files) - set(files):
+            self._stat_cache.pop(name, None)
+            self.changed_at[name] = now
+        changed = files != self.files
+        self.files = files
+        return changed
+
+
+class ImageManifest:
+    """IMAGE_DIR/manifest.json: {"updated": time, "images": {png: hash}}.
+
+    The hash is a prefix of the PNG's sha1, so a page that loads
+    name.png?v=<hash> gets a URL that changes exactly when the image does and
+    can be cached for good. The file is only rewritten when a hash changed.
+    """
+
+    def __init__(self, directory, precompress=False):
+        self.manifest = Manifest(directory)
+        self.filename = os.path.join(directory, MANIFEST_FILENAME)
+        self.images = None
+        self.precompress = precompress  # also write .gz/.br copies
+
+    def update(self):
+        """Re-hash changed PNGs and rewrite the manifest if needed.
+        Returns True if it was written."""
+        self.manifest.scan()
+        images = {name: digest[:MANIFEST_HASH_LENGTH]
+                  for name, digest in sorted(self.manifest.files.items())
+                  if name.lower().endswith('.png')}
+        if images == self.images and os.path.exists(self.filename):
+            return False
+        data = {'updated': round(time.time(), 3), 'images': images}
+        body = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        try:
+            imagewriter.write_atomic(self.filename, body)
+            if self.precompress:
+                imagewriter.write_precompressed(self.filename, body)
+        except OSError:
+            logging.exception('could not write image manifest %s', self.filename)
+            return False
+        self.images = images
+        return True
+
+
+def remove_image_manifest(directory):
+    """Delete a manifest left by an earlier run, so that pages fall back to
+    reloading images instead of trusting hashes that are no longer kept up."""
+    try:
+        os.unlink(os.path.join(directory, MANIFEST_FILENAME))
+        logging.info('removed stale %s from %s', MANIFEST_FILENAME, directory)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        logging.exception('could not remove %s from %s', MANIFEST_FILENAME, directory)
+
+
+class DirectoryTarget:
+    """Copy files into a local directory (e.g. a web server's document root)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = path
+
+    def put(self, source, name, digest):
+        os.makedirs(self.path, exist_ok=True)
+        with open(source, 'rb') as fh:
+            imagewriter.write_atomic(os.path.join(self.path, name), fh.read())
+
+    def delete(self, name):
+        try:
+            os.unlink(os.path.join(self.path, name))
+        except FileNotFoundError:
+            pass
+
+
+class HttpPutTarget:
+    """HTTP PUT each file to <url>/<filename>."""
+
+    def __init__(self, url):
+        self.url = url if url.endswith('/') else url + '/'
+        self.name = url
+
+    def _request(self, method, name, data=None, content_type=None):
+        req = urllib.request.Request(self.url + urllib.parse.quote(name), data=data, method=method)
+        if content_type:
+            req.add_header('Content-Type', content_type)
+        with urllib.request.urlopen(req, timeout=HTTP_TIMEOUT) as resp:
+            resp.read()
+
+    def put(self, source, name, digest):
+        with open(source, 'rb') as fh:
+            data = fh.read()
+        content_type = CONTENT_TYPES.get(os.path.splitext(name)[1].lower(), 'application/octet-stream')
+        self._request('PUT', name, data, content_type)
+
+    def delete(self, name):
+        try:
+            self._request('DELETE', name)
+        except urllib.error.HTTPError as e:
+            if e.code not in (404, 405):
+                raise
+
+
+class CommandTarget:
+    """Run a command (POST_FILE_COMMAND, typically rsync) once per change set."""
+
+    batch = True
+
+    def __init__(self, command):
+        self.command = command
+        self.name = 'command: %s' % command
+
+    def run(self):
+        # shell=True as before: POST_FILE_COMMAND is an operator-written
+        # shell command line, often with globs.
+        proc = subprocess.run(self.command, shell=True, timeout=COMMAND_TIMEOUT,
+                              stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if proc.returncode != 0:
+            err = (proc.stderr or b'').decode('utf-8', 'replace').strip()
+            raise RuntimeError('exit %d: %s' % (proc.returncode, err[:500]))
+
+
+def make_target(spec):
+    """Build a target from a PUBLISH_TARGETS entry."""
+    spec = spec.strip()
+    lower = spec.lower()
+    if lower.startswith(('http://', 'https://')):
+        return HttpPutTarget(spec)
+    if lower.startswith('file://'):
+        return DirectoryTarget(urllib.parse.unquote(urllib.parse.urlparse(spec).path))
+    return DirectoryTarget(os.path.expanduser(spec))
+
+
+def parse_targets(text):
+    """Split a PUBLISH_TARGETS value (comma or newline separated)."""
+    return [make_target(s) for s in (text or '').replace('\n', ',').split(',') if s.strip()]
+
+
+class _TargetWorker(threading.Thread):
+    """Publishes to one target, retrying with backoff on failure."""
+
+    def __init__(self, publisher, target, published, retry_max):
+        super().__init__(name='publish-%s' % target.name, daemon=True)
+        self.publisher = publisher
+        self.target = target
+        self.published = dict(published)   # name -> sha1 last sent successfully
+        self.retry_max = retry_max
+        self.wakeup = threading.Event()
+        self.failures = 0
+        self.last_success = None
+        self.last_error = None
+        self.next_retry = None
+        self.sent_files = 0
+        self.sent_bytes = 0
+
+    def pending(self, files):
+        """(names to send, names to delete) to bring the target up to date."""
+        published = dict(self.published)  # may be called from other threads
+        send = [n for n, d in files.items() if published.get(n) != d]
+        # the image manifest goes last, so a viewer never sees a hash
+        # before the image it belongs to has arrived
+        send.sort(key=lambda n: n == MANIFEST_FILENAME)
+        delete = [n for n in published if n not in files]
+        return send, delete
+
+    def run(self):
+        while not self.publisher.stopping:
+            timeout = None
+            if self.next_retry is not None:
+                timeout = max(0.0, self.next_retry - time.monotonic())
+            self.wakeup.wait(timeout)
+            self.wakeup.clear()
+            if self.publisher.stopping:
+                break
+            if self.next_retry is not None and time.monotonic() < self.next_retry:
+                continue  # still backing off; a new change doesn't cut that short
+            self._publish_once()
+
+    def _publish_once(self):
+        files = self.publisher.snapshot()
+        send, delete = self.pending(files)
+        if not send and not delete:
+            self.next_retry = None
+            return
+        start = time.monotonic()
+        nbytes = 0
+        try:
+            if getattr(self.target, 'batch', False):
+                self.target.run()
+                self.published = dict(files)
+            else:
+                for name in send:
+                    path = os.path.join(self.publisher.directory, name)
+                    try:
+                        size = os.path.getsize(path)
+                    except OSError:
+                        continue  # gone since the scan; the next scan will notice
+                    self.target.put(path, name, files[name])
+                    self.published[name] = files[name]
+                    nbytes += size
+                for name in delete:
+                    self.target.delete(name)
+                    self.published.pop(name, None)
+        except Exception as e:
+            self.failures += 1
+            delay = min(self.retry_max, RETRY_MIN_SECONDS * 2 ** (self.failures - 1))
+            delay *= random.uniform(0.8, 1.2)
+            self.next_retry = time.monotonic() + delay
+            self.last_error = '%s: %s' % (type(e).__name__, e)
+            logging.warning('publish to %s failed (attempt %d), retrying in %.0fs: %s',
+                            self.target.name, self.failures, delay, self.last_error)
+            return
+        finally:
+            self.publisher.save_state(self)
+        self.failures = 0
+        self.next_retry = None
+        self.last_error = None
+        self.last_success = time.time()
+        self.sent_files += len(send)
+        self.sent_bytes += nbytes
+        logging.info('published %d changed, %d removed files (%d bytes) to %s in %.2fs',
+                     len(send), len(delete), nbytes, self.target.name, time.monotonic() - start)
+        # more may have changed while we were sending
+        if self.publisher.snapshot() != files:
+            self.wakeup.set()
+
+
+class Publisher:
+    """Background, change-only publishing of a directory to several targets."""
+
+    def __init__(self, directory, targets, retry_max=300):
+        self.directory = directory
+        self.manifest = Manifest(directory)
+        self.stopping = False
+        self._lock = threading.Lock()
+        self._scan_wakeup = threading.Event()
+        self._state_file = os.path.join(directory, STATE_FILENAME)
+        self._state_lock = threading.Lock()
+        self._state = self._load_state()
+        self.workers = [_TargetWorker(self, t, self._state.get(t.name, {}), retry_max) for t in targets]
+        self._scanner = threading.Thread(target=self._scan_loop, name='publish-scan', daemon=True)
+        self._scanner.start()
+        for worker in self.workers:
+            worker.start()
+        logging.info('publishing %s to %s', directory, ', '.join(t.name for t in targets))
+
+    def notify(self):
+        """Files in the directory may have changed; publish them. Never blocks."""
+        self._scan_wakeup.set()
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.manifest.files)
+
+    def _scan_loop(self):
+        while True:
+            self._scan_wakeup.wait()
+            self._scan_wakeup.clear()
+            if self.stopping:
+                return
+            with self._lock:
+                changed = self.manifest.scan()
+            if changed or any(w.pending(self.manifest.files) != ([], []) for w in self.workers):
+                for worker in self.workers:
+                    worker.wakeup.set()
+
+    def _load_state(self):
+        try:
+            with open(self._state_file) as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError):
+            logging.warning('ignoring unreadable publish state %s', self._state_file)
+            return {}
+
+    def save_state(self, worker):
+        """Persist what `worker` has published (called from its own thread)."""
+        with self._state_lock:
+            self._state[worker.target.name] = dict(worker.published)
+            try:
+                imagewriter.write_atomic(self._state_file,
+                                         json.dumps(self._state, sort_keys=True).encode('utf-8'))
+            except OSError:
+                logging.exception('could not save publish state')
+
+    def status(self):
+        """Per-target publishing state, including lag: seconds since the
+        oldest change the target hasn't received yet (0 when up to date)."""
+        now = time.time()
+        files = self.snapshot()
+        result = []
+        for w in self.workers:
+            send, delete = w.pending(files)
+            changed = [self.manifest.changed_at.get(n, now) for n in send + delete]
+            result.append({
+                'target': w.target.name,
+                'pending': len(send) + len(delete),
+                'lag_seconds': round(now - min(changed), 1) if changed else 0.0,
+                'last_success': w.last_success,
+                'last_error': w.last_error,
+                'failures': w.failures,
+                'files_sent': w.sent_files,
+                'bytes_sent': w.sent_bytes,
+            })
+        return result
+
+    def stop(self, timeout=5):
+        self.stopping = True
+        self._scan_wakeup.set()
+        for worker in self.workers:
+            worker.wakeup.set()
+        for thread in [self._scanner] + self.workers:
+            thread.join(timeout)
@@ -0,0 +1,394 @@
+#!/usr/bin/python3
+"""
+n1mm_view render pool
+
+Runs headless chart builds on a small pool of worker processes.
+
+create_images() gathers all of its data from the database up front and then
+describes each output as a ChartJob: the graphics builder to call, the
+(picklable) data to call it with, and where the PNG goes. run_jobs() either
+renders the list in-process, one after another (RENDER_WORKERS = 0, the
+historical behaviour), or hands it to a RenderPool, which farms the jobs out
+to worker processes and collects them as they finish.
+
+Workers are started from a forkserver that has already imported graphics --
+and with it matplotlib, Cartopy and pygame -- so each one starts warm and a
+job pays only for its own build. The worker writes the PNG itself, so only
+the job description and a short result cross the process boundary.
+
+Each job may carry a fingerprint of its inputs (see fingerprint()). With a
+FingerprintStore, run_jobs() skips any job whose fingerprint matches the one
+recorded when its PNG was last written, so one new QSO re-renders only the
+charts whose data it actually changed. Jobs without a fingerprint (the radio
+panel, which dims stale radios by the clock) are always rendered.
+
+A builder that raises is logged and reported as failed; the other jobs carry
+on. A worker that dies outright (e.g. the OOM killer) breaks the pool; the
+remaining jobs of that cycle are marked failed and the pool is rebuilt on the
+next cycle.
+
+For a long event the pool can also be supervised (RENDER_RECYCLE_CYCLES,
+RENDER_RECYCLE_RSS_MB): its workers are replaced after a number of cycles or
+when one grows past an RSS limit, with the replacements started a cycle
+early so there is no gap in rendering. Each job reports its worker's RSS,
+which is what the limit is checked against.
+"""
+
+import collections
+import gc
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import graphics
+import imagewriter
+import telemetry
+
+__author__ = 'Tom Schaefer NY4I'
+__copyright__ = 'Copyright 2026 Thomas M. Schaefer'
+__license__ = 'Simplified BSD'
+
+# builder:     module-level graphics function (pickled by reference)
+# args/kwargs: the data to build from; must be picklable
+# filename:    PNG to write
+# blank:       (size, title) of the placeholder written when the builder
+#              returns no data, or None to leave the existing file alone
+# collect:     run gc.collect() after the build (the map leaks without it)
+# fingerprint: digest of everything the image depends on, or None if it
+#              depends on the clock too and must always be rendered
+ChartJob = collections.namedtuple('ChartJob', 'builder args kwargs filename blank collect fingerprint')
+ChartJob.__new__.__defaults__ = ({}, None, None, False, None)
+
+# name: basename of the PNG; seconds: wall time of the build and encode;
+# error: None on success, else a one-line description; build / encode: the
+# builder's and the PNG encode's share of seconds (None if not measured);
+# rss: resident size of the process that rendered it, after the job
+ChartResult = collections.namedtuple('ChartResult', 'name seconds error build encode rss')
+ChartResult.__new__.__defaults__ = (None, None, None)
+
+
+def _job_name(job):
+    return os.path.splitext(os.path.basename(job.filename))[0]
+
+
+def _canonical(value):
+    # json.dumps fallback: sets in a stable order, anything else by repr
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    return repr(value)
+
+
+def fingerprint(*inputs):
+    """Stable digest of a chart's inputs.
+
+    Hashes a canonical JSON form rather than a pickle, so the result doesn't
+    depend on set ordering (string hashes are randomised per process) and
+    survives a restart.
+    """
+    text = json.dumps(inputs, sort_keys=True, default=_canonical, separators=(',', ':'))
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class FingerprintStore:
+    """
+    The fingerprint each chart's PNG was last rendered from, persisted as
+    JSON (a dotfile in IMAGE_DIR) so a restart doesn't force a full
+    re-render.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._fingerprints = {}
+        self._dirty = False
+        try:
+            with open(filename) as fh:
+                self._fingerprints = dict(json.load(fh))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError):
+            logging.warning('ignoring unreadable chart fingerprints %s', filename)
+
+    def is_current(self, job):
+        """True if job's PNG exists and was rendered from the same inputs."""
+        return (job.fingerprint is not None
+                and self._fingerprints.get(job.filename) == job.fingerprint
+                and os.path.exists(job.filename))
+
+    def record(self, job, ok):
+        # A failed render forgets the old fingerprint so the next cycle retries.
+        fp = job.fingerprint if ok else None
+        if self._fingerprints.get(job.filename) != fp:
+            if fp is None:
+                self._fingerprints.pop(job.filename, None)
+            else:
+                self._fingerprints[job.filename] = fp
+            self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        try:
+            data = json.dumps(self._fingerprints, indent=1, sort_keys=True).encode('utf-8')
+            imagewriter.write_atomic(self.filename, data)
+            self._dirty = False
+        except OSError:
+            logging.exception('could not save chart fingerprints to %s', self.filename)
+
+
+def render_job(job, wait=True):
+    """Build one chart and write its PNG. Never raises; returns a ChartResult.
+
+    wait=False leaves a background encode (PNG_ENCODE_THREADS) running so the
+    next in-process job can overlap it; the caller must then call
+    graphics.wait_for_saved_images() itself.
+    """
+    name = _job_name(job)
+    start = time.perf_counter()
+    build = encode = None
+    try:
+        image_data, image_size = job.builder(*job.args, **job.kwargs)
+        if image_data is None and job.blank is not None:
+            image_data, image_size = graphics.make_blank_chart(*job.blank)
+        build = time.perf_counter() - start
+        if image_data is not None:
+            graphics.save_image(image_data, image_size, job.filename)
+            if wait:
+                if job.filename in graphics.wait_for_saved_images():
+                    raise OSError('could not write %s' % job.filename)
+                encode = graphics.encode_seconds(job.filename)
+        else:
+            logging.debug('%s: builder returned no image', name)
+        error = None
+    except Exception as e:
+        logging.exception('%s: render failed', name)
+        error = '%s: %s' % (type(e).__name__, e)
+    if job.collect:
+        gc.collect()
+    return ChartResult(name, time.perf_counter() - start, error, build, encode, telemetry.rss_bytes())
+
+
+def _warm_worker():
+    """Pool initializer. The forkserver has already imported graphics; also
+    load the zone polygons the map builds lazily, so the first real map job
+    doesn't pay for them."""
+    if graphics.config.MULTS in graphics.ZONE_GEOJSON:
+        graphics._load_zone_geometries(graphics.ZONE_GEOJSON[graphics.config.MULTS])
+    logging.debug('render worker %d ready', os.getpid())
+
+
+def _mp_context():
+    try:
+        ctx = multiprocessing.get_context('forkserver')
+        # Import graphics (matplotlib, Cartopy, pygame, fonts) once in the
+        # server; every worker forked from it starts with them loaded.
+        ctx.set_forkserver_preload(['graphics'])
+        return ctx
+    except ValueError:  # no forkserver on this platform
+        return multiprocessing.get_context('spawn')
+
+
+def _worker_rss():
+    """Warm-up job: makes the executor start a worker; reports its RSS."""
+    return telemetry.rss_bytes()
+
+
+def _mb(nbytes):
+    return (nbytes or 0) / 1e6
+
+
+class RenderPool:
+    """
+    A bounded pool of warm render worker processes, kept across cycles.
+
+    With recycle_cycles and/or recycle_rss set, the workers are supervised:
+    after that many render cycles, or once a worker reports a resident size
+    over recycle_rss bytes after a job, the pool's workers are replaced. A
+    spare set is started (and warmed up) a cycle ahead -- when the cycle
+    count is one short or RSS passes RECYCLE_SPARE_FRACTION of the limit --
+    so the next cycle renders on it straight away rather than waiting for
+    fresh processes. Each recycle is logged with the workers' memory growth.
+    """
+
+    RECYCLE_SPARE_FRACTION = 0.8
+
+    def __init__(self, workers, recycle_cycles=0, recycle_rss=0):
+        self.workers = max(1, int(workers))
+        self.recycle_cycles = max(0, int(recycle_cycles or 0))
+        self.recycle_rss = max(0, int(recycle_rss or 0))
+        self._executor = None
+        self._warmup = []
+        self._spare = None
+        self._cycles = 0
+        self._peak_rss = None
+        self.recycles = 0
+
+    def _new_executor(self):
+        executor = ProcessPoolExecutor(max_workers=self.workers,
+                                       mp_context=_mp_context(),
+                                       initializer=_warm_worker)
+        # one warm-up job per worker starts them all now, not on first use
+        warmup = [executor.submit(_worker_rss) for _ in range(self.workers)]
+        return executor, warmup
+
+    def _ensure_executor(self):
+        if self._executor is None:
+            if self._spare is not None:
+                self._executor, self._warmup = self._spare
+                self._spare = None
+            else:
+                logging.info('starting render pool with %d workers', self.workers)
+                self._executor, self._warmup = self._new_executor()
+            self._cycles = 0
+            self._peak_rss = None
+        return self._executor
+
+    @staticmethod
+    def _start_rss(warmup):
+        """Largest RSS the warm-up jobs reported, if they have finished."""
+        sizes = []
+        for future in warmup:
+            try:
+                if future.done() and future.result() is not None:
+                    sizes.append(future.result())
+            except Exception:
+                pass
+        return max(sizes) if sizes else None
+
+    def _end_cycle(self):
+        if not (self.recycle_cycles or self.recycle_rss):
+            return
+        self._cycles += 1
+        peak = self._peak_rss or 0
+        reason = None
+        if self.recycle_cycles and self._cycles >= self.recycle_cycles:
+            reason = 'after %d cycles' % self._cycles
+        elif self.recycle_rss and peak >= self.recycle_rss:
+            reason = 'worker RSS %.0f MB over %.0f MB' % (_mb(peak), _mb(self.recycle_rss))
+        if reason is not None:
+            self._recycle(reason)
+        elif self._spare is None and (
+                (self.recycle_cycles and self._cycles >= self.recycle_cycles - 1)
+                or (self.recycle_rss and peak >= self.recycle_rss * self.RECYCLE_SPARE_FRACTION)):
+            logging.info('starting spare render workers ahead of recycling')
+            self._spare = self._new_executor()
+
+    def _recycle(self, reason):
+        old, old_warmup = self._executor, self._warmup
+        start_rss = self._start_rss(old_warmup)
+        if self._spare is None:
+            self._spare = self._new_executor()
+        self._executor, self._warmup = self._spare
+        self._spare = None
+        self.recycles += 1
+        logging.info('recycling render workers %s: RSS %.0f MB at start, %.0f MB peak (%+.0f MB); '
+                     'replacement workers at %.0f MB',
+                     reason, _mb(start_rss), _mb(self._peak_rss),
+                     _mb(self._peak_rss) - _mb(start_rss) if start_rss and self._peak_rss else 0.0,
+                     _mb(self._start_rss(self._warmup)))
+        self._cycles = 0
+        self._peak_rss = None
+        old.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, jobs):
+        """Render jobs in parallel; yield a ChartResult for each as it finishes."""
+        executor = self._ensure_executor()
+        futures = {}
+        try:
+            for job in jobs:
+                futures[executor.submit(render_job, job)] = job
+            for future in as_completed(list(futures)):
+                job = futures[future]
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    # e.g. the job's data would not pickle
+                    logging.exception('%s: render job failed', _job_name(job))
+                    result = ChartResult(_job_name(job), 0.0, '%s: %s' % (type(e).__name__, e))
+                del futures[future]
+                if result.rss is not None:
+                    self._peak_rss = max(self._peak_rss or 0, result.rss)
+                yield result
+        except BrokenProcessPool:
+            logging.error('render worker died; restarting the pool next cycle')
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            for job in futures.values():
+                yield ChartResult(_job_name(job), 0.0, 'render worker died')
+            return
+        if jobs:
+            self._end_cycle()
+
+    def shutdown(self):
+        for executor in (self._executor, self._spare and self._spare[0]):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._spare = None
+
+
+def run_jobs(jobs, pool=None, fingerprints=None):
+    """Render jobs (in-process when pool is None) and log per-chart timings.
+
+    With a FingerprintStore, jobs whose inputs are unchanged since their PNG
+    was written are skipped. Returns the list of ChartResults for the jobs
+    that ran, in completion order.
+    """
+    start = time.perf_counter()
+    skipped = 0
+    if fingerprints is not None:
+        todo = []
+        for job in jobs:
+            if fingerprints.is_current(job):
+                logging.debug('%s: inputs unchanged, not re-rendering', _job_name(job))
+                skipped += 1
+            else:
+                todo.append(job)
+        jobs = todo
+    by_name = {_job_name(job): job for job in jobs}
+    if pool is None:
+        results_iter = (render_job(job, wait=False) for job in jobs)
+    else:
+        results_iter = pool.run(jobs)
+    results = []
+    for result in results_iter:
+        results.append(result)
+        if fingerprints is not None and pool is not None:
+            fingerprints.record(by_name[result.name], result.error is None)
+        if result.error is None:
+            logging.info('rendered %s in %.2fs', result.name, result.seconds)
+        else:
+            logging.warning('render of %s failed after %.2fs: %s',
+                            result.name, result.seconds, result.error)
+    if pool is None and results:
+        # In-process encodes may still be running: their timings come last,
+        # and a chart's fingerprint is recorded only once its PNG is on disk.
+        unwritten = graphics.wait_for_saved_images()
+        finished = []
+        for r in results:
+            filename = by_name[r.name].filename
+            if r.error is None and filename in unwritten:
+                r = r._replace(error='could not write %s' % os.path.basename(filename))
+            elif r.encode is None:
+                r = r._replace(encode=graphics.encode_seconds(filename))
+            if fingerprints is not None:
+                fingerprints.record(by_name[r.name], r.error is None)
+            finished.append(r)
+        results = finished
+    if fingerprints is not None:
+        fingerprints.save()
+    if results or skipped:
+        wall = time.perf_counter() - start
+        busy = sum(r.seconds for r in results)
+        failed = sum(1 for r in results if r.error is not None)
+        logging.info('render cycle: %d charts (%d failed, %d unchanged skipped) in %.2fs wall, '
+                     '%.2fs render time, %s',
+                     len(results), failed, skipped, wall, busy,
+                     'in-process' if pool is None else '%d workers' % pool.workers)
+    return results
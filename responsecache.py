@@ -0,0 +1,146 @@
+#!/usr/bin/python3
+"""
+n1mm_view response cache
+
+Keeps the encoded JSON of webserver.py's /api responses keyed on the
+endpoint, valid while the database is unchanged. ChangeToken reads SQLite's
+PRAGMA data_version on a connection held open for the purpose: its value
+moves whenever any other connection (the collector, an admin action) commits.
+An entry is rebuilt when the token moved or it is older than the max_age its
+caller gives, since some payloads (radio staleness, server_time) also move
+with the clock.
+
+Requests for a key that is being built wait for that build rather than
+running their own ("single flight"), so twenty phones polling at once cost
+one set of queries. Each entry carries an ETag over its content -- for the
+/api payloads, everything but server_time -- so webserver.py can answer a
+matching If-None-Match with an empty 304. A rebuild whose content is
+unchanged keeps the entry and its ETag and only takes the new body (with
+its fresh server_time), so a clock-driven rebuild doesn't cost the clients
+a full response.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+
+__author__ = 'Tom Schaefer NY4I'
+__copyright__ = 'Copyright 2026 Thomas M. Schaefer'
+__license__ = 'Simplified BSD'
+
+
+class ChangeToken:
+    """Callable returning a value that changes whenever the database does,
+    or None if it can't be read (which nothing matches)."""
+
+    def __init__(self, database):
+        self.database = database
+        self._db = None
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            try:
+                if self._db is None:
+                    self._db = sqlite3.connect(self.database, check_same_thread=False)
+                return self._db.execute('PRAGMA data_version').fetchone()[0]
+            except sqlite3.Error:
+                logging.exception('could not read the change token of %s', self.database)
+                self._close()
+                return None
+
+    def _close(self):
+        if self._db is not None:
+            try:
+                self._db.close()
+            except sqlite3.Error:
+                pass
+            self._db = None
+
+
+def content_etag(content):
+    return hashlib.sha1(content).hexdigest()[:20]
+
+
+class Entry:
+    """One cached response body."""
+
+    def __init__(self, token, body, content=None):
+        self.token = token
+        self.built = time.monotonic()
+        self.body = body
+        self.etag = content_etag(body if content is None else content)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry = None
+        self.error = None
+
+
+class ResponseCache:
+    """Single-flight cache of response bodies keyed on endpoint and a
+    change token."""
+
+    def __init__(self, token, max_entries=64):
+        self.token = token
+        self.max_entries = max_entries
+        self._entries = {}
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'builds': 0, 'shared': 0}
+
+    def get(self, key, build, max_age):
+        """The Entry for key, from the cache if the database hasn't changed
+        and it is younger than max_age seconds, else from build(). build
+        returns the body, or (body, content) when the ETag is to cover only
+        content. Concurrent misses on one key share a single build."""
+        token = self.token()
+        with self._lock:
+            entry = self._entries.get(key)
+            if (entry is not None and token is not None and entry.token == token
+                    and time.monotonic() - entry.built < max_age):
+                self.stats['hits'] += 1
+                return entry
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.stats['builds'] += 1
+            else:
+                self.stats['shared'] += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.entry
+        try:
+            built = build()
+            body, content = built if isinstance(built, tuple) else (built, built)
+            etag = content_etag(content)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry.etag == etag:
+                    # same content: same ETag, so clients holding it get a 304
+                    entry.token, entry.built, entry.body = token, time.monotonic(), body
+                else:
+                    entry = Entry(token, body, content)
+                    if len(self._entries) >= self.max_entries and key not in self._entries:
+                        self._entries.pop(next(iter(self._entries)))
+                    self._entries[key] = entry
+            flight.entry = entry
+            return entry
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,151 @@
+#!/usr/bin/python3
+"""
+n1mm_view background sampler
+
+Runs slow status probes -- systemctl, port and NTP checks, vcgencmd, chronyc,
+curl -- on a background thread instead of on the request thread, for
+hubserver.py's status page. Each probe has its own interval (how long a
+reading is good for) and timeout. A Sampler thread wakes every TICK seconds
+and hands the probes that are due to a small thread pool, so they run
+concurrently and one slow probe does not hold up the others.
+
+Requests only read snapshot(): the latest value of every probe and its age
+in seconds. A probe that is still running past its timeout is reported with
+an error and keeps its last value, marked stale, until it finishes; a probe
+is never started again while it is still running, so a hung command ties up
+one worker, not all of them.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+__author__ = 'Tom Schaefer NY4I'
+__copyright__ = 'Copyright 2026 Thomas M. Schaefer'
+__license__ = 'Simplified BSD'
+
+TICK = 0.5
+
+
+class Probe:
+    """One probe: what to call, how often and for how long."""
+
+    def __init__(self, name, func, interval, timeout):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.timeout = timeout
+        self.value = None
+        self.error = None
+        self.sampled = None   # time.monotonic() of the last good run
+        self.started = None   # time.monotonic() of the last start
+        self.running = False
+        self.runs = 0
+
+    def due(self, now):
+        return not self.running and (self.started is None or now - self.started >= self.interval)
+
+    def entry(self, now):
+        """The probe's reading as snapshot() reports it."""
+        age = None if self.sampled is None else round(now - self.sampled, 1)
+        error = self.error
+        if self.running and now - self.started > self.timeout:
+            error = 'timed out after %gs' % self.timeout
+        stale = age is None or error is not None or age > 2 * self.interval + self.timeout
+        return {'value': self.value, 'age': age, 'error': error, 'stale': stale}
+
+
+class Sampler:
+    """Runs probes on their own schedule; see the module docstring."""
+
+    def __init__(self, workers=4):
+        self.probes = {}
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._executor = None
+        self._thread = None
+
+    def add(self, name, func, interval, timeout):
+        """Sample func() every interval seconds; report it as timed out if a
+        run takes longer than timeout seconds."""
+        with self._lock:
+            self.probes[name] = Probe(name, func, interval, timeout)
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='sampler')
+            self._thread = threading.Thread(target=self._run, name='sampler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            thread, executor = self._thread, self._executor
+            self._thread = self._executor = None
+        if thread is not None:
+            thread.join()
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _sample(self, probe):
+        try:
+            value, error = probe.func(), None
+        except Exception as e:
+            # say so once when a probe starts failing, not every interval
+            log = logging.debug if probe.error else logging.warning
+            log('status probe %s failed: %s', probe.name, e)
+            value, error = None, str(e) or type(e).__name__
+        with self._lock:
+            if error is None:
+                # a failed run keeps the last value, and with it its age
+                probe.value, probe.sampled = value, time.monotonic()
+            probe.error = error
+            probe.running = False
+            probe.runs += 1
+            self._ready.notify_all()
+
+    def run_due(self, submit=None):
+        """Start every probe that is due. Returns their names."""
+        submit = submit or self._executor.submit
+        now = time.monotonic()
+        with self._lock:
+            due = [p for p in self.probes.values() if p.due(now)]
+            for probe in due:
+                probe.running, probe.started = True, now
+        for probe in due:
+            submit(self._sample, probe)
+        return [p.name for p in due]
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_due()
+            except Exception:
+                logging.exception('status sampler could not start its probes')
+            self._stop.wait(TICK)
+
+    def wait_ready(self, timeout):
+        """Wait up to timeout seconds for every probe to have run once (or to
+        be past its own timeout), so the first page after startup has data."""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                pending = [p for p in self.probes.values() if p.runs == 0
+                           and (p.started is None or now - p.started <= p.timeout)]
+                if not pending or now >= deadline:
+                    return not pending
+                self._ready.wait(deadline - now)
+
+    def snapshot(self):
+        """{name: {value, age, error, stale}} for every probe; age is seconds
+        since the value was sampled (None if it never has been)."""
+        now = time.monotonic()
+        with self._lock:
+            return {name: probe.entry(now) for name, probe in self.probes.items()}
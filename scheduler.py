@@ -0,0 +1,265 @@
+#!/usr/bin/python3
+"""
+n1mm_view render scheduler
+
+Decides, each headless cycle, which chart jobs actually run.
+
+create_images() offers every job it could build this cycle; the scheduler
+holds on to jobs that are not yet due (keeping only the newest data for each
+output) and releases them when their refresh policy says so:
+
+    always          every cycle (the map's grey line, the radio panel)
+    change          as soon as it is offered, i.e. whenever the QSO data changed
+    every <secs>    at most once per <secs> seconds
+    at HH:MM ...    once after each listed UTC time of day (and on first run)
+    off             never (e.g. a chart the web pages draw themselves)
+
+Each output also has a priority, high | normal | low. With a per-cycle
+budget (RENDER_BUDGET_SECONDS) the due jobs are taken in priority order using
+each job's last measured render time, and what doesn't fit waits for a later
+cycle -- high-priority jobs always run, and nothing waits more than
+MAX_DEFERRALS cycles. Policies come from the [RENDER SCHEDULE] section of
+n1mm_view.ini, keyed by PNG basename, e.g.
+
+    sections_worked_map = every 180, high
+    new_ops_yoy = at 00:05, low
+"""
+
+import datetime
+import logging
+import os
+import re
+import time
+
+__author__ = 'Tom Schaefer NY4I'
+__copyright__ = 'Copyright 2026 Thomas M. Schaefer'
+__license__ = 'Simplified BSD'
+
+PRIORITIES = {'high': 0, 'normal': 1, 'low': 2}
+
+# A job deferred for lack of budget this many cycles in a row runs anyway.
+MAX_DEFERRALS = 3
+
+_TIME_OF_DAY = re.compile(r'^([01]?\d|2[0-3]):([0-5]\d)$')
+
+
+class RefreshPolicy:
+    """When an output is due, and how important it is."""
+
+    def __init__(self, when='change', interval=0, times=(), priority='normal'):
+        self.when = when
+        self.interval = interval
+        self.times = tuple(times)
+        self.priority = priority
+
+    @classmethod
+    def parse(cls, text, default=None):
+        """Parse e.g. 'every 300, low' or 'at 00:05 12:00'. Returns default
+        (or a plain 'change' policy) if text is empty; raises ValueError if it
+        doesn't parse."""
+        base = default or cls()
+        text = (text or '').strip().lower()
+        if not text:
+            return base
+        parts = [p.strip() for p in text.split(',')]
+        priority = base.priority
+        if len(parts) > 1:
+            if len(parts) > 2 or parts[1] not in PRIORITIES:
+                raise ValueError('bad priority in %r' % text)
+            priority = parts[1]
+        words = parts[0].split()
+        if not words:
+            return cls(base.when, base.interval, base.times, priority)
+        if words[0] in PRIORITIES and len(words) == 1:
+            return cls(base.when, base.interval, base.times, words[0])
+        if words[0] in ('always', 'change', 'off') and len(words) == 1:
+            return cls(words[0], priority=priority)
+        if words[0] == 'every' and len(words) == 2:
+            interval = float(words[1])
+            if interval <= 0:
+                raise ValueError('interval must be positive in %r' % text)
+            return cls('every', interval=interval, priority=priority)
+        if words[0] == 'at' and len(words) > 1:
+            times = []
+            for word in words[1:]:
+                m = _TIME_OF_DAY.match(word)
+                if m is None:
+                    raise ValueError('bad time of day %r in %r' % (word, text))
+                times.append((int(m.group(1)), int(m.group(2))))
+            return cls('at', times=sorted(times), priority=priority)
+        raise ValueError('cannot parse refresh policy %r' % text)
+
+    def is_due(self, last_run, now):
+        """last_run/now are epoch seconds; last_run is None if never rendered."""
+        if self.when == 'off':
+            return False
+        if last_run is None or self.when in ('always', 'change'):
+            return True
+        if self.when == 'every':
+            return now - last_run >= self.interval
+        # 'at': due if any scheduled time fell between last_run and now
+        return self._last_slot(now) > last_run
+
+    def next_slot(self, now):
+        """Epoch seconds of the next scheduled time after now."""
+        day = datetime.datetime.fromtimestamp(now, datetime.timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0)
+        for days_ahead in (0, 1):
+            start = day + datetime.timedelta(days=days_ahead)
+            for hour, minute in self.times:
+                slot = (start + datetime.timedelta(hours=hour, minutes=minute)).timestamp()
+                if slot > now:
+                    return slot
+        return now + 86400
+
+    def _last_slot(self, now):
+        """Epoch seconds of the most recent scheduled time at or before now."""
+        day = datetime.datetime.fromtimestamp(now, datetime.timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0)
+        for days_back in (0, 1):
+            start = day - datetime.timedelta(days=days_back)
+            for hour, minute in reversed(self.times):
+                slot = (start + datetime.timedelta(hours=hour, minutes=minute)).timestamp()
+                if slot <= now:
+                    return slot
+        return 0
+
+    def __str__(self):
+        if self.when == 'every':
+            when = 'every %gs' % self.interval
+        elif self.when == 'at':
+            when = 'at ' + ' '.join('%02d:%02d' % t for t in self.times)
+        else:
+            when = self.when
+        return '%s, %s' % (when, self.priority)
+
+
+class _Entry:
+    def __init__(self, job, policy):
+        self.job = job
+        self.policy = policy
+        self.last_run = None
+        self.cost = None      # smoothed render seconds
+        self.deferrals = 0
+
+
+class RenderScheduler:
+    """
+    Tracks every output across cycles. offer() the jobs a cycle could build,
+    take select() as the jobs to run, then report the results with record().
+    """
+
+    def __init__(self, overrides=None, budget=0.0, workers=0):
+        self.overrides = dict(overrides or {})
+        self.budget = float(budget or 0)
+        self.workers = max(1, int(workers or 1))
+        self._entries = {}
+        for name, text in self.overrides.items():
+            try:
+                RefreshPolicy.parse(text)
+            except ValueError as e:
+                logging.warning('[RENDER SCHEDULE] %s: %s; using the default', name, e)
+
+    def policy(self, name, default):
+        """The refresh policy output `name` gets: its [RENDER SCHEDULE] entry
+        applied over default."""
+        text = self.overrides.get(name)
+        if text:
+            try:
+                return RefreshPolicy.parse(text, default)
+            except ValueError:
+                pass  # warned about in __init__
+        return default
+
+    def offer(self, name, job, default_policy):
+        """Make the newest job for output `name` available to select()."""
+        entry = self._entries.get(name)
+        if entry is None:
+            entry = self._entries[name] = _Entry(job, self.policy(name, default_policy))
+            logging.debug('schedule %s: %s', name, entry.policy)
+        entry.job = None if entry.policy.when == 'off' else job
+
+    def select(self, now=None, is_current=None):
+        """Return the jobs to render this cycle, most important first.
+
+        is_current(job) -> True marks a job whose output is already up to
+        date (see renderpool.FingerprintStore); it is retired without
+        counting against the budget.
+        """
+        now = time.time() if now is None else now
+        due = []
+        for name, entry in self._entries.items():
+            if entry.job is None:
+                continue
+            if not entry.policy.is_due(entry.last_run, now):
+                logging.debug('schedule %s: not due (%s)', name, entry.policy)
+                continue
+            if is_current is not None and is_current(entry.job):
+                entry.job = None
+                entry.last_run = now
+                entry.deferrals = 0
+                continue
+            due.append((PRIORITIES[entry.policy.priority], -entry.deferrals, name, entry))
+        due.sort(key=lambda d: d[:3])
+
+        budget = self.budget * self.workers
+        load = _load_per_cpu()
+        if load is not None and load > 1.0:
+            # Other work is already using the CPUs: shrink the budget to match.
+            budget /= load
+        spent = 0.0
+        selected = []
+        deferred = 0
+        for priority, _, name, entry in due:
+            cost = entry.cost or 0.0
+            if (self.budget > 0 and priority > PRIORITIES['high'] and selected
+                    and spent + cost > budget and entry.deferrals < MAX_DEFERRALS):
+                entry.deferrals += 1
+                deferred += 1
+                logging.info('schedule %s: deferred (est %.2fs, %.2f of %.2fs budget used, load %s)',
+                             name, cost, spent, budget, 'n/a' if load is None else '%.2f' % load)
+                continue
+            spent += cost
+            selected.append(entry.job)
+            logging.debug('schedule %s: run (%s, est %.2fs)', name, entry.policy, cost)
+        waiting = sum(1 for e in self._entries.values() if e.job is not None) - len(selected)
+        if due or deferred:
+            logging.info('schedule: %d due, %d to render (est %.2fs), %d deferred, %d waiting',
+                         len(due), len(selected), spent, deferred, waiting - deferred)
+        return selected
+
+    def next_due(self, now=None):
+        """Seconds until the next pending interval / time-of-day job is due,
+        or None if nothing is waiting on the clock."""
+        now = time.time() if now is None else now
+        waits = []
+        for entry in self._entries.values():
+            policy = entry.policy
+            if entry.job is None or entry.last_run is None:
+                continue
+            if policy.when == 'every':
+                waits.append(entry.last_run + policy.interval - now)
+            elif policy.when == 'at':
+                waits.append(policy.next_slot(now) - now)
+        return max(0.0, min(waits)) if waits else None
+
+    def record(self, results, now=None):
+        """Note the renderpool.ChartResults of the jobs select() returned."""
+        now = time.time() if now is None else now
+        for result in results:
+            entry = self._entries.get(result.name)
+            if entry is None:
+                continue
+            entry.deferrals = 0
+            entry.cost = result.seconds if entry.cost is None else 0.7 * entry.cost + 0.3 * result.seconds
+            if result.error is None:
+                entry.job = None
+                entry.last_run = now
+            # a failed job stays pending and is retried when next due
+
+
+def _load_per_cpu():
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):  # not available on Windows
+        return None
@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+"""
+n1mm_view systemd service status
+
+One `systemctl is-active unit...` call for every unit a page shows, instead
+of one call per unit, cached for a few seconds. webserver.py's admin page and
+hubserver.py's status sampler both ask a ServiceStatus, so a page costs at
+most one systemctl run per TTL however many units it lists and however many
+people have it open; concurrent callers of an expired cache wait for the one
+run in progress instead of starting their own.
+"""
+
+import subprocess
+import threading
+import time
+
+__author__ = 'Tom Schaefer NY4I'
+__copyright__ = 'Copyright 2026 Thomas M. Schaefer'
+__license__ = 'Simplified BSD'
+
+
+def is_active(units, timeout=3):
+    """{unit: 'active' | 'inactive' | 'failed' | ...} from a single
+    `systemctl is-active` run. If systemctl can't answer per unit (no
+    systemd, a timeout), every unit gets the reason instead."""
+    units = list(units)
+    try:
+        r = subprocess.run(['systemctl', 'is-active'] + units,
+                           capture_output=True, text=True, timeout=timeout)
+    except Exception as e:
+        return {unit: 'error: %s' % e for unit in units}
+    states = r.stdout.split()
+    if len(states) != len(units):
+        reason = r.stderr.strip() or r.stdout.strip() or 'unknown'
+        return {unit: reason for unit in units}
+    return dict(zip(units, states))
+
+
+class ServiceStatus:
+    """is_active() for a fixed list of units, cached for ttl seconds."""
+
+    def __init__(self, units, ttl=5, timeout=3):
+        self.units = list(units)
+        self.ttl = ttl
+        self.timeout = timeout
+        self._states = None
+        self._checked = None  # time.monotonic() of the last systemctl run
+        self._lock = threading.Lock()
+
+    def get(self):
+        """{unit: state} for every unit, at most ttl seconds old."""
+        with self._lock:
+            if self._checked is None or time.monotonic() - self._checked >= self.ttl:
+                self._states = is_active(self.units, self.timeout)
+                self._checked = time.monotonic()
+            return dict(self._states)
+
+    def age(self):
+        """Seconds since systemd was last asked, or None if it never was."""
+        with self._lock:
+            return None if self._checked is None else time.monotonic() - self._checked
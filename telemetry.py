@@ -0,0 +1,176 @@
+#!/usr/bin/python3
+"""
+n1mm_view render telemetry
+
+Per-cycle timings and memory figures for headless, kept in a rolling JSON
+file so a slow or bloated cycle can be explained after the fact.
+
+create_images() fills in a CycleStats as it goes: the time of each database
+query, and for each chart the build (the graphics builder) and encode (PNG
+compression and write) times, then the wait for background encodes and the
+hand-off to the publisher. finish() adds the process's RSS and the garbage
+collector's object and collection counts. StatsFile keeps the last N cycle
+records in IMAGE_DIR/.render_stats.json together with a summary -- p50/p95
+per chart, per query and per cycle -- which the webserver's admin page
+shows. The file is a dotfile, so the publisher doesn't copy it anywhere.
+"""
+
+import gc
+import json
+import logging
+import os
+import sys
+import time
+
+import imagewriter
+
+__author__ = 'Tom Schaefer NY4I'
+__copyright__ = 'Copyright 2026 Thomas M. Schaefer'
+__license__ = 'Simplified BSD'
+
+STATS_FILENAME = '.render_stats.json'
+
+
+def rss_bytes():
+    """Resident set size of this process in bytes, or None if unknown."""
+    try:
+        with open('/proc/self/statm') as fh:
+            return int(fh.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        # peak rather than current, but the best there is without /proc
+        # (kilobytes on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers, or None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def _round(seconds):
+    return None if seconds is None else round(seconds, 4)
+
+
+class CycleStats:
+    """Timings and memory figures for one render cycle."""
+
+    def __init__(self):
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.queries = {}
+        self.charts = {}
+        self.steps = {}
+        self.extra = {}
+
+    def timed(self, func, *args, **kwargs):
+        """Call func, recording its run time as a query named after it."""
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            name = func.__name__
+            self.queries[name] = _round(self.queries.get(name, 0.0) + time.perf_counter() - start)
+
+    def step(self, name, seconds):
+        self.steps[name] = _round(seconds)
+
+    def add_results(self, results):
+        """Record renderpool.ChartResults."""
+        for r in results:
+            self.charts[r.name] = {
+                'seconds': _round(r.seconds),
+                'build': _round(r.build),
+                'encode': _round(r.encode),
+                'error': r.error,
+            }
+            if r.rss is not None:
+                self.charts[r.name]['rss'] = r.rss
+
+    def finish(self):
+        """The cycle's record, with memory figures as of now."""
+        record = {
+            'started': round(self.started, 3),
+            'seconds': _round(time.perf_counter() - self._start),
+            'queries': self.queries,
+            'charts': self.charts,
+            'steps': self.steps,
+            'rss': rss_bytes(),
+            'gc_objects': len(gc.get_objects()),
+            'gc_counts': list(gc.get_count()),
+            'gc_collections': [s.get('collections', 0) for s in gc.get_stats()],
+        }
+        record.update(self.extra)
+        return record
+
+
+def _p50_p95(values):
+    values = [v for v in values if v is not None]
+    return {'p50': percentile(values, 50), 'p95': percentile(values, 95), 'n': len(values)}
+
+
+def summarize(cycles):
+    """p50/p95 per chart (total, build, encode), per query and per cycle."""
+    charts = {}
+    queries = {}
+    for cycle in cycles:
+        for name, c in cycle.get('charts', {}).items():
+            entry = charts.setdefault(name, {'seconds': [], 'build': [], 'encode': [], 'failures': 0})
+            for key in ('seconds', 'build', 'encode'):
+                entry[key].append(c.get(key))
+            if c.get('error'):
+                entry['failures'] += 1
+        for name, seconds in cycle.get('queries', {}).items():
+            queries.setdefault(name, []).append(seconds)
+    rss = [c.get('rss') for c in cycles if c.get('rss') is not None]
+    return {
+        'cycles': _p50_p95([c.get('seconds') for c in cycles]),
+        'charts': {name: dict({k: _p50_p95(e[k]) for k in ('seconds', 'build', 'encode')},
+                              failures=e['failures'])
+                   for name, e in sorted(charts.items())},
+        'queries': {name: _p50_p95(v) for name, v in sorted(queries.items())},
+        'rss': {'first': rss[0], 'last': rss[-1], 'max': max(rss)} if rss else None,
+    }
+
+
+class StatsFile:
+    """The last `keep` cycle records plus their summary, as a JSON file."""
+
+    def __init__(self, filename, keep=100):
+        self.filename = filename
+        self.keep = max(1, int(keep))
+        self.cycles = []
+        try:
+            with open(filename) as fh:
+                self.cycles = list(json.load(fh).get('cycles', []))[-self.keep:]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError, TypeError):
+            logging.warning('ignoring unreadable render stats %s', filename)
+
+    def add(self, record):
+        self.cycles.append(record)
+        del self.cycles[:-self.keep]
+        data = {'updated': time.time(), 'summary': summarize(self.cycles), 'cycles': self.cycles}
+        try:
+            imagewriter.write_atomic(self.filename, json.dumps(data, separators=(',', ':')).encode('utf-8'))
+        except OSError:
+            logging.exception('could not save render stats to %s', self.filename)
+
+
+def read_stats(image_dir):
+    """The stats file headless keeps in image_dir, or None."""
+    try:
+        with open(os.path.join(image_dir, STATS_FILENAME)) as fh:
+            return json.load(fh)
+    except (OSError, ValueError, TypeError):
+        return None
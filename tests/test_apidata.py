@@ -0,0 +1,124 @@
+"""
+Tests for apidata.py - API payloads and their static snapshot files.
+"""
+import calendar
+import gzip
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import apidata
+import dataaccess
+from tests.test_dataaccess import MockOperators, MockStations
+
+
+@pytest.fixture
+def db():
+    """In-memory database with two QSOs and two radios on the same band/mode."""
+    conn = sqlite3.connect(':memory:')
+    cursor = conn.cursor()
+    dataaccess.create_tables(conn, cursor)
+    operators = MockOperators(conn, cursor)
+    stations = MockStations(conn, cursor)
+    for i, (stamp, band, mode, call) in enumerate([('2024-06-22 18:00:00', '14', 'CW', 'K1ABC'),
+                                                     ('2024-06-22 18:05:00', '7', 'SSB', 'W2DEF')]):
+        dataaccess.record_contact(
+            conn, cursor, operators, stations,
+            timestamp=time.strptime(stamp, '%Y-%m-%d %H:%M:%S'), mycall='W1AW', band=band, mode=mode,
+            operator='OP%d' % i, station='Station%d' % i, rx_freq=0, tx_freq=0, callsign=call,
+            rst_sent='599', rst_recv='599', exchange='2A', section='CT', comment='', qso_id='qso-%d' % i,
+            state='CT')
+    now = int(time.time())
+    for nr in (1, 2):
+        dataaccess.record_radio_info(
+            conn, cursor, station_name='Station%d' % nr, radio_nr=1, freq=14025000, tx_freq=14025000,
+            mode='CW', op_call='W1AW', is_running=1, is_transmitting=0, is_connected=1, is_split=0,
+            is_active=1, radio_name='IC-7300', antenna=1, last_update=now)
+    yield cursor
+    conn.close()
+
+
+class TestPayloads:
+    """Tests for the /api payload builders."""
+
+    def test_radio_dup_flagged(self, db):
+        radios = apidata.radio(db)['radios']
+        assert len(radios) == 2
+        assert all(r['dup'] and r['band'] == '20M' for r in radios)
+
+    def test_last_qso(self, db):
+        q = apidata.last_qso(db)['last_qso']
+        assert (q['callsign'], q['band'], q['mode'], q['operator']) == ('W2DEF', '40M', 'PHONE', 'OP1')
+
+    def test_summary_totals(self, db):
+        data = apidata.summary(db)
+        assert data['totals'] == {'cw': 1, 'phone': 1, 'data': 0, 'total': 2}
+        assert [b['band'] for b in data['bands']] == ['40M', '20M']
+
+
+class TestChartPayloads:
+    """Tests for the /api/chart payloads."""
+
+    def test_band_modes_stacked(self, db):
+        data = apidata.chart_band_modes(db)
+        assert (data['type'], data['labels']) == ('stacked', ['40M', '20M'])
+        assert {s['name']: s['values'] for s in data['series']} == {'CW': [0, 1], 'Phone': [1, 0], 'Data': [0, 0]}
+
+    def test_operators_largest_first(self, db):
+        data = apidata.chart_operators(db)
+        assert data['labels'] == ['OP0', 'OP1']
+        assert data['series'] == [{'name': 'QSOs', 'values': [1, 1]}]
+
+    def test_rates_line_per_band(self, db):
+        data = apidata.chart_rates(db)
+        assert data['type'] == 'line'
+        assert [s['name'] for s in data['series']] == ['40M', '20M']
+        assert all(len(s['values']) == len(data['labels']) for s in data['series'])
+        assert data['labels'][0] == calendar.timegm((2024, 6, 22, 18, 0, 0))
+
+    def test_every_chart_is_json(self, db):
+        for name, build in apidata.CHARTS.items():
+            data = json.loads(apidata.encode(build(db)))
+            assert data['chart'] == name
+
+    def test_browser_charts_name_real_payloads(self):
+        assert set(apidata.BROWSER_CHARTS.values()) <= set(apidata.CHARTS)
+
+
+class TestSnapshotWriter:
+    """Tests for SnapshotWriter and remove_snapshots."""
+
+    def test_same_shape_as_api(self, db, tmp_path):
+        writer = apidata.SnapshotWriter(str(tmp_path), ['last_qso', 'summary'])
+        assert writer.write_snapshots(db) == ['last_qso', 'summary']
+        snapshot = json.loads((tmp_path / 'api_summary.json').read_text())
+        live = apidata.summary(db)
+        assert snapshot.pop('server_time') <= live.pop('server_time')
+        assert snapshot == live
+
+    def test_rewritten_only_on_change(self, db, tmp_path, monkeypatch):
+        writer = apidata.SnapshotWriter(str(tmp_path), ['summary'])
+        writer.write_snapshots(db)
+        # a later server_time alone is not a change
+        later = time.time() + 5
+        monkeypatch.setattr(apidata.time, 'time', lambda: later)
+        assert writer.write_snapshots(db) == []
+        db.execute('DELETE FROM qso_log WHERE callsign = ?', ('K1ABC',))
+        assert writer.write_snapshots(db) == ['summary']
+
+    def test_precompressed_copy(self, db, tmp_path):
+        apidata.SnapshotWriter(str(tmp_path), ['summary'], precompress=True).write_snapshots(db)
+        packed = (tmp_path / 'api_summary.json.gz').read_bytes()
+        assert gzip.decompress(packed) == (tmp_path / 'api_summary.json').read_bytes()
+
+    def test_remove_keeps_named(self, db, tmp_path):
+        apidata.SnapshotWriter(str(tmp_path), ['last_qso', 'summary']).write_snapshots(db)
+        apidata.remove_snapshots(str(tmp_path), keep=['summary'])
+        assert sorted(os.listdir(tmp_path)) == ['api_summary.json']
@@ -0,0 +1,139 @@
+"""
+Tests for apistream.py - the /api/stream Server-Sent Events fan-out.
+"""
+import json
+import os
+import sqlite3
+import sys
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import apistream
+
+
+class Payloads:
+    """Fake apidata.PAYLOADS counting builds; value is what they return."""
+
+    def __init__(self):
+        self.builds = {'radio': 0, 'summary': 0}
+        self.value = 1
+
+    def radio(self, cursor):
+        self.builds['radio'] += 1
+        return {'server_time': int(time.time()), 'radios': [self.value]}
+
+    def summary(self, cursor):
+        self.builds['summary'] += 1
+        return {'server_time': int(time.time()), 'total': self.value}
+
+    def broadcaster(self, **kwargs):
+        return apistream.Broadcaster(None, payloads={'radio': self.radio, 'summary': self.summary},
+                                     intervals={'radio': 0, 'summary': 0}, **kwargs)
+
+
+def _events(chunks):
+    """(name, data) pairs out of SSE bytes."""
+    out = []
+    for block in b''.join(chunks).decode().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if 'event' in lines:
+            out.append((lines['event'], json.loads(lines['data'])))
+    return out
+
+
+class TestBroadcaster:
+    """Tests for Broadcaster."""
+
+    def test_built_once_for_all_subscribers(self):
+        fake = Payloads()
+        b = fake.broadcaster()
+        subs = [b.subscribe(['radio']) for _ in range(3)]
+        assert b.poll_once(None, 1) == ['radio']
+        assert fake.builds == {'radio': 1, 'summary': 0}
+        for sub in subs:
+            assert [name for name, _ in _events(b.wait(sub, 0))] == ['radio']
+
+    def test_pushed_only_on_change(self):
+        fake = Payloads()
+        b = fake.broadcaster()
+        sub = b.subscribe(['radio', 'summary'])
+        b.poll_once(None, 1)
+        b.wait(sub, 0)
+        # database unchanged and REBUILD_SECONDS not up: not even built
+        assert b.poll_once(None, 1) == []
+        assert fake.builds['radio'] == 1
+        # database changed but the payload didn't: built, not pushed
+        assert b.poll_once(None, 2) == []
+        assert b.wait(sub, 0) == []
+        fake.value = 2
+        assert b.poll_once(None, 3) == ['radio', 'summary']
+        assert _events(b.wait(sub, 0))[0][1]['radios'] == [2]
+
+    def test_slow_subscriber_gets_newest_only(self):
+        fake = Payloads()
+        b = fake.broadcaster()
+        sub = b.subscribe(['radio'])
+        for version in (1, 2, 3):
+            fake.value = version
+            b.poll_once(None, version)
+        assert [data['radios'] for _, data in _events(b.wait(sub, 0))] == [[3]]
+
+    def test_late_subscriber_gets_current_payload(self):
+        fake = Payloads()
+        b = fake.broadcaster()
+        b.subscribe(['radio'])
+        b.poll_once(None, 1)
+        late = b.subscribe(['radio', 'bogus'])
+        assert late.topics == {'radio'}
+        [(name, data)] = _events(b.wait(late, 0))
+        assert name == 'radio' and data['server_time'] >= int(time.time()) - 1
+
+    def test_max_clients(self):
+        b = Payloads().broadcaster(max_clients=1)
+        first = b.subscribe(['radio'])
+        assert b.subscribe(['radio']) is None
+        b.unsubscribe(first)
+        assert b.subscribe(['radio']) is not None
+
+    def test_stream_unsubscribes_on_close(self, monkeypatch):
+        monkeypatch.setattr(apistream, 'HEARTBEAT_SECONDS', 0)
+        b = Payloads().broadcaster()
+        sub = b.subscribe(['radio'])
+        gen = b.stream(sub)
+        assert next(gen).startswith(b'retry:')
+        assert next(gen) == b': ping\n\n'
+        gen.close()
+        assert b.subscribers == []
+
+
+class TestBroadcasterThread:
+    """The background thread against a real database."""
+
+    def test_pushes_and_stops(self, tmp_path):
+        path = str(tmp_path / 'stream.db')
+        db = sqlite3.connect(path)
+        db.execute('CREATE TABLE t (v INTEGER)')
+        db.commit()
+
+        def count(cursor):
+            return {'server_time': int(time.time()), 'n': cursor.execute('SELECT COUNT(*) FROM t').fetchone()[0]}
+
+        b = apistream.Broadcaster(path, payloads={'count': count}, intervals={'count': 0.05})
+        sub = b.subscribe(['count'])
+        [(name, data)] = _events(b.wait(sub, 5))
+        assert (name, data['n']) == ('count', 0)
+        db.execute('INSERT INTO t VALUES (1)')
+        db.commit()
+        deadline = time.time() + 5
+        seen = []
+        while time.time() < deadline and not any(data['n'] == 1 for _, data in seen):
+            seen += _events(b.wait(sub, 0.5))
+        assert any(data['n'] == 1 for _, data in seen)
+        b.unsubscribe(sub)
+        deadline = time.time() + 5
+        while b._thread is not None and time.time() < deadline:
+            time.sleep(0.05)
+        assert b._thread is None
+        db.close()
@@ -0,0 +1,82 @@
+"""
+Tests for compression.py - negotiated gzip/brotli for the Flask apps.
+"""
+import gzip
+import os
+import sys
+
+import pytest
+from flask import Flask, Response, jsonify, request
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compression
+
+PAGE = '<html>' + 'a static template ' * 200 + '</html>'
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    compressor = compression.Compressor(min_size=100)
+    compressor.init_app(app)
+    app.compressor = compressor
+
+    @app.route('/page')
+    def page():
+        return PAGE
+
+    @app.route('/tiny')
+    def tiny():
+        return jsonify({'ok': True})
+
+    @app.route('/tagged')
+    def tagged():
+        response = Response(PAGE, mimetype='application/json')
+        response.set_etag('abc')
+        return response.make_conditional(request)
+
+    @app.route('/png')
+    def png():
+        return Response(b'\x89PNG' * 100, mimetype='image/png')
+
+    return app
+
+
+class TestCompressor:
+    """Tests for Compressor."""
+
+    def test_gzip_when_accepted(self, app, monkeypatch):
+        monkeypatch.setattr(compression.imagewriter, 'brotli', None)
+        r = app.test_client().get('/page', headers={'Accept-Encoding': 'gzip, br'})
+        assert r.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in r.headers['Vary']
+        assert gzip.decompress(r.data).decode() == PAGE
+
+    def test_identity_when_not_accepted(self, app):
+        r = app.test_client().get('/page')
+        assert 'Content-Encoding' not in r.headers
+        assert r.get_data(as_text=True) == PAGE
+
+    def test_small_and_binary_left_alone(self, app):
+        client = app.test_client()
+        assert 'Content-Encoding' not in client.get('/tiny', headers={'Accept-Encoding': 'gzip'}).headers
+        assert 'Content-Encoding' not in client.get('/png', headers={'Accept-Encoding': 'gzip'}).headers
+
+    def test_static_page_compressed_once(self, app, monkeypatch):
+        monkeypatch.setattr(compression.imagewriter, 'brotli', None)
+        client = app.test_client()
+        for _ in range(3):
+            client.get('/page', headers={'Accept-Encoding': 'gzip'})
+        stats = app.compressor.stats()['page']
+        assert (stats['requests'], stats['compressed'], stats['cached']) == (3, 3, 2)
+        assert stats['saved'] == stats['bytes_in'] - stats['bytes_out'] > 0
+
+    def test_etag_weakened_and_304_kept(self, app, monkeypatch):
+        monkeypatch.setattr(compression.imagewriter, 'brotli', None)
+        client = app.test_client()
+        r = client.get('/tagged', headers={'Accept-Encoding': 'gzip'})
+        assert r.headers['ETag'] == 'W/"abc"'
+        again = client.get('/tagged', headers={'Accept-Encoding': 'gzip', 'If-None-Match': r.headers['ETag']})
+        assert again.status_code == 304
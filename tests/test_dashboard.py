@@ -0,0 +1,193 @@
+"""
+Tests for dashboard.py - the crawl line and the thin-client image watcher.
+"""
+import importlib
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dataaccess
+from tests.test_dataaccess import MockOperators, MockStations
+
+_MODULES = ('pygame', 'pygame.font', 'graphics', 'dashboard')
+
+
+@pytest.fixture(scope='module')
+def dashboard():
+    """dashboard.py imported with the real pygame. test_graphics.py swaps a
+    mock pygame into sys.modules and imports graphics itself, so these are
+    imported afresh here and sys.modules is put back afterwards."""
+    saved = {name: sys.modules.pop(name, None) for name in _MODULES}
+    yield importlib.import_module('dashboard')
+    for name, module in saved.items():
+        if module is None:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = module
+
+
+@pytest.fixture
+def crawl(dashboard):
+    """A crawl on a 200 pixel wide screen, with no messages yet."""
+    return dashboard.CrawlMessages(dashboard.pygame.Surface((200, 20)), (200, 20))
+
+
+class TestCrawlMessages:
+    """Tests for CrawlMessages."""
+
+    def test_strip_kept_while_scrolling(self, crawl):
+        crawl.set_message(0, 'W1AW Field Day ' * 5)  # wider than the screen
+        crawl.crawl_message()
+        strip = crawl.strip
+        for _ in range(20):
+            crawl.crawl_message()
+        assert crawl.strip is strip
+        assert crawl.first_x == 200 - 21 * 4
+
+    def test_changed_message_rendered_again(self, crawl):
+        crawl.set_message(0, 'W1AW')
+        crawl.set_message(1, '18:00:00')
+        crawl.crawl_message()
+        old = crawl.message_surface(1)
+        assert crawl.message_surface(1) is old
+        crawl.set_message(1, '18:00:01')
+        new = crawl.message_surface(1)
+        assert new is not old
+        strip = crawl.strip
+        for _ in range(500):
+            crawl.crawl_message()
+            if any(surf is new for surf in crawl.message_surfaces):
+                break
+        else:
+            pytest.fail('changed message never scrolled on')
+        assert crawl.strip is not strip
+
+    def test_all_messages_empty(self, crawl):
+        drawn = [crawl.crawl_message() for _ in range(300)]
+        assert any(rect.width == 0 for rect in drawn)
+        crawl.set_message(3, 'database not ready')
+        for _ in range(100):
+            crawl.crawl_message()
+        assert any(surf is crawl.message_surface(3) for surf in crawl.message_surfaces)
+
+
+def _add_qso(conn, call, section, stamp):
+    cursor = conn.cursor()
+    dataaccess.record_contact(
+        conn, cursor, MockOperators(conn, cursor), MockStations(conn, cursor),
+        timestamp=time.strptime(stamp, '%Y-%m-%d %H:%M:%S'), mycall='W1AW', band='14', mode='CW',
+        operator='OP1', station='Station1', rx_freq=0, tx_freq=0, callsign=call,
+        rst_sent='599', rst_recv='599', exchange='2A', section=section, comment='', qso_id='qso-' + call,
+        state='')
+
+
+class _FastEvent(threading.Event):
+    """Runs watch_images' once-a-second loop every 20 ms."""
+
+    def wait(self, timeout=None):
+        return super().wait(0.02)
+
+
+class TestWatchImages:
+    """Tests for watch_images, the thin-client chart and crawl updater."""
+
+    @pytest.fixture
+    def start(self, dashboard, tmp_path, monkeypatch):
+        """Starts watch_images on its own thread with IMAGE_DIR tmp_path and
+        the database tmp_path/n1mm_view.db; returns its queue."""
+        monkeypatch.setattr(dashboard.config, 'DATABASE_FILENAME', str(tmp_path / 'n1mm_view.db'))
+        monkeypatch.setattr(dashboard.config, 'IMAGE_DIR', str(tmp_path))
+        monkeypatch.setattr(dashboard.config, 'SHOW_MULT_ALERT', True)
+        monkeypatch.setattr(dashboard, '_previous_mults', set())
+        event = _FastEvent()
+        threads = []
+
+        def start():
+            q = queue.Queue()
+            threads.append(threading.Thread(target=dashboard.watch_images, args=(q, event, (100, 100))))
+            threads[-1].start()
+            return q
+        yield start
+        event.set()
+        for thread in threads:
+            thread.join(5)
+
+    @pytest.fixture
+    def watched(self, dashboard, tmp_path, start):
+        """watch_images running over a database with one QSO and an IMAGE_DIR
+        with one chart; yields (queue, database, chart path)."""
+        conn = sqlite3.connect(str(tmp_path / 'n1mm_view.db'))
+        dataaccess.create_tables(conn, conn.cursor())
+        _add_qso(conn, 'K1ABC', 'CT', '2024-06-22 18:00:00')
+        chart = str(tmp_path / dashboard.IMAGE_FILES[dashboard.QSO_COUNTS_TABLE_INDEX])
+        dashboard.pygame.image.save(dashboard.pygame.Surface((8, 8)), chart)
+        yield start(), conn, chart
+        conn.close()
+
+    @staticmethod
+    def _next(q, kind, index, text=''):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            try:
+                message = q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if message[:2] == (kind, index) and (not text or text in message[2]):
+                return message
+        pytest.fail('no message %d for %d' % (kind, index))
+
+    def test_changes_reach_the_crawl_and_the_charts(self, dashboard, watched):
+        q, conn, chart = watched
+        assert 'K1ABC' in self._next(q, dashboard.CRAWL_MESSAGE, 3)[2]
+        assert self._next(q, dashboard.CRAWL_MESSAGE, 0)[2] == ''
+        assert self._next(q, dashboard.IMAGE_MESSAGE, dashboard.QSO_COUNTS_TABLE_INDEX)[3] == (8, 8)
+
+        _add_qso(conn, 'W2DEF', 'ME', '2024-06-22 18:05:00')
+        assert self._next(q, dashboard.CRAWL_MESSAGE, 5)[2] == 'NEW MULT: ME - Maine!'
+
+        dashboard.pygame.image.save(dashboard.pygame.Surface((6, 6)), chart)
+        assert self._next(q, dashboard.IMAGE_MESSAGE, dashboard.QSO_COUNTS_TABLE_INDEX)[3] == (6, 6)
+        time.sleep(0.2)
+        assert all(message[0] != dashboard.IMAGE_MESSAGE for message in list(q.queue))
+
+    def test_database_not_ready(self, dashboard, watched):
+        q, conn, chart = watched
+        self._next(q, dashboard.CRAWL_MESSAGE, 0)
+        conn.execute('DROP TABLE qso_log')
+        conn.commit()
+        dashboard.update_database_messages(q)
+        assert self._next(q, dashboard.CRAWL_MESSAGE, 0)[2] == 'database not ready'
+
+    def test_database_created_after_start(self, dashboard, tmp_path, start):
+        q = start()
+        time.sleep(0.1)
+        conn = sqlite3.connect(str(tmp_path / 'n1mm_view.db'))
+        dataaccess.create_tables(conn, conn.cursor())
+        _add_qso(conn, 'K1ABC', 'CT', '2024-06-22 18:00:00')
+        conn.close()
+        self._next(q, dashboard.CRAWL_MESSAGE, 3, 'K1ABC')  # may follow one read before the QSO
+
+    def test_read_error_cleared_without_a_new_qso(self, dashboard, watched, monkeypatch):
+        q, conn, chart = watched
+        self._next(q, dashboard.CRAWL_MESSAGE, 0)
+        get_last_qso = dashboard.dataaccess.get_last_qso
+        locked = [True]
+
+        def flaky_get_last_qso(cursor):
+            if locked:
+                locked.clear()
+                raise sqlite3.OperationalError('database is locked')
+            return get_last_qso(cursor)
+        monkeypatch.setattr(dashboard.dataaccess, 'get_last_qso', flaky_get_last_qso)
+        monkeypatch.setattr(dashboard.config, 'DATA_DWELL_TIME', 3600)
+        _add_qso(conn, 'W2DEF', 'ME', '2024-06-22 18:05:00')
+        assert self._next(q, dashboard.CRAWL_MESSAGE, 0)[2] == 'database read error'
+        assert self._next(q, dashboard.CRAWL_MESSAGE, 0)[2] == ''
@@ -0,0 +1,114 @@
+"""
+Tests for dbwatch.py - database change detection.
+"""
+import os
+import sqlite3
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dataaccess
+import dbwatch
+
+
+def _make_db(path):
+    db = sqlite3.connect(path)
+    dataaccess.create_tables(db, db.cursor())
+    return db
+
+
+def _add_qso(db, timestamp):
+    db.execute("INSERT INTO qso_log (timestamp, mycall, band_id, mode_id, operator_id, station_id, "
+               "rx_freq, tx_freq, callsign, rst_sent, rst_recv, exchange, section, comment, qso_id) "
+               "VALUES (?, 'W1AW', 4, 1, 1, 1, 0, 0, 'K1ABC', '599', '599', '1A', 'CT', '', ?)",
+               (timestamp, 'qso%d' % timestamp))
+    db.commit()
+
+
+class TestDatabaseWatcher:
+    """Tests for DatabaseWatcher."""
+
+    def test_first_poll_is_baseline(self, tmp_path):
+        path = str(tmp_path / 'n1mm_view.db')
+        _make_db(path).close()
+        watcher = dbwatch.DatabaseWatcher(path)
+        assert watcher.poll() is False
+        assert watcher.poll() is False
+
+    def test_commit_by_other_connection_detected(self, tmp_path):
+        path = str(tmp_path / 'n1mm_view.db')
+        db = _make_db(path)
+        watcher = dbwatch.DatabaseWatcher(path)
+        watcher.poll()
+        _add_qso(db, 1000)
+        assert watcher.poll() is True
+        assert watcher.poll() is False
+
+    def test_probe_filters_unrelated_commits(self, tmp_path):
+        path = str(tmp_path / 'n1mm_view.db')
+        db = _make_db(path)
+        watcher = dbwatch.DatabaseWatcher(path, probe=dataaccess.get_qso_signature)
+        watcher.poll()
+        db.execute("INSERT INTO radio_info (station_name, radio_nr, freq, last_update) VALUES ('S1', 1, 14000000, 0)")
+        db.commit()
+        assert watcher.poll() is False
+        _add_qso(db, 1000)
+        assert watcher.poll() is True
+
+    def test_failed_probe_is_no_change(self, tmp_path):
+        path = str(tmp_path / 'n1mm_view.db')
+        db = _make_db(path)
+        failing = []
+
+        def probe(cursor):
+            if failing:
+                raise sqlite3.OperationalError('database is locked')
+            return dataaccess.get_qso_signature(cursor)
+
+        watcher = dbwatch.DatabaseWatcher(path, probe=probe)
+        watcher.poll()
+        failing.append(True)
+        db.execute("INSERT INTO radio_info (station_name, radio_nr, freq, last_update) VALUES ('S1', 1, 14000000, 0)")
+        db.commit()
+        assert watcher.poll() is False
+        failing.clear()
+        assert watcher.poll() is False
+        _add_qso(db, 1000)
+        failing.append(True)
+        assert watcher.poll() is False
+        failing.clear()
+        assert watcher.poll() is True
+
+    def test_wait_for_change_counts_change_before_call(self, tmp_path):
+        path = str(tmp_path / 'n1mm_view.db')
+        db = _make_db(path)
+        watcher = dbwatch.DatabaseWatcher(path, probe=dataaccess.get_qso_signature)
+        watcher.poll()
+        _add_qso(db, 1000)
+        assert watcher.wait_for_change(5, poll_interval=0.05, debounce=0.1) is True
+        assert watcher.wait_for_change(0.2, poll_interval=0.05, debounce=0.1) is False
+
+    def test_missing_database(self, tmp_path):
+        watcher = dbwatch.DatabaseWatcher(str(tmp_path / 'missing.db'))
+        assert watcher.data_version() is None
+        assert watcher.poll() is False
+        assert not os.path.exists(str(tmp_path / 'missing.db'))
+
+    def test_database_created_after_first_poll(self, tmp_path):
+        path = str(tmp_path / 'n1mm_view.db')
+        watcher = dbwatch.DatabaseWatcher(path, probe=dataaccess.get_qso_signature)
+        assert watcher.poll() is False
+        db = _make_db(path)
+        _add_qso(db, 1000)
+        assert watcher.poll() is True
+        assert watcher.poll() is False
+
+    def test_replaced_database_detected(self, tmp_path):
+        path = str(tmp_path / 'n1mm_view.db')
+        _make_db(path).close()
+        watcher = dbwatch.DatabaseWatcher(path)
+        watcher.poll()
+        os.rename(path, path + '.old')
+        _make_db(path).close()
+        assert watcher.poll() is True
@@ -0,0 +1,115 @@
+"""
+Tests for framestore.py - shared-memory frames between processes.
+"""
+import multiprocessing
+import os
+import sys
+import time
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import framestore
+
+
+def _write_frames(name, values):
+    store = framestore.FrameStore.attach(name, 2, 16)
+    for value in values:
+        store.write(1, bytes([value]) * 16, (2, 2))
+    store.close()
+
+
+@pytest.fixture
+def store():
+    s = framestore.FrameStore(2, 16)
+    yield s
+    s.close()
+
+
+class TestFrameStore:
+    """Tests for FrameStore."""
+
+    def test_empty_slot(self, store):
+        assert store.read(0) is None
+
+    def test_round_trip(self, store):
+        seq = store.write(0, memoryview(bytes(range(12))), (2, 2))
+        view, size, read_seq = store.read(0)
+        assert bytes(view) == bytes(range(12))
+        assert size == (2, 2)
+        assert read_seq == seq == 1
+        del view
+
+    def test_double_buffer_keeps_displayed_frame(self, store):
+        store.write(0, b'\x01' * 16, (2, 2))
+        shown, _, _ = store.read(0)
+        store.write(0, b'\x02' * 16, (2, 2))
+        # the frame on screen is untouched by the newer one
+        assert bytes(shown) == b'\x01' * 16
+        newer, _, seq = store.read(0)
+        assert bytes(newer) == b'\x02' * 16
+        assert seq == 2
+        del shown, newer
+
+    def test_unacknowledged_frame_overwritten_after_wait(self, store, monkeypatch):
+        monkeypatch.setattr(framestore, 'ACK_WAIT_SECONDS', 0.05)
+        for value in (1, 2, 3):
+            store.write(0, bytes([value]) * 16, (2, 2))
+        view, _, seq = store.read(0)
+        assert (bytes(view), seq) == (b'\x03' * 16, 3)
+        del view
+
+    def test_oversize_frame_rejected(self, store):
+        assert not store.fits(17)
+        with pytest.raises(ValueError):
+            store.write(0, b'\x00' * 17, (1, 17))
+
+    def test_ack_during_write_kept(self, store, monkeypatch):
+        writer = framestore.FrameStore.attach(store.name, 2, 16)
+        monkeypatch.setattr(framestore, 'ACK_WAIT_SECONDS', 0.05)
+        writer.write(0, b'\x01' * 16, (2, 2))
+        publish = writer._publish
+
+        def ack_then_publish(*args):
+            store.read(0)  # the reader takes frame 1 while frame 2 is copied
+            publish(*args)
+        monkeypatch.setattr(writer, '_publish', ack_then_publish)
+        writer.write(0, b'\x02' * 16, (2, 2))
+        monkeypatch.undo()
+        assert writer._acked(0) == 1
+        store.read(0)
+        monkeypatch.setattr(framestore, 'ACK_WAIT_SECONDS', 5)
+        start = time.monotonic()
+        writer.write(0, b'\x03' * 16, (2, 2))
+        assert time.monotonic() - start < 1  # frame 2 was acked: no stall
+        writer.close()
+
+    def test_publish_during_read_kept(self, store, monkeypatch):
+        writer = framestore.FrameStore.attach(store.name, 2, 16)
+        monkeypatch.setattr(framestore, 'ACK_WAIT_SECONDS', 0.05)
+        writer.write(0, b'\x01' * 16, (2, 2))
+        published = store._published
+
+        def read_then_publish(slot):
+            fields = published(slot)
+            if fields[0] == 1:
+                writer.write(0, b'\x02' * 16, (2, 2))  # frame 2 lands mid-read
+            return fields
+        monkeypatch.setattr(store, '_published', read_then_publish)
+        view, _, seq = store.read(0)
+        assert (bytes(view), seq) == (b'\x01' * 16, 1)
+        newer, _, seq = store.read(0)
+        assert (bytes(newer), seq) == (b'\x02' * 16, 2)
+        del view, newer
+        writer.close()
+
+    def test_other_process_writes(self, store):
+        proc = multiprocessing.Process(target=_write_frames, args=(store.name, [7]))
+        proc.start()
+        proc.join(10)
+        view, size, seq = store.read(1)
+        assert (bytes(view), size, seq) == (b'\x07' * 16, (2, 2), 1)
+        assert store.read(0) is None
+        del view
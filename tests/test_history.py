@@ -0,0 +1,61 @@
+"""
+Tests for history.py - tiered ring buffers of hub vitals.
+"""
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import history
+
+T0 = 1_700_000_100  # a multiple of 300, so buckets line up with it
+
+
+class TestHistory:
+    """Tests for History."""
+
+    def test_buckets_keep_mean_min_max(self):
+        h = history.History()
+        for i, value in enumerate((1, 3, 8, 2)):
+            h.record('load', value, T0 + i)  # one 5 s bucket
+        h.record('load', 4, T0 + 5)
+        assert h.query('load', now=T0 + 6)['points'] == [[T0, 3.5, 1, 8], [T0 + 5, 4.0, 4, 4]]
+
+    def test_fixed_memory(self):
+        h = history.History(tiers=((5, 10), (60, 10)))
+        for i in range(1000):
+            h.record('temp', 50, T0 + 5 * i)
+        tiers = h._series['temp']
+        assert [len(t.buckets) for t in tiers] == [10, 10]
+
+    def test_finest_tier_that_covers_the_span(self):
+        h = history.History(tiers=((5, 12), (60, 100)))
+        for i in range(240):  # 20 minutes at 5 s
+            h.record('mem_pct', i, T0 + 5 * i)
+        now = T0 + 1200
+        assert h.query('mem_pct', seconds=50, now=now)['step'] == 5
+        whole = h.query('mem_pct', now=now)
+        assert whole['step'] == 60 and len(whole['points']) == 20
+        assert whole['points'][0] == [T0, 5.5, 0, 11]
+
+    def test_decimated_to_width(self):
+        h = history.History()
+        for i in range(300):
+            h.record('load', i % 7, T0 + 5 * i)
+        result = h.query('load', seconds=1500, width=100, now=T0 + 1500)
+        assert len(result['points']) == 100
+        assert result['step'] == 15
+        assert max(p[3] for p in result['points']) == 6
+
+    def test_rate_from_totals(self):
+        h = history.History()
+        h.record_rate('qso_rate', 100, T0, per=60)
+        h.record_rate('qso_rate', 110, T0 + 30, per=60)
+        h.record_rate('qso_rate', 5, T0 + 60, per=60)   # collector restarted
+        h.record_rate('qso_rate', 5, T0 + 90, per=60)
+        points = h.query('qso_rate', now=T0 + 90)['points']
+        assert [p[1] for p in points] == [20.0, 0.0]
+
+    def test_unknown_series(self):
+        assert history.History().query('nope') is None
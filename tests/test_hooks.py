@@ -0,0 +1,105 @@
+"""
+Tests for hooks.py - event hook queue, coalescing and counters.
+"""
+import os
+import stat
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hooks
+
+
+@pytest.fixture
+def script(tmp_path):
+    """An executable hook that appends its event and a few fields to a log."""
+    log = tmp_path / 'hook.log'
+    path = tmp_path / 'hook.sh'
+    path.write_text('#!/bin/sh\necho "$1 $N1MMV_STATION $N1MMV_PREVIOUS_BAND $N1MMV_BAND '
+                    '$N1MMV_COALESCED" >> "%s"\n' % log)
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path), log
+
+
+def _hooks(script_path, **settings):
+    config = SimpleNamespace(HOOK_NEW_MULTIPLIER_SCRIPT=script_path,
+                             HOOK_OPERATOR_CHANGE_SCRIPT=script_path,
+                             HOOK_BAND_CHANGE_SCRIPT=script_path, **settings)
+    return hooks.EventHooks(config)
+
+
+def _held(h, monkeypatch):
+    """Keep queued events in the queue: no workers."""
+    monkeypatch.setattr(h, '_start_workers', lambda: None)
+    return h
+
+
+class TestEventHooks:
+    """Tests for EventHooks."""
+
+    def test_runs_on_worker_pool(self, script):
+        path, log = script
+        h = _hooks(path, HOOK_MAX_CONCURRENT=2)
+        for call in ('W1AW', 'K1ABC', 'N0XYZ'):
+            h.fire('new_multiplier', {'station': 'R1', 'callsign': call, 'band': '20M'})
+        h.close(timeout=10)
+        assert len(log.read_text().splitlines()) == 3
+        assert len(h._threads) == 2
+        stats = h.stats()['new_multiplier']
+        assert (stats['queued'], stats['ok'], stats['dropped']) == (3, 3, 0)
+        assert stats['latency_max'] >= stats['latency_p50'] > 0
+
+    def test_band_burst_merged(self, script, monkeypatch):
+        path, log = script
+        h = _held(_hooks(path), monkeypatch)
+        h.fire('band_change', {'station': 'R1', 'band': '40M', 'previous_band': '20M'})
+        h.fire('band_change', {'station': 'R2', 'band': '80M', 'previous_band': '40M'})
+        h.fire('band_change', {'station': 'R1', 'band': '15M', 'previous_band': '40M'})
+        assert len(h._queue) == 2
+        monkeypatch.undo()
+        h._start_workers()
+        h.close(timeout=10)
+        assert sorted(log.read_text().splitlines()) == ['band_change R1 20M 15M 2', 'band_change R2 40M 80M 1']
+        assert h.stats()['band_change']['coalesced'] == 1
+
+    def test_burst_back_to_start_cancelled(self, script, monkeypatch):
+        h = _held(_hooks(script[0]), monkeypatch)
+        h.fire('operator_change', {'station': 'R1', 'operator': 'B', 'previous_operator': 'A'})
+        h.fire('operator_change', {'station': 'R1', 'operator': 'A', 'previous_operator': 'B'})
+        assert h._queue == []
+
+    def test_multipliers_never_merged_and_go_first(self, script, monkeypatch):
+        h = _held(_hooks(script[0]), monkeypatch)
+        h.fire('band_change', {'station': 'R1', 'band': '40M', 'previous_band': '20M'})
+        h.fire('new_multiplier', {'station': 'R1', 'mult_value': 'OH'})
+        h.fire('new_multiplier', {'station': 'R1', 'mult_value': 'GA'})
+        order = sorted(h._queue, key=hooks._Job.order)
+        assert [(j.event, j.fields.get('mult_value')) for j in order] == [
+            ('new_multiplier', 'OH'), ('new_multiplier', 'GA'), ('band_change', None)]
+
+    def test_overflow_coalesce(self, script, monkeypatch):
+        h = _held(_hooks(script[0], HOOK_QUEUE_SIZE=2), monkeypatch)
+        h.fire('new_multiplier', {'station': 'R1', 'mult_value': 'OH', 'band': '40M'})
+        h.fire('band_change', {'station': 'R1', 'band': '40M', 'previous_band': '20M'})
+        h.fire('new_multiplier', {'station': 'R1', 'mult_value': 'OH', 'band': '20M'})  # replaces it
+        h.fire('new_multiplier', {'station': 'R2', 'mult_value': 'OH'})     # other station
+        h.fire('new_multiplier', {'station': 'R1', 'mult_value': 'GA'})     # other multiplier
+        h.fire('operator_change', {'station': 'R1', 'operator': 'B'})       # nothing to merge with
+        assert [(j.event, j.merged) for j in h._queue] == [('new_multiplier', 2), ('band_change', 1)]
+        assert h._queue[0].fields == {'station': 'R1', 'mult_value': 'OH', 'band': '20M'}
+        stats = h.stats()
+        assert (stats['new_multiplier']['coalesced'], stats['new_multiplier']['dropped']) == (1, 2)
+        assert stats['operator_change']['dropped'] == 1
+
+    def test_overflow_drop_oldest(self, script, monkeypatch):
+        h = _held(_hooks(script[0], HOOK_QUEUE_SIZE=2, HOOK_OVERFLOW='drop_oldest'), monkeypatch)
+        h.fire('band_change', {'station': 'R1', 'band': '40M', 'previous_band': '20M'})
+        h.fire('new_multiplier', {'station': 'R1', 'mult_value': 'OH'})
+        h.fire('new_multiplier', {'station': 'R1', 'mult_value': 'GA'})   # band change goes
+        h.fire('band_change', {'station': 'R2', 'band': '15M'})           # least important: itself
+        assert [j.fields.get('mult_value') for j in h._queue] == ['OH', 'GA']
+        assert h.stats()['band_change']['dropped'] == 2
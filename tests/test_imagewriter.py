@@ -0,0 +1,171 @@
+"""
+Tests for imagewriter.py - PNG encoding and atomic file output.
+
+The PNGs are decoded here with nothing but struct/zlib so the tests check the
+file format itself rather than agreeing with another encoder.
+"""
+import gzip
+import os
+import struct
+import sys
+import zlib
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import imagewriter
+
+
+def _decode(png):
+    """Return (width, height, color_type, pixel rows) for an 8-bit PNG."""
+    assert png[:8] == imagewriter.PNG_SIGNATURE
+    pos = 8
+    chunks = []
+    while pos < len(png):
+        length, = struct.unpack('>I', png[pos:pos + 4])
+        tag = png[pos + 4:pos + 8]
+        data = png[pos + 8:pos + 8 + length]
+        crc, = struct.unpack('>I', png[pos + 8 + length:pos + 12 + length])
+        assert crc == zlib.crc32(tag + data)
+        chunks.append((tag, data))
+        pos += 12 + length
+    assert chunks[0][0] == b'IHDR'
+    assert chunks[-1][0] == b'IEND'
+    width, height, depth, color_type, _, _, _ = struct.unpack('>IIBBBBB', chunks[0][1])
+    assert depth == 8
+    bpp = 4 if color_type == 6 else 3
+    raw = zlib.decompress(b''.join(d for t, d in chunks if t == b'IDAT'))
+    stride = width * bpp
+    rows = []
+    prev = bytearray(stride)
+    for y in range(height):
+        line = raw[y * (stride + 1):(y + 1) * (stride + 1)]
+        ftype, cur = line[0], bytearray(line[1:])
+        for x in range(stride):
+            if ftype == 1:
+                left = cur[x - bpp] if x >= bpp else 0
+                cur[x] = (cur[x] + left) & 0xff
+            elif ftype == 2:
+                cur[x] = (cur[x] + prev[x]) & 0xff
+            else:
+                assert ftype == 0
+        rows.append(bytes(cur))
+        prev = cur
+    return width, height, color_type, b''.join(rows)
+
+
+def _pixels(width, height, bpp):
+    return bytes((x * 7 + y * 13 + c * 31) & 0xff
+                 for y in range(height) for x in range(width) for c in range(bpp))
+
+
+class TestEncodePng:
+    """Tests for encode_png."""
+
+    @pytest.mark.parametrize('png_filter', ['NONE', 'SUB', 'UP'])
+    def test_rgba_round_trip(self, png_filter):
+        pixels = _pixels(9, 5, 4)
+        png = imagewriter.encode_png(pixels, (9, 5), 'RGBA', 6, png_filter)
+        assert _decode(png) == (9, 5, 6, pixels)
+
+    @pytest.mark.parametrize('png_filter', ['NONE', 'SUB', 'UP'])
+    def test_rgb_round_trip(self, png_filter):
+        pixels = _pixels(4, 6, 3)
+        png = imagewriter.encode_png(pixels, (4, 6), 'RGB', 1, png_filter)
+        assert _decode(png) == (4, 6, 2, pixels)
+
+    def test_accepts_multidimensional_memoryview(self):
+        """matplotlib's buffer_rgba() is a (h, w, 4) memoryview."""
+        np = pytest.importorskip('numpy')
+        array = np.frombuffer(_pixels(3, 2, 4), dtype=np.uint8).reshape(2, 3, 4)
+        png = imagewriter.encode_png(memoryview(array), (3, 2))
+        assert _decode(png)[3] == array.tobytes()
+
+    def test_wrong_buffer_size_raises(self):
+        with pytest.raises(ValueError):
+            imagewriter.encode_png(b'\x00' * 10, (2, 2), 'RGBA')
+
+
+class TestWriteAtomic:
+    """Tests for write_atomic and ImageWriter."""
+
+    def test_replaces_existing_file(self, tmp_path):
+        target = tmp_path / 'chart.png'
+        target.write_bytes(b'old')
+        imagewriter.write_atomic(str(target), b'new')
+        assert target.read_bytes() == b'new'
+        assert os.listdir(tmp_path) == ['chart.png']
+
+    def test_failed_write_leaves_no_temp_file(self, tmp_path):
+        target = tmp_path / 'chart.png'
+        target.write_bytes(b'old')
+        with pytest.raises(TypeError):
+            imagewriter.write_atomic(str(target), 'not bytes')
+        assert target.read_bytes() == b'old'
+        assert os.listdir(tmp_path) == ['chart.png']
+
+    @pytest.mark.parametrize('threads', [0, 2])
+    def test_image_writer_saves(self, tmp_path, threads):
+        writer = imagewriter.ImageWriter(level=9, png_filter='UP', threads=threads)
+        pixels = _pixels(5, 5, 4)
+        names = [str(tmp_path / ('chart%d.png' % i)) for i in range(4)]
+        for name in names:
+            writer.save(pixels, (5, 5), 'RGBA', name)
+        writer.wait()
+        for name in names:
+            with open(name, 'rb') as fh:
+                assert _decode(fh.read()) == (5, 5, 6, pixels)
+        assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(n) for n in names)
+
+    def test_image_writer_reports_failures(self, tmp_path):
+        writer = imagewriter.ImageWriter(threads=1)
+        writer.save(_pixels(2, 2, 4), (2, 2), 'RGBA', str(tmp_path / 'good.png'))
+        writer.save(b'\x00' * 10, (2, 2), 'RGBA', str(tmp_path / 'bad.png'))
+        assert writer.wait() == [str(tmp_path / 'bad.png')]
+        assert os.listdir(tmp_path) == ['good.png']
+
+    def test_image_writer_variants(self, tmp_path):
+        writer = imagewriter.ImageWriter(variants=['half', 'thumb', 'huge'])
+        writer.save(_pixels(9, 8, 4), (9, 8), 'RGBA', str(tmp_path / 'chart.png'))
+        assert sorted(os.listdir(tmp_path)) == ['chart.half.png', 'chart.png', 'chart.thumb.png']
+        assert _decode((tmp_path / 'chart.half.png').read_bytes())[:2] == (4, 4)
+        assert _decode((tmp_path / 'chart.thumb.png').read_bytes())[:2] == (2, 2)
+        assert writer.encode_seconds(str(tmp_path / 'chart.png')) is not None
+
+
+class TestDownscale:
+    """Tests for downscale()."""
+
+    def test_box_average(self):
+        pixels = bytes([0, 10, 20, 255, 2, 12, 22, 255,
+                        4, 14, 24, 255, 6, 16, 26, 255])
+        small, size = imagewriter.downscale(pixels, (2, 2), 'RGBA', 2)
+        assert size == (1, 1)
+        assert small == bytes([3, 13, 23, 255])
+
+    def test_odd_edges_dropped(self):
+        small, size = imagewriter.downscale(_pixels(5, 3, 3), (5, 3), 'RGB', 2)
+        assert size == (2, 1)
+        assert len(small) == 2 * 1 * 3
+
+    def test_variant_filename(self):
+        assert imagewriter.variant_filename('/a/b/map.png', 'thumb') == '/a/b/map.thumb.png'
+
+
+class TestPrecompressed:
+    """Tests for compress() and write_precompressed()."""
+
+    def test_gzip_copy_round_trips(self, tmp_path):
+        path = tmp_path / 'index.html'
+        data = b'<html>' + b'chart ' * 500 + b'</html>'
+        path.write_bytes(data)
+        imagewriter.write_precompressed(str(path), data)
+        packed = (tmp_path / 'index.html.gz').read_bytes()
+        assert gzip.decompress(packed) == data
+        assert len(packed) < len(data)
+        assert (tmp_path / 'index.html.br').exists() == (imagewriter.brotli is not None)
+
+    def test_gzip_is_deterministic(self):
+        assert imagewriter.compress(b'abc' * 100, 'gzip') == imagewriter.compress(b'abc' * 100, 'gzip')
@@ -0,0 +1,209 @@
+"""
+Tests for publisher.py - change-only publishing to directory and HTTP targets.
+"""
+import http.server
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import publisher
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def _up_to_date(pub):
+    return all(s['pending'] == 0 and s['last_error'] is None for s in pub.status()) and pub.snapshot()
+
+
+class PutServer:
+    """A local HTTP server standing in for a remote site that accepts PUT."""
+
+    def __init__(self, fail_first=0):
+        self.files = {}
+        self.requests = []
+        self.fail_first = fail_first
+        outer = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_PUT(self):
+                data = self.rfile.read(int(self.headers['Content-Length']))
+                outer.requests.append(('PUT', self.path))
+                if outer.fail_first > 0:
+                    outer.fail_first -= 1
+                    self.send_response(503)
+                else:
+                    outer.files[self.path] = data
+                    self.send_response(201)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def do_DELETE(self):
+                outer.requests.append(('DELETE', self.path))
+                outer.files.pop(self.path, None)
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:%d/upload/' % self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def image_dir(tmp_path):
+    d = tmp_path / 'html'
+    d.mkdir()
+    (d / 'a.png').write_bytes(b'aaa')
+    (d / 'b.png').write_bytes(b'bbb')
+    (d / '.a.png.123.tmp').write_bytes(b'partial')
+    return d
+
+
+class TestParseTargets:
+    """Tests for parse_targets."""
+
+    def test_kinds(self):
+        targets = publisher.parse_targets('/srv/www, file:///srv/other\nhttps://host/up/')
+        assert [type(t).__name__ for t in targets] == ['DirectoryTarget', 'DirectoryTarget', 'HttpPutTarget']
+        assert targets[1].path == '/srv/other'
+
+    def test_empty(self):
+        assert publisher.parse_targets('') == []
+
+
+class TestPublisher:
+    """Tests for Publisher."""
+
+    def test_directory_target_gets_changed_files_only(self, image_dir, tmp_path):
+        dest = tmp_path / 'www'
+        pub = publisher.Publisher(str(image_dir), [publisher.DirectoryTarget(str(dest))])
+        try:
+            pub.notify()
+            assert _wait_for(lambda: _up_to_date(pub))
+            assert sorted(os.listdir(dest)) == ['a.png', 'b.png']
+
+            (dest / 'b.png').write_bytes(b'tampered')  # would be overwritten if resent
+            (image_dir / 'a.png').write_bytes(b'AAAA')
+            pub.notify()
+            assert _wait_for(lambda: (dest / 'a.png').read_bytes() == b'AAAA')
+            assert _wait_for(lambda: _up_to_date(pub))
+            assert (dest / 'b.png').read_bytes() == b'tampered'
+        finally:
+            pub.stop()
+
+    def test_http_put_target_and_delete(self, image_dir):
+        server = PutServer()
+        pub = publisher.Publisher(str(image_dir), [publisher.HttpPutTarget(server.url)])
+        try:
+            pub.notify()
+            assert _wait_for(lambda: len(server.files) == 2)
+            (image_dir / 'b.png').unlink()
+            pub.notify()
+            assert _wait_for(lambda: ('DELETE', '/upload/b.png') in server.requests)
+            assert server.files == {'/upload/a.png': b'aaa'}
+        finally:
+            pub.stop()
+            server.close()
+
+    def test_failing_target_retries_without_blocking_others(self, image_dir, tmp_path, monkeypatch):
+        monkeypatch.setattr(publisher, 'RETRY_MIN_SECONDS', 0.1)
+        server = PutServer(fail_first=2)
+        dest = tmp_path / 'www'
+        pub = publisher.Publisher(str(image_dir), [publisher.HttpPutTarget(server.url),
+                                                   publisher.DirectoryTarget(str(dest))])
+        try:
+            pub.notify()
+            assert _wait_for(lambda: dest.exists() and sorted(os.listdir(dest)) == ['a.png', 'b.png'])
+            assert _wait_for(lambda: len(server.files) == 2)
+            assert _wait_for(lambda: _up_to_date(pub))
+            assert pub.status()[0]['lag_seconds'] == 0
+        finally:
+            pub.stop()
+            server.close()
+
+    def test_lag_reported_while_behind(self, image_dir, monkeypatch):
+        monkeypatch.setattr(publisher, 'RETRY_MIN_SECONDS', 60)
+        server = PutServer(fail_first=100)
+        pub = publisher.Publisher(str(image_dir), [publisher.HttpPutTarget(server.url)])
+        try:
+            pub.notify()
+            assert _wait_for(lambda: pub.status()[0]['failures'] >= 1)
+            status = pub.status()[0]
+            assert status['pending'] == 2
+            assert status['last_error'].startswith('HTTPError')
+        finally:
+            pub.stop()
+            server.close()
+
+    def test_state_survives_restart(self, image_dir, tmp_path):
+        dest = tmp_path / 'www'
+        pub = publisher.Publisher(str(image_dir), [publisher.DirectoryTarget(str(dest))])
+        pub.notify()
+        assert _wait_for(lambda: _up_to_date(pub))
+        pub.stop()
+
+        (dest / 'a.png').write_bytes(b'tampered')
+        pub = publisher.Publisher(str(image_dir), [publisher.DirectoryTarget(str(dest))])
+        try:
+            pub.notify()
+            assert _wait_for(lambda: _up_to_date(pub))
+            assert (dest / 'a.png').read_bytes() == b'tampered'
+        finally:
+            pub.stop()
+
+
+class TestImageManifest:
+    """Tests for ImageManifest."""
+
+    def _read(self, image_dir):
+        return json.loads((image_dir / publisher.MANIFEST_FILENAME).read_text())
+
+    def test_short_hash_per_png(self, image_dir):
+        (image_dir / 'index.html').write_text('<html>')
+        assert publisher.ImageManifest(str(image_dir)).update()
+        images = self._read(image_dir)['images']
+        assert sorted(images) == ['a.png', 'b.png']
+        assert len(images['a.png']) == publisher.MANIFEST_HASH_LENGTH
+        assert images['a.png'] != images['b.png']
+
+    def test_rewritten_only_on_change(self, image_dir):
+        manifest = publisher.ImageManifest(str(image_dir))
+        manifest.update()
+        first = self._read(image_dir)['images']
+        assert not manifest.update()
+        (image_dir / 'a.png').write_bytes(b'AAAA')
+        assert manifest.update()
+        second = self._read(image_dir)['images']
+        assert second['a.png'] != first['a.png']
+        assert second['b.png'] == first['b.png']
+
+    def test_removed(self, image_dir):
+        publisher.ImageManifest(str(image_dir)).update()
+        publisher.remove_image_manifest(str(image_dir))
+        publisher.remove_image_manifest(str(image_dir))
+        assert not (image_dir / publisher.MANIFEST_FILENAME).exists()
+
+    def test_sent_after_images(self, tmp_path):
+        worker = publisher._TargetWorker(None, publisher.DirectoryTarget(str(tmp_path)), {}, 10)
+        send, _ = worker.pending({publisher.MANIFEST_FILENAME: 'm', 'a.png': 'a', 'b.png': 'b'})
+        assert send[-1] == publisher.MANIFEST_FILENAME
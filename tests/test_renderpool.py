@@ -0,0 +1,224 @@
+"""
+Tests for renderpool.py - chart fingerprints, unchanged-chart skipping and the worker pool.
+"""
+import json
+import os
+import sys
+import time
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import imagewriter
+import renderpool
+
+calls = []
+
+
+def _builder(size, data):
+    """Stands in for a graphics builder; records the call, draws nothing."""
+    calls.append(data)
+    return None, None
+
+
+def _failing_builder(size, data):
+    raise RuntimeError('boom')
+
+
+def _short_buffer_builder(size, data):
+    """An image whose pixel buffer is too small, so only the encode fails."""
+    calls.append(data)
+    return b'\x00' * 10, (2, 2)
+
+
+def _waiting_builder(size, path):
+    """Finishes once path exists (or after 30 s)."""
+    deadline = time.monotonic() + 30
+    while not os.path.exists(path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return None, None
+
+
+def _dying_builder(size, data):
+    os._exit(1)
+
+
+def _job(tmp_path, name, data, builder=_builder):
+    filename = str(tmp_path / (name + '.png'))
+    fp = renderpool.fingerprint('env', builder.__name__, ((1, 1), data), {}, None)
+    return renderpool.ChartJob(builder, ((1, 1), data), {}, filename, None, False, fp)
+
+
+class TestFingerprint:
+    """Tests for fingerprint()."""
+
+    def test_same_inputs_same_digest(self):
+        assert renderpool.fingerprint([('A', 1)], {'x': 2}) == renderpool.fingerprint([('A', 1)], {'x': 2})
+
+    def test_different_inputs_differ(self):
+        assert renderpool.fingerprint([('A', 1)]) != renderpool.fingerprint([('A', 2)])
+
+    def test_set_order_does_not_matter(self):
+        names = ['k%d' % i for i in range(50)]
+        assert renderpool.fingerprint(set(names)) == renderpool.fingerprint(set(reversed(names)))
+
+
+class TestFingerprintStore:
+    """Tests for FingerprintStore and run_jobs skipping."""
+
+    @pytest.fixture(autouse=True)
+    def reset_calls(self):
+        del calls[:]
+
+    def test_unchanged_job_is_skipped(self, tmp_path):
+        store = renderpool.FingerprintStore(str(tmp_path / '.fp.json'))
+        job = _job(tmp_path, 'pie', [1, 2, 3])
+        open(job.filename, 'wb').close()
+        renderpool.run_jobs([job], fingerprints=store)
+        renderpool.run_jobs([job], fingerprints=store)
+        assert calls == [[1, 2, 3]]
+
+    def test_changed_input_is_rendered(self, tmp_path):
+        store = renderpool.FingerprintStore(str(tmp_path / '.fp.json'))
+        first = _job(tmp_path, 'pie', [1])
+        open(first.filename, 'wb').close()
+        renderpool.run_jobs([first], fingerprints=store)
+        renderpool.run_jobs([_job(tmp_path, 'pie', [1, 2])], fingerprints=store)
+        assert calls == [[1], [1, 2]]
+
+    def test_missing_output_is_rendered(self, tmp_path):
+        store = renderpool.FingerprintStore(str(tmp_path / '.fp.json'))
+        job = _job(tmp_path, 'pie', [1])
+        renderpool.run_jobs([job], fingerprints=store)
+        renderpool.run_jobs([job], fingerprints=store)
+        assert len(calls) == 2
+
+    def test_volatile_job_always_rendered(self, tmp_path):
+        store = renderpool.FingerprintStore(str(tmp_path / '.fp.json'))
+        job = _job(tmp_path, 'map', [1])._replace(fingerprint=None)
+        open(job.filename, 'wb').close()
+        renderpool.run_jobs([job], fingerprints=store)
+        renderpool.run_jobs([job], fingerprints=store)
+        assert len(calls) == 2
+
+    def test_persisted_across_restart(self, tmp_path):
+        path = str(tmp_path / '.fp.json')
+        job = _job(tmp_path, 'pie', [1])
+        open(job.filename, 'wb').close()
+        renderpool.run_jobs([job], fingerprints=renderpool.FingerprintStore(path))
+        with open(path) as fh:
+            assert json.load(fh) == {job.filename: job.fingerprint}
+        renderpool.run_jobs([job], fingerprints=renderpool.FingerprintStore(path))
+        assert len(calls) == 1
+
+    def test_failed_render_is_retried(self, tmp_path):
+        store = renderpool.FingerprintStore(str(tmp_path / '.fp.json'))
+        job = _job(tmp_path, 'bad', [1], builder=_failing_builder)
+        open(job.filename, 'wb').close()
+        results = renderpool.run_jobs([job], fingerprints=store)
+        assert results[0].error.startswith('RuntimeError')
+        assert not store.is_current(job)
+
+    def test_unwritten_png_not_recorded(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(renderpool.graphics, '_image_writer', imagewriter.ImageWriter(threads=1))
+        store = renderpool.FingerprintStore(str(tmp_path / '.fp.json'))
+        job = _job(tmp_path, 'pie', [1], builder=_short_buffer_builder)
+        open(job.filename, 'wb').close()
+        results = renderpool.run_jobs([job], fingerprints=store)
+        assert results[0].error == 'could not write pie.png'
+        assert not store.is_current(job)
+
+    def test_corrupt_store_is_ignored(self, tmp_path):
+        path = tmp_path / '.fp.json'
+        path.write_text('not json')
+        store = renderpool.FingerprintStore(str(path))
+        job = _job(tmp_path, 'pie', [1])
+        open(job.filename, 'wb').close()
+        assert not store.is_current(job)
+
+
+class TestRenderPool:
+    """Tests for RenderPool.run with a real worker process."""
+
+    @pytest.fixture
+    def pool(self):
+        pool = renderpool.RenderPool(1)
+        yield pool
+        pool.shutdown()
+
+    def test_results_yielded_as_jobs_finish(self, pool, tmp_path):
+        go = str(tmp_path / 'go')
+        results = pool.run([_job(tmp_path, 'first', 1), _job(tmp_path, 'second', go, _waiting_builder)])
+        first = next(results)
+        assert (first.name, first.error) == ('first', None)
+        assert first.rss > 0
+        open(go, 'w').close()   # the second job is still waiting for this
+        second = next(results)
+        assert (second.name, second.error) == ('second', None)
+        assert list(results) == []
+
+    def test_dead_worker_fails_the_rest_then_pool_restarts(self, pool, tmp_path):
+        results = list(pool.run([_job(tmp_path, 'dies', 1, _dying_builder), _job(tmp_path, 'pie', 2)]))
+        assert sorted((r.name, r.error) for r in results) == [
+            ('dies', 'render worker died'), ('pie', 'render worker died')]
+        assert pool._executor is None
+        again = list(pool.run([_job(tmp_path, 'pie', 2)]))
+        assert [(r.name, r.error) for r in again] == [('pie', None)]
+
+
+class _FakeExecutor:
+    def __init__(self):
+        self.shut_down = False
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+class TestRecycling:
+    """Tests for RenderPool worker recycling (without starting processes)."""
+
+    @pytest.fixture
+    def pool(self, monkeypatch):
+        pool = renderpool.RenderPool(1, recycle_cycles=3, recycle_rss=1000)
+        created = []
+
+        def new_executor():
+            created.append(_FakeExecutor())
+            return created[-1], []
+        monkeypatch.setattr(pool, '_new_executor', new_executor)
+        pool.created = created
+        pool._ensure_executor()
+        return pool
+
+    def test_spare_started_a_cycle_early_then_swapped_in(self, pool):
+        first = pool._executor
+        pool._end_cycle()
+        assert pool._spare is None
+        pool._end_cycle()
+        spare = pool._spare[0]
+        pool._end_cycle()
+        assert pool._executor is spare
+        assert first.shut_down
+        assert pool.recycles == 1
+        assert len(pool.created) == 2
+
+    def test_rss_limit_recycles(self, pool):
+        first = pool._executor
+        pool._peak_rss = 850
+        pool._end_cycle()
+        assert pool._spare is not None
+        pool._peak_rss = 1200
+        pool._end_cycle()
+        assert pool._executor is not first
+        assert pool.recycles == 1
+        assert pool._peak_rss is None
+
+    def test_no_recycling_by_default(self, monkeypatch):
+        pool = renderpool.RenderPool(2)
+        monkeypatch.setattr(pool, '_new_executor', lambda: (_FakeExecutor(), []))
+        pool._ensure_executor()
+        for _ in range(10):
+            pool._end_cycle()
+        assert pool.recycles == 0 and pool._spare is None
@@ -0,0 +1,117 @@
+"""
+Tests for responsecache.py - the single-flight /api response cache.
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import responsecache
+
+
+class Token:
+    """A change token the test moves by hand."""
+
+    def __init__(self):
+        self.value = 1
+
+    def __call__(self):
+        return self.value
+
+
+class TestResponseCache:
+    """Tests for ResponseCache."""
+
+    def test_hit_until_token_moves(self):
+        token = Token()
+        cache = responsecache.ResponseCache(token)
+        bodies = iter([b'one', b'two'])
+        first = cache.get('radio', lambda: next(bodies), 60)
+        assert cache.get('radio', lambda: next(bodies), 60) is first
+        token.value = 2
+        second = cache.get('radio', lambda: next(bodies), 60)
+        assert second.body == b'two'
+        assert second.etag != first.etag
+        assert cache.stats == {'hits': 1, 'builds': 2, 'shared': 0}
+
+    def test_max_age(self):
+        cache = responsecache.ResponseCache(Token())
+        cache.get('radio', lambda: b'x', 0)
+        assert cache.get('radio', lambda: b'y', 0).body == b'y'
+        assert cache.stats['builds'] == 2
+
+    def test_unchanged_content_keeps_etag(self):
+        token = Token()
+        cache = responsecache.ResponseCache(token)
+        first = cache.get('radio', lambda: (b'{"r":1,"server_time":1}', b'{"r":1}'), 60)
+        etag, built = first.etag, first.built
+        token.value = 2
+        again = cache.get('radio', lambda: (b'{"r":1,"server_time":2}', b'{"r":1}'), 60)
+        assert again is first and again.etag == etag
+        assert again.body == b'{"r":1,"server_time":2}' and again.built >= built
+        assert again.token == 2
+        changed = cache.get('radio', lambda: (b'{"r":2,"server_time":3}', b'{"r":2}'), 0)
+        assert changed.etag != etag
+
+    def test_unreadable_token_never_hits(self):
+        cache = responsecache.ResponseCache(lambda: None)
+        cache.get('radio', lambda: b'x', 60)
+        cache.get('radio', lambda: b'x', 60)
+        assert cache.stats['builds'] == 2 and cache.stats['hits'] == 0
+
+    def test_single_flight(self):
+        cache = responsecache.ResponseCache(Token())
+        release = threading.Event()
+        calls = []
+
+        def build():
+            calls.append(1)
+            release.wait(5)
+            return b'body'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get('radio', build, 60)))
+                   for _ in range(5)]
+        for t in threads:
+            t.start()
+        deadline = time.time() + 5
+        while cache.stats['shared'] < 4 and time.time() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for t in threads:
+            t.join(5)
+        assert len(calls) == 1
+        assert len(results) == 5 and len({id(r) for r in results}) == 1
+
+    def test_failed_build_not_cached(self):
+        cache = responsecache.ResponseCache(Token())
+
+        def fail():
+            raise sqlite3.OperationalError('database is locked')
+
+        with pytest.raises(sqlite3.OperationalError):
+            cache.get('radio', fail, 60)
+        assert cache.get('radio', lambda: b'ok', 60).body == b'ok'
+
+
+class TestChangeToken:
+    """Tests for ChangeToken."""
+
+    def test_moves_on_commit_elsewhere(self, tmp_path):
+        path = str(tmp_path / 'token.db')
+        db = sqlite3.connect(path)
+        db.execute('CREATE TABLE t (v INTEGER)')
+        db.commit()
+        token = responsecache.ChangeToken(path)
+        before = token()
+        assert token() == before
+        db.execute('INSERT INTO t VALUES (1)')
+        db.commit()
+        assert token() != before
+        db.close()
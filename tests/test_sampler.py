@@ -0,0 +1,81 @@
+"""
+Tests for sampler.py - background status probes with their own timeouts.
+"""
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sampler
+
+
+def _inline(func, *args):
+    func(*args)
+
+
+class TestSampler:
+    """Tests for Sampler."""
+
+    def test_snapshot_before_and_after(self):
+        s = sampler.Sampler()
+        s.add('load', lambda: {'load': '0.1'}, 5, 1)
+        before = s.snapshot()['load']
+        assert before['value'] is None and before['age'] is None and before['stale']
+        assert s.run_due(_inline) == ['load']
+        after = s.snapshot()['load']
+        assert after['value'] == {'load': '0.1'}
+        assert after['age'] == 0 and after['error'] is None and not after['stale']
+
+    def test_each_probe_on_its_own_interval(self):
+        s = sampler.Sampler()
+        s.add('fast', lambda: 1, 0, 1)
+        s.add('slow', lambda: 2, 300, 1)
+        assert sorted(s.run_due(_inline)) == ['fast', 'slow']
+        assert s.run_due(_inline) == ['fast']
+
+    def test_failure_keeps_last_value(self):
+        s = sampler.Sampler()
+        calls = []
+
+        def probe():
+            calls.append(1)
+            if len(calls) > 1:
+                raise OSError('no answer')
+            return '192.0.2.1'
+        s.add('ip', probe, 0, 1)
+        s.run_due(_inline)
+        s.run_due(_inline)
+        entry = s.snapshot()['ip']
+        assert entry['value'] == '192.0.2.1'
+        assert entry['error'] == 'no answer' and entry['stale']
+
+    def test_slow_probe_times_out_without_blocking(self):
+        s = sampler.Sampler()
+        release = threading.Event()
+        s.add('hung', lambda: release.wait(5), 0, 0.05)
+        s.add('quick', lambda: 'ok', 0, 1)
+        s.start()
+        try:
+            time.sleep(0.2)
+            snap = s.snapshot()
+            assert snap['quick']['value'] == 'ok'
+            assert snap['hung']['error'] == 'timed out after 0.05s'
+            assert snap['hung']['stale']
+            assert s.run_due(_inline).count('hung') == 0  # never started twice
+        finally:
+            release.set()
+            s.stop()
+
+    def test_wait_ready(self):
+        s = sampler.Sampler()
+        s.add('a', lambda: 1, 5, 1)
+        s.add('b', lambda: 2, 5, 1)
+        s.start()
+        try:
+            assert s.wait_ready(2)
+            assert {n: e['value'] for n, e in s.snapshot().items()} == {'a': 1, 'b': 2}
+        finally:
+            s.stop()
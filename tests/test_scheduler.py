@@ -0,0 +1,139 @@
+"""
+Tests for scheduler.py - refresh policies and the render scheduler.
+"""
+import calendar
+import os
+import sys
+from collections import namedtuple
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scheduler
+from scheduler import RefreshPolicy, RenderScheduler
+
+Result = namedtuple('Result', 'name seconds error')
+
+# 2026-06-27 18:00:00 UTC (Field Day)
+NOW = calendar.timegm((2026, 6, 27, 18, 0, 0))
+
+
+class TestRefreshPolicy:
+    """Tests for RefreshPolicy.parse and is_due."""
+
+    def test_parse_every_with_priority(self):
+        policy = RefreshPolicy.parse('every 300, low')
+        assert (policy.when, policy.interval, policy.priority) == ('every', 300, 'low')
+
+    def test_parse_at_sorts_times(self):
+        policy = RefreshPolicy.parse('at 12:00 00:05')
+        assert policy.times == ((0, 5), (12, 0))
+
+    def test_parse_priority_only_keeps_default_when(self):
+        policy = RefreshPolicy.parse('high', RefreshPolicy('always'))
+        assert (policy.when, policy.priority) == ('always', 'high')
+
+    def test_empty_returns_default(self):
+        default = RefreshPolicy('always', priority='high')
+        assert RefreshPolicy.parse('', default) is default
+
+    @pytest.mark.parametrize('text', ['every', 'every -5', 'at 25:00', 'sometimes', 'change, urgent'])
+    def test_parse_errors(self, text):
+        with pytest.raises(ValueError):
+            RefreshPolicy.parse(text)
+
+    def test_every_is_due_after_interval(self):
+        policy = RefreshPolicy('every', interval=60)
+        assert policy.is_due(None, NOW)
+        assert not policy.is_due(NOW - 59, NOW)
+        assert policy.is_due(NOW - 60, NOW)
+
+    def test_at_is_due_once_per_slot(self):
+        policy = RefreshPolicy.parse('at 17:30')
+        assert policy.is_due(NOW - 3600, NOW)       # last ran 17:00, slot 17:30 passed
+        assert not policy.is_due(NOW - 600, NOW)    # last ran 17:50
+        assert policy.next_slot(NOW) == NOW + 86400 - 1800
+
+    def test_at_slot_from_previous_day(self):
+        policy = RefreshPolicy.parse('at 23:00')
+        assert policy.is_due(NOW - 86400, NOW)
+        assert not policy.is_due(NOW - 3600 * 18, NOW)
+
+
+class TestRenderScheduler:
+    """Tests for RenderScheduler offer/select/record."""
+
+    def test_interval_job_held_until_due(self):
+        sched = RenderScheduler()
+        sched.offer('map', 'job1', RefreshPolicy('every', interval=60))
+        assert sched.select(now=NOW) == ['job1']
+        sched.record([Result('map', 1.0, None)], now=NOW)
+        sched.offer('map', 'job2', RefreshPolicy('every', interval=60))
+        assert sched.select(now=NOW + 30) == []
+        assert sched.next_due(now=NOW + 30) == 30
+        # held job is still there, with the newest data, when it comes due
+        assert sched.select(now=NOW + 60) == ['job2']
+
+    def test_override_from_config(self):
+        sched = RenderScheduler({'yoy': 'at 00:05, low'})
+        sched.offer('yoy', 'job', RefreshPolicy('change'))
+        assert sched.select(now=NOW) == ['job']      # never rendered yet
+        sched.record([Result('yoy', 1.0, None)], now=NOW)
+        sched.offer('yoy', 'job', RefreshPolicy('change'))
+        assert sched.select(now=NOW + 60) == []
+
+    def test_off_never_renders(self):
+        sched = RenderScheduler({'rates': 'off'})
+        sched.offer('rates', 'job', RefreshPolicy('change'))
+        sched.offer('pie', 'job2', RefreshPolicy('off'))
+        assert sched.select(now=NOW) == []
+        assert sched.next_due(now=NOW) is None
+        # [RENDER SCHEDULE] can bring back a chart that is off by default
+        sched = RenderScheduler({'pie': 'change'})
+        assert sched.policy('pie', RefreshPolicy('off')).when == 'change'
+
+    def test_current_job_retired_without_rendering(self):
+        sched = RenderScheduler()
+        sched.offer('pie', 'job', RefreshPolicy('change'))
+        assert sched.select(now=NOW, is_current=lambda job: True) == []
+        assert sched.select(now=NOW) == []
+
+    def test_failed_job_retried(self):
+        sched = RenderScheduler()
+        sched.offer('pie', 'job', RefreshPolicy('change'))
+        sched.select(now=NOW)
+        sched.record([Result('pie', 1.0, 'boom')], now=NOW)
+        assert sched.select(now=NOW + 1) == ['job']
+
+    def test_budget_defers_low_priority(self, monkeypatch):
+        monkeypatch.setattr(scheduler, '_load_per_cpu', lambda: None)
+        sched = RenderScheduler(budget=5)
+        for name, priority in (('map', 'high'), ('pie', 'normal'), ('yoy', 'low')):
+            sched.offer(name, name, RefreshPolicy('change', priority=priority))
+        sched.select(now=NOW)
+        sched.record([Result('map', 4.0, None), Result('pie', 0.5, None), Result('yoy', 3.0, None)], now=NOW)
+
+        for name, priority in (('map', 'high'), ('pie', 'normal'), ('yoy', 'low')):
+            sched.offer(name, name, RefreshPolicy('change', priority=priority))
+        assert sched.select(now=NOW + 1) == ['map', 'pie']
+        # yoy waits, but not forever
+        for cycle in range(scheduler.MAX_DEFERRALS - 1):
+            sched.record([Result('map', 4.0, None), Result('pie', 0.5, None)], now=NOW + 2)
+            sched.offer('map', 'map', RefreshPolicy('change', priority='high'))
+            sched.offer('pie', 'pie', RefreshPolicy('change'))
+            assert 'yoy' not in sched.select(now=NOW + 3)
+        sched.offer('map', 'map', RefreshPolicy('change', priority='high'))
+        assert 'yoy' in sched.select(now=NOW + 4)
+
+    def test_budget_shrinks_under_load(self, monkeypatch):
+        monkeypatch.setattr(scheduler, '_load_per_cpu', lambda: 2.0)
+        sched = RenderScheduler(budget=4)
+        for name in ('a', 'b'):
+            sched.offer(name, name, RefreshPolicy('change'))
+        sched.select(now=NOW)
+        sched.record([Result('a', 1.5, None), Result('b', 1.5, None)], now=NOW)
+        for name in ('a', 'b'):
+            sched.offer(name, name, RefreshPolicy('change'))
+        assert sched.select(now=NOW + 1) == ['a']
@@ -0,0 +1,69 @@
+"""
+Tests for servicestatus.py - one cached systemctl call for many units.
+"""
+import os
+import subprocess
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import servicestatus
+
+
+class _Systemctl:
+    """Stands in for subprocess.run, answering `systemctl is-active`."""
+
+    def __init__(self, stdout='', stderr=''):
+        self.stdout, self.stderr = stdout, stderr
+        self.calls = []
+
+    def __call__(self, cmd, **kwargs):
+        self.calls.append(cmd)
+        return subprocess.CompletedProcess(cmd, 3, self.stdout, self.stderr)
+
+
+class TestIsActive:
+    """Tests for is_active."""
+
+    def test_one_call_for_all_units(self, monkeypatch):
+        fake = _Systemctl('active\ninactive\nfailed\n')
+        monkeypatch.setattr(servicestatus.subprocess, 'run', fake)
+        states = servicestatus.is_active(['a', 'b', 'c'])
+        assert states == {'a': 'active', 'b': 'inactive', 'c': 'failed'}
+        assert fake.calls == [['systemctl', 'is-active', 'a', 'b', 'c']]
+
+    def test_no_systemd(self, monkeypatch):
+        fake = _Systemctl(stderr='System has not been booted with systemd\n')
+        monkeypatch.setattr(servicestatus.subprocess, 'run', fake)
+        assert servicestatus.is_active(['a', 'b']) == {
+            'a': 'System has not been booted with systemd',
+            'b': 'System has not been booted with systemd'}
+
+    def test_missing_systemctl(self, monkeypatch):
+        def run(cmd, **kwargs):
+            raise FileNotFoundError('systemctl')
+        monkeypatch.setattr(servicestatus.subprocess, 'run', run)
+        assert servicestatus.is_active(['a']) == {'a': 'error: systemctl'}
+
+
+class TestServiceStatus:
+    """Tests for ServiceStatus."""
+
+    def test_cached_for_ttl(self, monkeypatch):
+        fake = _Systemctl('active\nactive\n')
+        monkeypatch.setattr(servicestatus.subprocess, 'run', fake)
+        status = servicestatus.ServiceStatus(['a', 'b'], ttl=60)
+        assert status.age() is None
+        for _ in range(5):
+            assert status.get() == {'a': 'active', 'b': 'active'}
+        assert len(fake.calls) == 1
+        assert status.age() < 60
+
+    def test_expired(self, monkeypatch):
+        fake = _Systemctl('active\n')
+        monkeypatch.setattr(servicestatus.subprocess, 'run', fake)
+        status = servicestatus.ServiceStatus(['a'], ttl=0)
+        status.get()
+        status.get()
+        assert len(fake.calls) == 2
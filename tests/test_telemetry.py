@@ -0,0 +1,90 @@
+"""
+Tests for telemetry.py - per-cycle render stats and the rolling stats file.
+"""
+import json
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import renderpool
+import telemetry
+
+
+def get_things(cursor):
+    return cursor * 2
+
+
+class TestPercentile:
+    """Tests for percentile()."""
+
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        assert telemetry.percentile(values, 50) == 50
+        assert telemetry.percentile(values, 95) == 95
+        assert telemetry.percentile([3.0], 95) == 3.0
+
+    def test_empty(self):
+        assert telemetry.percentile([], 50) is None
+
+
+class TestCycleStats:
+    """Tests for CycleStats."""
+
+    def test_timed_query_named_after_function(self):
+        stats = telemetry.CycleStats()
+        assert stats.timed(get_things, 21) == 42
+        record = stats.finish()
+        assert 'get_things' in record['queries']
+        assert record['gc_objects'] > 0
+        assert len(record['gc_counts']) == 3
+
+    def test_chart_results(self):
+        stats = telemetry.CycleStats()
+        stats.add_results([renderpool.ChartResult('pie', 0.5, None, 0.3, 0.2, 1000),
+                           renderpool.ChartResult('map', 0.0, 'render worker died')])
+        charts = stats.finish()['charts']
+        assert charts['pie'] == {'seconds': 0.5, 'build': 0.3, 'encode': 0.2, 'error': None, 'rss': 1000}
+        assert charts['map']['build'] is None
+        assert charts['map']['error'] == 'render worker died'
+
+    def test_rss_reported(self):
+        rss = telemetry.rss_bytes()
+        assert rss is None or rss > 0
+
+
+class TestStatsFile:
+    """Tests for StatsFile and summarize()."""
+
+    def _cycle(self, seconds, chart_seconds, error=None):
+        return {'seconds': seconds, 'rss': 100 + seconds,
+                'charts': {'pie': {'seconds': chart_seconds, 'build': chart_seconds, 'encode': None,
+                                   'error': error}},
+                'queries': {'get_things': 0.01}}
+
+    def test_rolling_window_and_summary(self, tmp_path):
+        path = tmp_path / telemetry.STATS_FILENAME
+        stats = telemetry.StatsFile(str(path), keep=3)
+        for i in range(5):
+            stats.add(self._cycle(i, i / 10, error='boom' if i == 4 else None))
+        data = json.loads(path.read_text())
+        assert [c['seconds'] for c in data['cycles']] == [2, 3, 4]
+        pie = data['summary']['charts']['pie']
+        assert pie['seconds'] == {'p50': 0.3, 'p95': 0.4, 'n': 3}
+        assert pie['encode']['n'] == 0
+        assert pie['failures'] == 1
+        assert data['summary']['rss'] == {'first': 102, 'last': 104, 'max': 104}
+
+    def test_reloaded_after_restart(self, tmp_path):
+        path = str(tmp_path / telemetry.STATS_FILENAME)
+        telemetry.StatsFile(path).add(self._cycle(1, 0.1))
+        stats = telemetry.StatsFile(path)
+        stats.add(self._cycle(2, 0.2))
+        assert len(telemetry.read_stats(str(tmp_path))['cycles']) == 2
+
+    def test_unreadable_file_ignored(self, tmp_path):
+        path = tmp_path / telemetry.STATS_FILENAME
+        path.write_text('{not json')
+        assert telemetry.StatsFile(str(path)).cycles == []
+        assert telemetry.read_stats(str(tmp_path)) is None
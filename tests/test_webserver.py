@@ -0,0 +1,123 @@
+"""
+Tests for webserver.py - the /api routes and IMAGE_DIR serving.
+"""
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dataaccess
+import webserver
+from tests.test_dataaccess import MockOperators, MockStations
+
+
+def _add_qso(conn, call, stamp):
+    cursor = conn.cursor()
+    dataaccess.record_contact(
+        conn, cursor, MockOperators(conn, cursor), MockStations(conn, cursor),
+        timestamp=time.strptime(stamp, '%Y-%m-%d %H:%M:%S'), mycall='W1AW', band='14', mode='CW',
+        operator='OP1', station='Station1', rx_freq=0, tx_freq=0, callsign=call,
+        rst_sent='599', rst_recv='599', exchange='2A', section='CT', comment='', qso_id='qso-' + call,
+        state='CT')
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A database file with one QSO, and a webserver using it with an empty cache."""
+    path = str(tmp_path / 'n1mm_view.db')
+    conn = sqlite3.connect(path)
+    dataaccess.create_tables(conn, conn.cursor())
+    _add_qso(conn, 'K1ABC', '2024-06-22 18:00:00')
+    monkeypatch.setattr(webserver.config, 'DATABASE_FILENAME', path)
+    monkeypatch.setattr(webserver, '_response_cache', None)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def client():
+    return webserver.app.test_client()
+
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'chart' * 50
+
+
+@pytest.fixture
+def image_dir(tmp_path, monkeypatch):
+    """IMAGE_DIR with one chart in it."""
+    directory = tmp_path / 'images'
+    directory.mkdir()
+    (directory / 'qso_rates.png').write_bytes(PNG)
+    monkeypatch.setattr(webserver.config, 'IMAGE_DIR', str(directory))
+    monkeypatch.setattr(webserver.config, 'STATIC_MAX_AGE', 0)
+    return directory
+
+
+class TestDashboard:
+    """Tests for /api/dashboard."""
+
+    def test_all_sections_with_data(self, db, client):
+        sections = client.get('/api/dashboard').get_json()['sections']
+        assert sorted(sections) == ['last_qso', 'new_ops', 'radio', 'summary']
+        assert all(s['version'] and 'data' in s for s in sections.values())
+        assert sections['last_qso']['data']['last_qso']['callsign'] == 'K1ABC'
+
+    def test_unchanged_version_has_no_data(self, db, client):
+        first = client.get('/api/dashboard').get_json()['sections']
+        webserver._get_response_cache().clear()  # as if every entry had expired
+        query = '&'.join('%s=%s' % (name, s['version']) for name, s in first.items())
+        again = client.get('/api/dashboard?' + query).get_json()['sections']
+        assert {name: s['version'] for name, s in again.items()} == \
+            {name: s['version'] for name, s in first.items()}
+        assert not any('data' in s for s in again.values())
+
+    def test_changed_version_has_data(self, db, client):
+        held = client.get('/api/dashboard?last_qso=').get_json()['sections']['last_qso']['version']
+        _add_qso(db, 'W2DEF', '2024-06-22 18:05:00')
+        section = client.get('/api/dashboard?last_qso=' + held).get_json()['sections']['last_qso']
+        assert section['version'] != held
+        assert section['data']['last_qso']['callsign'] == 'W2DEF'
+
+    def test_subset(self, db, client):
+        body = client.get('/api/dashboard?radio=&summary=').get_json()
+        assert sorted(body['sections']) == ['radio', 'summary']
+        assert body['server_time'] > 0
+
+
+class TestApiPayload:
+    """Tests for the single /api routes."""
+
+    def test_304_survives_a_rebuild(self, db, client):
+        etag = client.get('/api/last_qso').headers['ETag']
+        webserver._get_response_cache().clear()
+        assert client.get('/api/last_qso', headers={'If-None-Match': etag}).status_code == 304
+
+
+class TestServe:
+    """Tests for IMAGE_DIR files."""
+
+    def test_matching_version_immutable(self, image_dir, client):
+        version = hashlib.sha1(PNG).hexdigest()[:12]
+        r = client.get('/qso_rates.png?v=' + version)
+        assert r.cache_control.max_age == webserver.HASHED_MAX_AGE
+        assert r.cache_control.immutable
+
+    def test_stale_version_not_pinned(self, image_dir, client):
+        r = client.get('/qso_rates.png?v=0123456789ab')
+        assert r.data == PNG
+        assert r.cache_control.max_age == 0
+        assert not r.cache_control.immutable
+
+    def test_dotfiles_hidden(self, image_dir, client):
+        (image_dir / '.render_stats.json').write_text('{"summary": {}}')
+        (image_dir / 'sub').mkdir()
+        (image_dir / 'sub' / '.publish_state.json').write_text('{}')
+        assert client.get('/.render_stats.json').status_code == 404
+        assert client.get('/sub/.publish_state.json').status_code == 404
+        assert client.get('/api/render_stats').get_json() == {'summary': {}}
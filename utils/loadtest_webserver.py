@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+loadtest_webserver.py - simulated kiosks against a running n1mm_view webserver.
+
+Each kiosk is a thread holding one keep-alive HTTP connection, doing what
+index.html does: ask /api/dashboard for the sidebar sections (sending back the
+versions it holds) and fetch the next chart PNG of the slideshow, over and
+over. At the end it prints requests per second and latency percentiles per
+kind of request, so the development server and SERVER = gunicorn (see the
+[WEBSERVER] section of n1mm_view.ini) can be compared on the same Pi:
+
+    # 50 kiosks, as fast as they can go, for 30 seconds
+    python3 loadtest_webserver.py --host 127.0.0.1 --port 8080
+
+    # realistic pacing: a request every 2 seconds per kiosk
+    python3 loadtest_webserver.py --kiosks 50 --interval 2
+
+The chart list comes from the served index.html. Uses the standard library
+only, so it runs anywhere that can reach the Pi.
+"""
+import argparse
+import http.client
+import json
+import re
+import sys
+import threading
+import time
+import urllib.parse
+
+SECTIONS = ['radio', 'last_qso', 'summary', 'new_ops']
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers, or None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def chart_paths(host, port):
+    """The PNGs index.html shows, as paths on the server."""
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    conn.request('GET', '/index.html')
+    resp = conn.getresponse()
+    page = resp.read().decode('utf-8', 'replace')
+    if resp.status != 200:
+        sys.exit('GET /index.html: HTTP %d' % resp.status)
+    paths = []
+    for path in sorted(set(re.findall(r'src="([^"?#]+\.png)', page))):
+        if '://' in path:
+            continue
+        path = '/' + path.lstrip('/')
+        conn.request('HEAD', path)
+        resp = conn.getresponse()
+        resp.read()
+        if resp.status == 200:
+            paths.append(path)
+        else:
+            print('skipping %s (HTTP %d, not rendered yet?)' % (path, resp.status))
+    conn.close()
+    return paths
+
+
+class Kiosk(threading.Thread):
+    def __init__(self, host, port, charts, interval, stop):
+        super().__init__(daemon=True)
+        self.host, self.port = host, port
+        self.charts = charts
+        self.interval = interval
+        self.stop = stop
+        self.held = {}
+        self.latency = {'api': [], 'png': []}
+        self.bytes = 0
+        self.errors = 0
+
+    def _get(self, conn, path):
+        conn.request('GET', path)
+        resp = conn.getresponse()
+        body = resp.read()
+        if resp.status != 200:
+            raise http.client.HTTPException('%s: HTTP %d' % (path, resp.status))
+        self.bytes += len(body)
+        return body
+
+    def run(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        n = 0
+        while not self.stop.is_set():
+            if self.charts and n % 2:
+                kind, path = 'png', self.charts[(n // 2) % len(self.charts)]
+            else:
+                kind = 'api'
+                path = '/api/dashboard?' + urllib.parse.urlencode(
+                    [(name, self.held.get(name, '')) for name in SECTIONS])
+            n += 1
+            start = time.perf_counter()
+            try:
+                body = self._get(conn, path)
+                self.latency[kind].append(time.perf_counter() - start)
+                if kind == 'api':
+                    for name, section in json.loads(body)['sections'].items():
+                        self.held[name] = section['version']
+            except (OSError, http.client.HTTPException, ValueError, KeyError):
+                self.errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            if self.interval:
+                self.stop.wait(self.interval)
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--kiosks', type=int, default=50)
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--interval', type=float, default=0,
+                        help='pause between one kiosk\'s requests (default: none)')
+    args = parser.parse_args()
+
+    charts = chart_paths(args.host, args.port)
+    stop = threading.Event()
+    kiosks = [Kiosk(args.host, args.port, charts, args.interval, stop) for _ in range(args.kiosks)]
+    start = time.perf_counter()
+    for k in kiosks:
+        k.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for k in kiosks:
+        k.join(35)
+    elapsed = time.perf_counter() - start
+
+    print('%d kiosks, %.1fs, %d charts' % (args.kiosks, elapsed, len(charts)))
+    total = 0
+    for kind in ('api', 'png'):
+        values = [v for k in kiosks for v in k.latency[kind]]
+        total += len(values)
+        if not values:
+            continue
+        print('  %-4s %6d requests %7.1f req/s   p50 %6.1f ms  p90 %6.1f ms  p99 %6.1f ms  max %6.1f ms' % (
+            kind, len(values), len(values) / elapsed,
+            1000 * percentile(values, 50), 1000 * percentile(values, 90),
+            1000 * percentile(values, 99), 1000 * max(values)))
+    print('  all  %6d requests %7.1f req/s   %.1f MB/s   %d errors' % (
+        total, total / elapsed, sum(k.bytes for k in kiosks) / elapsed / 1e6,
+        sum(k.errors for k in kiosks)))
+
+
+if __name__ == '__main__':
+    main()
@@ -11,34 +11,51 @@ Routes:
     GET  /                          -> IMAGE_DIR/index.html
     GET  /<path>                    -> static file from IMAGE_DIR
     GET  /api/radio                 -> JSON list of radio_info rows
+    GET  /api/dashboard?radio=<v>   -> radio/last_qso/summary/new_ops in one, less those held
+    GET  /api/stream?topics=a,b     -> SSE push of /api/<topic> on change (apistream.py)
+    GET  /api/chart/<name>          -> data behind one chart (apidata.CHARTS)
+    GET  /charts                    -> those charts drawn in the browser
     GET  /api/health                -> {"ok": true, ...}
+    GET  /api/compression           -> bytes saved by gzip/brotli, per endpoint
     GET  /admin                     -> status + admin actions page
     POST /admin/action/purge-stale  -> purge radio_info older than RADIO_HIDE_SECONDS
     POST /admin/action/clear-all    -> wipe radio_info table
     POST /admin/action/regenerate-index -> rewrite IMAGE_DIR/index.html
 
 The rsync workflow (POST_FILE_COMMAND in [HEADLESS INFO]) is unaffected.
-Remote copies that don't have this server still get the radio_info.png
-sidebar; the index.html falls back to the PNG when /api/radio is unreachable.
+Remote copies that don't have this server read the api_*.json snapshots
+headless writes (see apidata.py) when /api/... is unreachable, and fall back
+to the radio_info.png sidebar when those are missing too.
 """
 
 import base64
+import hashlib
 import json
 import logging
+import mimetypes
 import os
 import re
 import sqlite3
-import subprocess
+import stat
 import sys
+import threading
 import time
 import urllib.parse
 from datetime import datetime, timezone
 
-from flask import Flask, Response, jsonify, redirect, render_template_string, request, send_from_directory, abort
+from flask import Flask, Response, jsonify, redirect, render_template_string, request, send_file, abort
+from werkzeug.security import safe_join
 
 from config import Config, VERSION
-import constants
+import apidata
+import apistream
+import compression
 import dataaccess
+import imagewriter
+import publisher
+import responsecache
+import servicestatus
+import telemetry
 
 __author__ = 'Tom Schaefer NY4I'
 __copyright__ = 'Copyright 2026 Thomas M. Schaefer'
@@ -56,6 +73,23 @@ logging.getLogger('werkzeug').setLevel(
 
 app = Flask(__name__)
 
+# gzip/brotli for the HTML and JSON responses (COMPRESS); see compression.py.
+compressor = compression.Compressor(min_size=config.COMPRESS_MIN_SIZE)
+if config.COMPRESS:
+    compressor.init_app(app)
+
+# Requests served since startup, in /api/health for the hub's request-rate history.
+_requests_served = 0
+_requests_lock = threading.Lock()
+
+
+@app.before_request
+def _count_request():
+    global _requests_served
+    with _requests_lock:
+        _requests_served += 1
+
+
 SERVICES = [
     'n1mm_view_collector',
     'n1mm_view_headless',
@@ -63,10 +97,18 @@ SERVICES = [
     'n1mm_view_webserver',
 ]
 
-# A radio whose last_update is older than this is considered stale: the
-# dashboard greys it out and it no longer participates in duplicate detection.
-# Matches the 60s dim threshold used by headless.py and graphics.draw_radio_info.
-STALE_SECONDS = 60
+# Longest a cached /api/chart/<name> body is served while the database is
+# unchanged (the rate chart's current hour still fills up with time).
+CHART_CACHE_SECONDS = 30
+# Longest the admin page's database figures are reused while it is unchanged.
+ADMIN_CACHE_SECONDS = 300
+
+# Files _serve lets browsers reuse for STATIC_MAX_AGE seconds.
+IMAGE_SUFFIXES = ('.png', '.jpg', '.jpeg', '.gif', '.svg')
+
+# Cache lifetime of an image requested by content hash (?v=, see
+# publisher.ImageManifest): a year, the longest browsers honour.
+HASHED_MAX_AGE = 365 * 24 * 3600
 
 CONFIG_KEYS = [
     'DATABASE_FILENAME', 'IMAGE_DIR', 'EVENT_NAME',
@@ -94,193 +136,154 @@ def _query_radio_info():
         db.close()
 
 
-def _annotate_radios(radios):
-    """Add band, mode_group, source and a duplicate band/mode flag to each radio.
+_response_cache = None
 
-    Two or more radios sharing the same band + simple mode group (CW/PHONE/DATA)
-    are flagged dup=True so the dashboard can alert -- at Field Day that means two
-    transmitters in one category (a rule violation), and it also surfaces a
-    station-name collision.
-    """
-    now = int(time.time())
-    for r in radios:
-        r['band'] = constants.Bands.freq_to_band(r.get('freq'))
-        r['mode_group'] = constants.Modes.get_simple_mode_name(r.get('mode') or '')
-        r['source'] = r.get('source') or 'radioinfo'
-        # Out of band: outside every ham band, or PHONE below the phone sub-band
-        # edge. Flag it so it's obvious (it's also excluded from dup matching).
-        r['offband'] = constants.Bands.is_out_of_band(r.get('freq'), r['mode_group'])
-    # Only live (non-stale) radios participate in collision detection. Stale rows
-    # are the greyed-out leftovers of stations that have gone away; counting them
-    # would falsely flag a live radio as a DUP of an old, idle one. Use the same
-    # 60s staleness window the renderer uses to grey a row out.
-    def _live(r):
-        return (now - (r.get('last_update') or now)) <= STALE_SECONDS
-    counts = {}
-    for r in radios:
-        if _live(r) and r['band'] and r['mode_group'] not in (None, 'N/A'):
-            counts[(r['band'], r['mode_group'])] = counts.get((r['band'], r['mode_group']), 0) + 1
-    for r in radios:
-        key = (r['band'], r['mode_group'])
-        r['dup'] = bool(_live(r) and r['band'] and r['mode_group'] not in (None, 'N/A')
-                        and counts.get(key, 0) > 1)
-    return radios
+
+def _get_response_cache():
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = responsecache.ResponseCache(responsecache.ChangeToken(config.DATABASE_FILENAME))
+    return _response_cache
+
+
+def _cached_payload(name, build):
+    """The responsecache.Entry for an apidata payload builder, built against
+    the live database at most once per change. A cached body is reused for
+    at most the interval the pages poll it at (apistream.topic_intervals),
+    charts for CHART_CACHE_SECONDS. The ETag covers the payload without its
+    server_time, so it only changes when the data does."""
+    def encode():
+        db = sqlite3.connect(config.DATABASE_FILENAME)
+        try:
+            payload = build(db.cursor())
+        finally:
+            db.close()
+        content = apidata.encode({k: v for k, v in payload.items() if k != 'server_time'})
+        return apidata.encode(payload), content
+    max_age = apistream.topic_intervals().get(name, CHART_CACHE_SECONDS)
+    return _get_response_cache().get(name, encode, max_age)
+
+
+def _api_payload(name, build):
+    """Serve an apidata payload builder's JSON from the response cache, or an
+    empty 304 when the client already has it."""
+    entry = _cached_payload(name, build)
+    response = Response(entry.body, mimetype='application/json')
+    # weak: the body's server_time may differ under one ETag
+    response.set_etag(entry.etag, weak=True)
+    return response.make_conditional(request)
 
 
 @app.route('/api/radio')
 def api_radio():
-    radios = _query_radio_info()
-    now = int(time.time())
-    hide = getattr(config, 'RADIO_HIDE_SECONDS', 0)
-    if hide and hide > 0:
-        radios = [r for r in radios if (now - r['last_update']) <= hide]
-    radios = _annotate_radios(radios)
-    return jsonify({
-        'server_time': now,
-        'radios': radios,
-    })
+    return _api_payload('radio', apidata.radio)
 
 
 @app.route('/api/new_ops')
 def api_new_ops():
-    """
-    Return this event's operators flagged as "new" (name not in
-    PRIOR_DB_FILENAME's operator table), plus a summary count and the
-    prior event's total operator count. Each new-op entry includes the
-    timestamp/band/mode/callsign of their first event QSO.
-    """
-    import constants
-    db = sqlite3.connect(config.DATABASE_FILENAME)
-    try:
-        cursor = db.cursor()
-        cur_first = dataaccess.get_operator_first_qsos(cursor)
-    finally:
-        db.close()
-    prior_names = dataaccess.get_prior_operators_from_consolidated_db(
-        getattr(config, 'PRIOR_OPERATORS_DB', ''))
-    # "Last event" count for the sidebar is PRIOR_DB_FILENAME only (the chosen
-    # reference event), NOT the union across every imported prior year.
-    last_event_names, _, _ = dataaccess.get_prior_operator_names(config.PRIOR_DB_FILENAME)
-    if not prior_names:
-        prior_names = last_event_names
-    new_ops = []
-    for r in cur_first:
-        if r['name'].strip().lower() in prior_names:
-            continue
-        bid = r.get('band_id') or 0
-        mid = r.get('mode_id') or 0
-        band = (constants.Bands.BANDS_TITLE[bid]
-                if 0 <= bid < constants.Bands.count() else '')
-        mode = (constants.Modes.SIMPLE_MODES_LIST[constants.Modes.MODE_TO_SIMPLE_MODE[mid]]
-                if 0 <= mid < len(constants.Modes.MODE_TO_SIMPLE_MODE) else '')
-        new_ops.append({
-            'name': r['name'],
-            'first_ts': r['first_ts'],
-            'band': band,
-            'mode': mode,
-            'worked': r.get('worked') or '',
-        })
-    # prior_new = the prior reference event's *new*-operator count (year-over-year),
-    # so "N new this event" compares against new-vs-new (e.g. 2025 FD had 7 new,
-    # not its 25 total). Pulled from the same YoY computation the chart uses.
-    prior_new = None
-    try:
-        yoy = dataaccess.get_yoy_new_op_counts(
-            getattr(config, 'PRIOR_OPERATORS_DB', ''),
-            event_label_regex=getattr(config, 'YOY_EVENT_REGEX', None))
-        if yoy:
-            prior_new = yoy[-1][3]  # most recent prior event's new_ops
-    except Exception:
-        prior_new = None
-    return jsonify({
-        'server_time': int(time.time()),
-        'event_name': config.EVENT_NAME,
-        'prior_event_label': getattr(config, 'PRIOR_EVENT_LABEL', ''),
-        # prior_total = last reference event's TOTAL ops (e.g. 2025 FD = 25);
-        # prior_new   = that event's NEW ops year-over-year (e.g. 7);
-        # all_prior_total = union across every imported prior event (e.g. 75).
-        'prior_total': len(last_event_names) if last_event_names else None,
-        'prior_new': prior_new,
-        'all_prior_total': len(prior_names) if prior_names else None,
-        'total_ops': len(cur_first),
-        'total_new': len(new_ops),
-        'new_ops': new_ops,
-    })
+    """This event's new operators; see apidata.new_ops."""
+    return _api_payload('new_ops', apidata.new_ops)
 
 
 @app.route('/api/last_qso')
 def api_last_qso():
-    """Return the most recent QSO (callsign, band, mode, operator, etc.) so
-    the dashboard header can show it without waiting for headless to re-render."""
-    import constants
-    db = sqlite3.connect(config.DATABASE_FILENAME)
-    try:
-        cursor = db.cursor()
-        ts, message = dataaccess.get_last_qso(cursor)
-        cursor.execute(
-            'SELECT timestamp, callsign, exchange, section, operator.name, '
-            '       band_id, mode_id, station.name '
-            'FROM qso_log JOIN operator ON operator.id = operator_id '
-            'JOIN station ON station.id = station_id '
-            'ORDER BY timestamp DESC LIMIT 1;')
-        row = cursor.fetchone()
-    finally:
-        db.close()
-    if not row:
-        return jsonify({'server_time': int(time.time()), 'last_qso': None})
-    band = (constants.Bands.BANDS_TITLE[row[5]]
-            if 0 <= row[5] < constants.Bands.count() else '')
-    mode = (constants.Modes.SIMPLE_MODES_LIST[constants.Modes.MODE_TO_SIMPLE_MODE[row[6]]]
-            if 0 <= row[6] < len(constants.Modes.MODE_TO_SIMPLE_MODE) else '')
-    return jsonify({
-        'server_time': int(time.time()),
-        'last_qso': {
-            'timestamp': row[0],
-            'callsign': row[1],
-            'exchange': row[2],
-            'section': row[3],
-            'operator': row[4],
-            'band_id': row[5],
-            'band': band,
-            'mode_id': row[6],
-            'mode': mode,
-            'station': row[7],
-            'message': message,
-        },
-    })
+    """The most recent QSO, for the dashboard header; see apidata.last_qso."""
+    return _api_payload('last_qso', apidata.last_qso)
 
 
 @app.route('/api/summary')
 def api_summary():
-    """Band x mode QSO counts (CW / Phone / Data / Total) plus grand totals --
-    the 'QSOs Summary' grid, as JSON for the mobile view."""
-    import constants
-    db = sqlite3.connect(config.DATABASE_FILENAME)
-    try:
-        cursor = db.cursor()
-        grid = dataaccess.get_qso_band_modes(cursor)  # [band_id][0=n/a,1=cw,2=phone,3=data]
-    finally:
-        db.close()
-    bands = []
-    tot = [0, 0, 0]  # cw, phone, data
-    for bid, row in enumerate(grid):
-        if bid == 0:  # 'No Band' / N/A -- skip
-            continue
-        cw, phone, data = row[1], row[2], row[3]
-        if (cw + phone + data) == 0:
-            continue  # omit bands with no QSOs to keep the phone list short
-        bands.append({
-            'band': constants.Bands.BANDS_TITLE[bid],
-            'cw': cw, 'phone': phone, 'data': data,
-            'total': cw + phone + data,
-        })
-        tot[0] += cw; tot[1] += phone; tot[2] += data
-    return jsonify({
-        'server_time': int(time.time()),
-        'bands': bands,
-        'totals': {'cw': tot[0], 'phone': tot[1], 'data': tot[2],
-                   'total': tot[0] + tot[1] + tot[2]},
-    })
+    """Band x mode QSO counts for the mobile view; see apidata.summary."""
+    return _api_payload('summary', apidata.summary)
+
+
+@app.route('/api/dashboard')
+def api_dashboard():
+    """radio, last_qso, summary and new_ops in one response, for pages that
+    would otherwise poll each of them. Name the sections wanted as query
+    parameters whose value is the version already held, empty for none (no
+    parameters at all asks for every section). Each section comes back with
+    its version (its /api ETag, which moves only when the data does, not with
+    server_time), and with its data only if that differs:
+
+        {"sections": {"radio": {"version": "...", "data": {...}},
+                      "summary": {"version": "..."}},
+         "server_time": ...}
+    """
+    wanted = [name for name in apidata.PAYLOADS if name in request.args] or list(apidata.PAYLOADS)
+    parts = []
+    for name in wanted:
+        entry = _cached_payload(name, apidata.PAYLOADS[name])
+        part = b'"%s":{"version":"%s"' % (name.encode('ascii'), entry.etag.encode('ascii'))
+        if request.args.get(name) != entry.etag:
+            part += b',"data":' + entry.body
+        parts.append(part + b'}')
+    body = b'{"sections":{%s},"server_time":%d}' % (b','.join(parts), int(time.time()))
+    return Response(body, mimetype='application/json')
+
+
+_broadcaster = None
+
+
+def _get_broadcaster():
+    global _broadcaster
+    if _broadcaster is None:
+        _broadcaster = apistream.Broadcaster(config.DATABASE_FILENAME,
+                                             max_clients=config.API_STREAM_MAX_CLIENTS)
+    return _broadcaster
+
+
+@app.route('/api/stream')
+def api_stream():
+    """Server-Sent Events carrying the named /api payloads whenever they
+    change, built once for every client; see apistream.py. 404 with
+    API_STREAM off and 503 past API_STREAM_MAX_CLIENTS, so browsers go on
+    polling."""
+    if not config.API_STREAM:
+        abort(404)
+    topics = request.args.get('topics', 'radio,last_qso').split(',')
+    broadcaster = _get_broadcaster()
+    sub = broadcaster.subscribe(topics)
+    if sub is None:
+        abort(503, description='too many stream clients')
+    response = Response(broadcaster.stream(sub), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # nginx and friends would otherwise hold the events back in a buffer
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@app.route('/api/charts')
+def api_charts():
+    """Names of the charts /api/chart/<name> serves for this configuration."""
+    return jsonify({'server_time': int(time.time()), 'charts': apidata.enabled_charts()})
+
+
+@app.route('/api/chart/<name>')
+def api_chart(name):
+    """The data behind one chart; see apidata.CHARTS."""
+    build = apidata.CHARTS.get(name)
+    if build is None:
+        abort(404)
+    return _api_payload('chart/' + name, build)
+
+
+@app.route('/api/compression')
+def api_compression():
+    """Bytes saved by response compression so far, per endpoint."""
+    return jsonify({'server_time': int(time.time()), 'enabled': config.COMPRESS,
+                    'endpoints': compressor.stats()})
+
+
+@app.route('/api/render_stats')
+def api_render_stats():
+    """headless's rolling render stats (telemetry.STATS_FILENAME), which the
+    admin page summarises; 404 until headless has written them."""
+    image_dir = config.IMAGE_DIR
+    stats = telemetry.read_stats(image_dir) if image_dir and image_dir != 'None' else None
+    if stats is None:
+        abort(404)
+    return jsonify(stats)
 
 
 @app.route('/api/health')
@@ -289,6 +292,7 @@ def api_health():
         'ok': True,
         'version': VERSION,
         'image_dir': config.IMAGE_DIR,
+        'requests': _requests_served,
         'server_time': int(time.time()),
     })
 
@@ -309,45 +313,52 @@ def kiosk_ping():
 # Admin page
 # ---------------------------------------------------------------------------
 
-def _service_status(unit):
-    """Return ('active'|'inactive'|'failed'|..., css_class)."""
-    try:
-        r = subprocess.run(
-            ['systemctl', 'is-active', unit],
-            capture_output=True, text=True, timeout=3)
-        status = (r.stdout or r.stderr).strip() or 'unknown'
-    except Exception as e:
-        status = 'error: %s' % e
-    cls = {
-        'active': 'svc-active',
-        'inactive': 'svc-inactive',
-        'failed': 'svc-failed',
-        'activating': 'svc-pending',
-        'deactivating': 'svc-pending',
-    }.get(status, 'svc-unknown')
-    return status, cls
+# systemd states of SERVICES: one systemctl call for all of them, at most
+# every SERVICE_STATUS_SECONDS however often /admin is loaded.
+SERVICE_STATUS_SECONDS = 5
+_service_states = servicestatus.ServiceStatus(SERVICES, ttl=SERVICE_STATUS_SECONDS)
+
+_SERVICE_CLASSES = {
+    'active': 'svc-active',
+    'inactive': 'svc-inactive',
+    'failed': 'svc-failed',
+    'activating': 'svc-pending',
+    'deactivating': 'svc-pending',
+}
+
+
+def _service_status():
+    """[{unit, status, cls}] for SERVICES; status is 'active'|'inactive'|..."""
+    states = _service_states.get()
+    return [{'unit': unit, 'status': states[unit], 'cls': _SERVICE_CLASSES.get(states[unit], 'svc-unknown')}
+            for unit in SERVICES]
 
 
 def _db_stats():
-    out = {'qso_count': 0, 'last_qso': '—', 'radio_count': 0, 'error': None}
-    try:
-        db = sqlite3.connect(config.DATABASE_FILENAME)
+    """QSO and radio counts and the last QSO, queried once per database
+    change (the admin actions and the collector both move the change token)."""
+    def build():
+        out = {'qso_count': 0, 'last_qso': '—', 'radio_count': 0, 'error': None}
         try:
-            cursor = db.cursor()
-            cursor.execute('SELECT COUNT(*) FROM qso_log;')
-            out['qso_count'] = cursor.fetchone()[0]
-            cursor.execute('SELECT COUNT(*) FROM radio_info;')
-            out['radio_count'] = cursor.fetchone()[0]
-            cursor.execute('SELECT timestamp, callsign FROM qso_log ORDER BY timestamp DESC LIMIT 1;')
-            row = cursor.fetchone()
-            if row:
-                ts = datetime.fromtimestamp(row[0], tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
-                out['last_qso'] = '%s (%s)' % (row[1], ts)
-        finally:
-            db.close()
-    except Exception as e:
-        out['error'] = str(e)
-    return out
+            db = sqlite3.connect(config.DATABASE_FILENAME)
+            try:
+                cursor = db.cursor()
+                cursor.execute('SELECT COUNT(*) FROM qso_log;')
+                out['qso_count'] = cursor.fetchone()[0]
+                cursor.execute('SELECT COUNT(*) FROM radio_info;')
+                out['radio_count'] = cursor.fetchone()[0]
+                cursor.execute('SELECT timestamp, callsign FROM qso_log ORDER BY timestamp DESC LIMIT 1;')
+                row = cursor.fetchone()
+                if row:
+                    ts = datetime.fromtimestamp(row[0], tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
+                    out['last_qso'] = '%s (%s)' % (row[1], ts)
+            finally:
+                db.close()
+        except Exception as e:
+            out['error'] = str(e)
+        return apidata.encode(out)
+    # nothing here moves with the clock, so only a change rebuilds it
+    return json.loads(_get_response_cache().get('admin/db', build, ADMIN_CACHE_SECONDS).body)
 
 
 def _format_freq(hz):
@@ -403,6 +414,43 @@ def _config_snapshot():
     return out
 
 
+def _ms(seconds):
+    return '-' if seconds is None else '%.0f' % (seconds * 1000)
+
+
+def _render_stats_for_admin():
+    """Per-chart p50/p95 from headless's rolling stats file, or None."""
+    image_dir = config.IMAGE_DIR
+    if not image_dir or image_dir == 'None':
+        return None
+    stats = telemetry.read_stats(image_dir)
+    if not stats or 'summary' not in stats:
+        return None
+    summary = stats['summary']
+    charts = []
+    for name, c in summary.get('charts', {}).items():
+        charts.append({
+            'name': name,
+            'runs': c['seconds']['n'],
+            'p50': _ms(c['seconds']['p50']), 'p95': _ms(c['seconds']['p95']),
+            'build_p50': _ms(c['build']['p50']), 'build_p95': _ms(c['build']['p95']),
+            'encode_p50': _ms(c['encode']['p50']), 'encode_p95': _ms(c['encode']['p95']),
+            'failures': c.get('failures', 0),
+        })
+    charts.sort(key=lambda c: -float(c['p95']) if c['p95'] != '-' else 0)
+    rss = summary.get('rss') or {}
+    cycles = summary.get('cycles', {})
+    return {
+        'charts': charts,
+        'cycles': cycles.get('n', 0),
+        'cycle_p50': _ms(cycles.get('p50')),
+        'cycle_p95': _ms(cycles.get('p95')),
+        'rss_last': '%.0f MB' % (rss['last'] / 1e6) if rss.get('last') else '-',
+        'rss_max': '%.0f MB' % (rss['max'] / 1e6) if rss.get('max') else '-',
+        'age': int(time.time() - stats.get('updated', time.time())),
+    }
+
+
 ADMIN_TEMPLATE = '''<!DOCTYPE html>
 <html lang="en">
 <head>
@@ -546,6 +594,32 @@ ADMIN_TEMPLATE = '''<!DOCTYPE html>
   {% endif %}
 </section>
 
+{% if render_stats %}
+<section class="wide" style="margin-top:1rem;">
+  <h2>Headless render times (last {{ render_stats.cycles }} cycles, updated {{ render_stats.age }}s ago)</h2>
+  <p style="font-size:0.8rem; color:#a0a0b8; margin-bottom:0.4rem;">
+    cycle p50 {{ render_stats.cycle_p50 }} ms, p95 {{ render_stats.cycle_p95 }} ms &mdash;
+    headless RSS {{ render_stats.rss_last }} (max {{ render_stats.rss_max }}) &mdash;
+    <a href="/api/render_stats" style="color:#6fd0ff;">raw stats</a>
+  </p>
+  <table>
+    <thead><tr>
+      <th>Chart</th><th>Runs</th><th>p50 ms</th><th>p95 ms</th>
+      <th>build p50/p95</th><th>encode p50/p95</th><th>Failures</th>
+    </tr></thead>
+    <tbody>
+    {% for c in render_stats.charts %}
+      <tr>
+        <td><code>{{ c.name }}</code></td><td>{{ c.runs }}</td><td>{{ c.p50 }}</td><td>{{ c.p95 }}</td>
+        <td>{{ c.build_p50 }} / {{ c.build_p95 }}</td><td>{{ c.encode_p50 }} / {{ c.encode_p95 }}</td>
+        <td class="{% if c.failures %}svc-failed{% endif %}">{{ c.failures }}</td>
+      </tr>
+    {% endfor %}
+    </tbody>
+  </table>
+</section>
+{% endif %}
+
 <section class="wide" style="margin-top:1rem;">
   <h2>Effective config</h2>
   <table>
@@ -564,17 +638,14 @@ ADMIN_TEMPLATE = '''<!DOCTYPE html>
 
 
 def _render_admin(flash=None, flash_error=False):
-    services = []
-    for unit in SERVICES:
-        status, cls = _service_status(unit)
-        services.append({'unit': unit, 'status': status, 'cls': cls})
     return render_template_string(
         ADMIN_TEMPLATE,
         version=VERSION,
-        services=services,
+        services=_service_status(),
         db=_db_stats(),
         db_file=config.DATABASE_FILENAME,
         radios=_radio_rows_for_admin(),
+        render_stats=_render_stats_for_admin(),
         config_snapshot=_config_snapshot(),
         hide_secs=getattr(config, 'RADIO_HIDE_SECONDS', 0),
         flash=flash,
@@ -722,6 +793,8 @@ MOBILE_HTML = r"""<!DOCTYPE html>
   tfoot td { font-weight: 700; border-top: 2px solid var(--line); color: var(--yellow); }
   td.tot, th.tot { color: var(--text); font-weight: 700; }
   .muted { color: var(--muted); }
+  .chart { display: block; width: 100%; height: auto; margin-top: 0.5rem; border-radius: 6px; }
+  .chart:first-child { margin-top: 0; }
   .newops-list { margin-top: 0.5rem; }
   .newops-list div { font-size: 0.9rem; padding: 0.2rem 0;
                      display: flex; justify-content: space-between; }
@@ -762,6 +835,12 @@ MOBILE_HTML = r"""<!DOCTYPE html>
     <div id="newops"><span class="muted">Loading…</span></div>
   </section>
 
+  <section id="charts-section">
+    <h2>Charts</h2>
+    <div id="charts"></div>
+  </section>
+
+  <a class="big-link" href="/charts">All charts ›</a>
   <a class="big-link" href="/?big=1">Switch to full dashboard view ›</a>
   <footer><span id="dot" class="dot">●</span> updated <span id="updated">—</span>
           · v<span id="ver">—</span></footer>
@@ -772,6 +851,7 @@ const EVENT = __EVENT_JSON__;
 let skew = 0;            // serverTime - clientTime, in seconds
 let lastQso = null;      // remembered for per-second "ago" updates
 let lastOk = 0;          // client time of last successful load
+let streamOpen = false;  // /api/stream is pushing updates; polling stands down
 
 function nowSec() { return Date.now() / 1000 + skew; }
 function pad(n) { return String(n).padStart(2, '0'); }
@@ -898,6 +978,16 @@ function renderSummary(d) {
     '</td><td>' + t.data + '</td><td>' + t.total + '</td></tr></tfoot></table>';
 }
 
+// Chart PNGs at a phone-sized variant (IMAGE_VARIANTS); re-fetched each minute.
+function renderCharts() {
+  const box = document.getElementById('charts');
+  const t = Date.now();
+  box.innerHTML = EVENT.charts.map(c =>
+    '<img class="chart" alt="' + esc(c.title) + '" src="' + c.src + '?t=' + t + '" srcset="' +
+    c.srcset.split(', ').map(e => e.replace(' ', '?t=' + t + ' ')).join(', ') + '" sizes="' + c.sizes + '">'
+  ).join('');
+}
+
 function renderNewOps(d) {
   const el = document.getElementById('newops');
   if (!d) { el.innerHTML = '<span class="muted">—</span>'; return; }
@@ -922,35 +1012,78 @@ async function getJSON(url) {
   return r.json();
 }
 
+function markUpdated() {
+  lastOk = Date.now() / 1000;
+  const dt = new Date(nowSec() * 1000);
+  document.getElementById('updated').textContent =
+    pad(dt.getHours()) + ':' + pad(dt.getMinutes()) + ':' + pad(dt.getSeconds());
+  document.getElementById('dot').className = 'dot';
+}
+
+// Every section in one /api/dashboard request that names the version held
+// of each; the server leaves out the data of those that haven't changed.
+const held = {};         // section -> {version, data}
+
 async function load() {
+  if (streamOpen) return;
   try {
-    const reqs = [
-      getJSON('/api/last_qso'), getJSON('/api/radio'), getJSON('/api/summary'),
-    ];
-    if (EVENT.show_newops) reqs.push(getJSON('/api/new_ops'));
-    const [lq, radio, summary, newops] = await Promise.all(reqs);
-    if (lq && lq.server_time) skew = lq.server_time - Date.now() / 1000;
-    renderLastQso(lq); renderRadios(radio);
-    renderSummary(summary);
-    if (EVENT.show_newops) renderNewOps(newops);
-    lastOk = Date.now() / 1000;
-    const dt = new Date(nowSec() * 1000);
-    document.getElementById('updated').textContent =
-      pad(dt.getHours()) + ':' + pad(dt.getMinutes()) + ':' + pad(dt.getSeconds());
-    document.getElementById('dot').className = 'dot';
+    const sections = ['last_qso', 'radio', 'summary'];
+    if (EVENT.show_newops) sections.push('new_ops');
+    const bundle = await getJSON('/api/dashboard?' + sections.map(name =>
+      name + '=' + encodeURIComponent(held[name] ? held[name].version : '')).join('&'));
+    for (const name of sections) {
+      const s = bundle.sections[name];
+      if (s && s.data) held[name] = { version: s.version, data: s.data };
+    }
+    const data = name => held[name] ? held[name].data : null;
+    if (bundle.server_time) skew = bundle.server_time - Date.now() / 1000;
+    renderLastQso(data('last_qso')); renderRadios(data('radio'));
+    renderSummary(data('summary'));
+    if (EVENT.show_newops) renderNewOps(data('new_ops'));
+    markUpdated();
   } catch (e) {
     document.getElementById('dot').className = 'dot stale';
   }
 }
 
+// One EventSource instead of four polls (API_STREAM): each section is pushed
+// when it changes. load() takes over while it is down; the browser reconnects
+// it by itself unless the server refused it outright.
+function startStream() {
+  if (!EVENT.stream || typeof EventSource === 'undefined') return;
+  const renders = { last_qso: renderLastQso, radio: renderRadios, summary: renderSummary };
+  if (EVENT.show_newops) renders.new_ops = renderNewOps;
+  const src = new EventSource('/api/stream?topics=' + Object.keys(renders).join(','));
+  src.onopen = () => { streamOpen = true; };
+  src.onerror = () => {
+    streamOpen = false;
+    document.getElementById('dot').className = 'dot stale';
+  };
+  Object.keys(renders).forEach(name => src.addEventListener(name, e => {
+    let d;
+    try { d = JSON.parse(e.data); } catch (err) { return; }
+    streamOpen = true;
+    if (d.server_time) skew = d.server_time - Date.now() / 1000;
+    renders[name](d);
+    markUpdated();
+  }));
+}
+
 document.getElementById('event').textContent = EVENT.name || 'n1mm_view';
 document.getElementById('ver').textContent = EVENT.version || '';
 if (!EVENT.show_newops) {
   const ns = document.getElementById('newops-section');
   if (ns) ns.remove();
 }
+if (EVENT.charts.length) {
+  renderCharts();
+  setInterval(renderCharts, 60000);
+} else {
+  document.getElementById('charts-section').remove();
+}
 tick();
 load();
+startStream();
 setInterval(tick, 1000);
 setInterval(load, 10000);
 // Refresh promptly when the phone wakes / tab refocuses.
@@ -1067,6 +1200,227 @@ KIOSK_HTML = r"""<!DOCTYPE html>
 """
 
 
+# Charts drawn in the browser from /api/chart/<name> (see apidata.CHARTS), so
+# a deployment that only needs web views can leave them out of headless
+# (BROWSER_CHARTS). ?chart=<name> shows one chart, ?embed=1 drops the page
+# chrome (index.html's iframe slides), ?rotate=<secs> shows one chart at a
+# time full screen for a kiosk.
+CHARTS_HTML = r"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1, viewport-fit=cover">
+<meta name="color-scheme" content="dark">
+<title>n1mm_view charts</title>
+<style>
+  :root {
+    --bg: #0a1626; --card: #13233b; --line: #243a5a;
+    --text: #d7e0ec; --muted: #8493ab; --pink: #e94560; --yellow: #ffd24a;
+  }
+  * { box-sizing: border-box; }
+  body { margin: 0; background: var(--bg); color: var(--text);
+    font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif; }
+  header { text-align: center; padding: 0.75rem 0 0.25rem; }
+  header h1 { color: var(--pink); font-size: 1.15rem; margin: 0; }
+  .grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(min(100%, 560px), 1fr));
+    gap: 0.75rem; padding: 0.75rem; max-width: 1800px; margin: 0 auto; }
+  section { background: var(--card); border: 1px solid var(--line); border-radius: 10px;
+    padding: 0.75rem 0.85rem; min-width: 0; }
+  section h2 { color: var(--yellow); font-size: 0.8rem; letter-spacing: 0.08em;
+    text-transform: uppercase; margin: 0 0 0.55rem; font-weight: 700; }
+  svg { width: 100%; height: auto; display: block; }
+  svg text { fill: var(--text); font-size: 15px; }
+  svg .muted { fill: var(--muted); }
+  svg .axis { stroke: var(--line); }
+  .empty { color: var(--muted); padding: 2rem 0; text-align: center; }
+  .links { text-align: center; padding: 0 0 1.5rem; }
+  .links a { color: #6fd0ff; text-decoration: none; margin: 0 0.75rem; }
+  body.embed { background: transparent; }
+  body.embed header, body.embed .links, body.embed section h2 { display: none; }
+  body.embed .grid { padding: 0; display: block; }
+  body.embed section { background: transparent; border: 0; padding: 0; }
+  body.rotate .grid { display: block; padding: 1rem 2rem; height: calc(100vh - 3rem); }
+  body.rotate section { display: none; height: 100%; }
+  body.rotate section.active { display: flex; flex-direction: column; }
+  body.rotate section h2 { font-size: 1.2rem; }
+  body.rotate section .chart { flex: 1; min-height: 0; }
+  body.rotate svg { height: 100%; }
+  body.rotate .links { display: none; }
+</style>
+</head>
+<body>
+<header><h1 id="event"></h1></header>
+<div class="grid" id="grid"></div>
+<div class="links"><a href="/m">Mobile view</a><a href="/?big=1">Full dashboard</a></div>
+<script>
+const CHARTS = __CHARTS_JSON__;
+const EVENT_NAME = __EVENT_NAME_JSON__;
+const params = new URLSearchParams(location.search);
+const only = params.get('chart');
+const rotateSecs = parseInt(params.get('rotate') || '0', 10);
+const names = only ? CHARTS.filter(n => n === only) : CHARTS;
+const PALETTE = ['#6fd0ff', '#43e08a', '#ffd24a', '#e94560', '#b388ff', '#ff9f43',
+                 '#4dd0e1', '#f06292', '#aed581', '#90a4ae'];
+const REFRESH_MS = 30000;
+
+function esc(s) { return String(s == null ? '' : s).replace(/[&<>"]/g,
+  c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'}[c])); }
+function pad(n) { return String(n).padStart(2, '0'); }
+function svg(w, h, body) {
+  return '<svg viewBox="0 0 ' + w + ' ' + h + '" preserveAspectRatio="xMidYMid meet">' + body + '</svg>';
+}
+function legend(series, y) {
+  let x = 10, out = '';
+  series.forEach((s, i) => {
+    out += '<rect x="' + x + '" y="' + (y - 11) + '" width="12" height="12" fill="' +
+      PALETTE[i % PALETTE.length] + '"/><text x="' + (x + 17) + '" y="' + y + '">' + esc(s.name) + '</text>';
+    x += 30 + 9 * String(s.name).length;
+  });
+  return out;
+}
+
+// Horizontal bars, one row per label; "stacked" stacks the series in a row.
+function barChart(d) {
+  const n = d.labels.length;
+  if (!n) return '<div class="empty">No QSOs yet</div>';
+  const multi = d.series.length > 1;
+  const totals = d.labels.map((_, i) => d.series.reduce((t, s) => t + (s.values[i] || 0), 0));
+  const max = Math.max(1, ...totals);
+  const W = 800, rowH = n > 20 ? 20 : 30, top = multi ? 30 : 6, labelW = 190, barW = W - labelW - 70;
+  let out = multi ? legend(d.series, 18) : '';
+  d.labels.forEach((label, i) => {
+    const y = top + i * rowH;
+    let x = labelW;
+    out += '<text x="' + (labelW - 8) + '" y="' + (y + rowH * 0.68) + '" text-anchor="end">' + esc(label) + '</text>';
+    d.series.forEach((s, j) => {
+      const v = s.values[i] || 0;
+      if (!v) return;
+      const w = v / max * barW;
+      out += '<rect x="' + x.toFixed(1) + '" y="' + (y + 3) + '" width="' + w.toFixed(1) + '" height="' +
+        (rowH - 6) + '" fill="' + PALETTE[(multi ? j : i) % PALETTE.length] + '"><title>' +
+        esc(label + (multi ? ' ' + s.name : '') + ': ' + v) + '</title></rect>';
+      x += w;
+    });
+    out += '<text class="muted" x="' + (x + 6).toFixed(1) + '" y="' + (y + rowH * 0.68) + '">' + totals[i] + '</text>';
+  });
+  return svg(W, top + n * rowH + 6, out);
+}
+
+// One line per series over time; labels are epoch seconds (UTC).
+function lineChart(d) {
+  const n = d.labels.length;
+  if (!n || !d.series.length) return '<div class="empty">No QSOs yet</div>';
+  const W = 800, H = 430, L = 50, R = 15, T = 34, B = 34;
+  const t0 = d.labels[0], t1 = Math.max(d.labels[n - 1], t0 + 1);
+  const max = Math.max(1, ...d.series.map(s => Math.max(...s.values)));
+  const X = t => L + (t - t0) / (t1 - t0) * (W - L - R);
+  const Y = v => H - B - v / max * (H - T - B);
+  let out = legend(d.series, 18);
+  for (let k = 0; k <= 4; k++) {
+    const v = max * k / 4, y = Y(v).toFixed(1);
+    out += '<line class="axis" x1="' + L + '" x2="' + (W - R) + '" y1="' + y + '" y2="' + y + '"/>' +
+      '<text class="muted" x="' + (L - 6) + '" y="' + (+y + 5) + '" text-anchor="end">' + Math.round(v) + '</text>';
+  }
+  for (let k = 0; k <= 5; k++) {
+    const t = t0 + (t1 - t0) * k / 5, dt = new Date(t * 1000);
+    out += '<text class="muted" x="' + X(t).toFixed(1) + '" y="' + (H - 10) + '" text-anchor="middle">' +
+      pad(dt.getUTCHours()) + ':' + pad(dt.getUTCMinutes()) + 'Z</text>';
+  }
+  d.series.forEach((s, i) => {
+    const pts = s.values.map((v, j) => X(d.labels[j]).toFixed(1) + ',' + Y(v).toFixed(1)).join(' ');
+    out += '<polyline fill="none" stroke-width="2.5" stroke="' + PALETTE[i % PALETTE.length] +
+      '" points="' + pts + '"><title>' + esc(s.name) + '</title></polyline>';
+  });
+  return svg(W, H, out);
+}
+
+function progressChart(d) {
+  const W = 800, H = 150;
+  const pct = d.total ? d.worked / d.total : 0;
+  let text = d.worked + (d.total ? '/' + d.total : '') + ' ' + esc(String(d.mult_name || '').toLowerCase()) + ' worked';
+  if (d.total) text += ' (' + Math.round(pct * 100) + '%)';
+  let out = '<text x="400" y="40" text-anchor="middle" style="font-size:26px">' + text + '</text>';
+  if (d.total) {
+    out += '<rect x="50" y="65" width="700" height="40" rx="6" fill="#243a5a"/>' +
+      '<rect x="50" y="65" width="' + (700 * pct).toFixed(1) + '" height="40" rx="6" fill="#43e08a"/>' +
+      '<text class="muted" x="400" y="135" text-anchor="middle">' + (d.total - d.worked) + ' remaining</text>';
+  }
+  return svg(W, H, out);
+}
+
+const RENDER = { bar: barChart, stacked: barChart, line: lineChart, progress: progressChart };
+
+async function load(name) {
+  try {
+    const r = await fetch('/api/chart/' + name, { cache: 'no-store' });
+    if (!r.ok) throw new Error(r.status);
+    const d = await r.json();
+    const sec = document.getElementById('chart-' + name);
+    sec.querySelector('h2').textContent = d.title;
+    sec.querySelector('.chart').innerHTML = (RENDER[d.type] || barChart)(d);
+  } catch (e) { /* keep the last drawing */ }
+}
+
+document.getElementById('event').textContent = EVENT_NAME;
+document.title = (EVENT_NAME ? EVENT_NAME + ' ' : '') + 'charts';
+if (params.get('embed')) document.body.classList.add('embed');
+document.getElementById('grid').innerHTML = names.map(n =>
+  '<section id="chart-' + n + '"><h2>&nbsp;</h2><div class="chart"><div class="empty">Loading…</div></div></section>').join('');
+
+if (rotateSecs > 0 && names.length) {
+  // Kiosk: one chart at a time; refresh each just before it is shown.
+  document.body.classList.add('rotate');
+  const sections = document.querySelectorAll('section');
+  let cur = 0;
+  const show = () => {
+    sections.forEach((s, i) => s.classList.toggle('active', i === cur));
+    load(names[(cur + 1) % names.length]);
+  };
+  load(names[0]);
+  show();
+  setInterval(() => { cur = (cur + 1) % names.length; show(); }, rotateSecs * 1000);
+} else {
+  const loadAll = () => names.forEach(load);
+  loadAll();
+  setInterval(loadAll, REFRESH_MS);
+  document.addEventListener('visibilitychange', () => { if (!document.hidden) loadAll(); });
+}
+</script>
+</body>
+</html>
+"""
+
+
+# Width of headless's chart PNGs (headless.CHART_SIZE; not imported here
+# because headless pulls in matplotlib).
+CHART_WIDTH = 1280
+
+# Charts the mobile page shows when IMAGE_VARIANTS are written.
+MOBILE_CHARTS = [
+    ('Sections Worked', 'sections_worked_map.png'),
+    ('QSO Rate Over Time', 'qso_rates_graph.png'),
+    ('QSOs by Band', 'qso_bands_graph.png'),
+]
+
+
+def _mobile_charts():
+    """The mobile page's chart images, offering only the downscaled variants
+    so a phone never pulls a full-size PNG; [] when none are written."""
+    variants = sorted(getattr(config, 'IMAGE_VARIANTS', []), key=lambda v: -imagewriter.VARIANTS[v])
+    if not variants:
+        return []
+    charts = []
+    for title, src in MOBILE_CHARTS:
+        files = [(imagewriter.variant_filename(src, v), CHART_WIDTH // imagewriter.VARIANTS[v]) for v in variants]
+        charts.append({
+            'title': title,
+            'src': files[0][0],
+            'srcset': ', '.join('%s %dw' % f for f in files),
+            'sizes': '(max-width: 640px) 95vw, 610px',
+        })
+    return charts
+
+
 def _event_meta():
     def epoch(dt):
         if not dt:
@@ -1083,6 +1437,8 @@ def _event_meta():
         # Mobile only shows the New Operators roster when that feature is on,
         # matching the full dashboard's SHOW_NEW_OPS_ROSTER toggle.
         'show_newops': bool(getattr(config, 'SHOW_NEW_OPS_ROSTER', False)),
+        'charts': _mobile_charts(),
+        'stream': bool(config.API_STREAM),
     }
 
 
@@ -1095,6 +1451,12 @@ def mobile_page():
     return _render_mobile()
 
 
+@app.route('/charts')
+def charts_page():
+    return (CHARTS_HTML.replace('__CHARTS_JSON__', json.dumps(apidata.enabled_charts()))
+            .replace('__EVENT_NAME_JSON__', json.dumps(config.EVENT_NAME)))
+
+
 @app.route('/kiosk')
 def kiosk_page():
     # Served by the pi itself -> same-origin base ('') for the iframe and ping.
@@ -1114,19 +1476,93 @@ def static_file(filename):
     return _serve(filename)
 
 
+# path -> ((size, mtime_ns), etag) of the files _serve has sent
+_content_etags = {}
+
+
+def _content_etag(path, st):
+    """A strong ETag from path's content, hashed again only when its size or
+    mtime changes: a chart headless rewrites with the same pixels keeps its
+    ETag, so browsers revalidating it get a 304."""
+    key = (st.st_size, st.st_mtime_ns)
+    cached = _content_etags.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    digest = hashlib.sha1()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(65536), b''):
+            digest.update(chunk)
+    etag = digest.hexdigest()[:20]
+    _content_etags[path] = (key, etag)
+    return etag
+
+
+def _precompressed(path, st):
+    """(path, encoding) of the .br or .gz copy of path headless wrote
+    (PRECOMPRESS) that the client accepts, or (path, None). A copy older
+    than path is left over from before its last change and is ignored."""
+    for encoding, suffix in imagewriter.PRECOMPRESSED:
+        if not request.accept_encodings[encoding]:
+            continue
+        try:
+            if os.stat(path + suffix).st_mtime_ns >= st.st_mtime_ns:
+                return path + suffix, encoding
+        except OSError:
+            continue
+    return path, None
+
+
 def _serve(filename):
     image_dir = config.IMAGE_DIR
     if not image_dir or image_dir == 'None':
         abort(500, description='IMAGE_DIR is not configured')
-    full = os.path.join(image_dir, filename)
-    if not os.path.exists(full):
+    if any(part.startswith('.') for part in filename.replace('\\', '/').split('/')):
+        # headless's own state (.render_stats.json, .chart_fingerprints.json,
+        # .publish_state.json) is not for the public; see /api/render_stats
+        abort(404)
+    path = safe_join(image_dir, filename)
+    if path is None:
         abort(404)
-    return send_from_directory(image_dir, filename)
+    try:
+        st = os.stat(path)
+    except OSError:
+        abort(404)
+    if not stat.S_ISREG(st.st_mode):
+        abort(404)
+    etag = _content_etag(path, st)
+    version = request.args.get('v', '')
+    if len(version) >= publisher.MANIFEST_HASH_LENGTH and etag.startswith(version):
+        # A content-hashed URL from headless's manifest.json that matches
+        # these bytes: a new image gets a new ?v=, so what is behind this one
+        # never changes. A stale or raced ?v= gets the ordinary lifetime.
+        max_age = HASHED_MAX_AGE
+    elif filename.lower().endswith(IMAGE_SUFFIXES):
+        max_age = config.STATIC_MAX_AGE
+    else:
+        max_age = 0  # index.html, JSON: revalidated every time
+    served, encoding = _precompressed(path, st)
+    if encoding:
+        etag += '-' + encoding  # other bytes, so another strong ETag
+    # Validated against If-None-Match / If-Modified-Since (304); under
+    # gunicorn (SERVER = gunicorn) the body goes out with sendfile().
+    response = send_file(served, mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                         max_age=max_age, etag=etag, last_modified=st.st_mtime, conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if not filename.lower().endswith(IMAGE_SUFFIXES):
+        response.vary.add('Accept-Encoding')
+    if max_age == HASHED_MAX_AGE:
+        response.cache_control.immutable = True
+    return response
 
 
 @app.after_request
 def _no_cache_api(response):
-    if response.mimetype == 'application/json' or response.mimetype == 'text/html':
+    if response.mimetype in ('application/json', 'text/html') and response.headers.get('ETag'):
+        # cached /api responses and IMAGE_DIR files: the browser may keep
+        # them, but must revalidate (If-None-Match -> 304) every time
+        response.headers['Cache-Control'] = 'no-cache'
+    elif response.mimetype == 'application/json' or response.mimetype == 'text/html':
         response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
         response.headers['Pragma'] = 'no-cache'
         response.headers['Expires'] = '0'
@@ -1148,8 +1584,55 @@ def main():
     port = config.WEBSERVER_PORT
     logger.info('Starting n1mm_view web server v%s on %s:%d serving %s',
                 VERSION, bind, port, image_dir)
+    if config.WEBSERVER_SERVER == 'gunicorn' and _run_gunicorn(bind, port):
+        return
     app.run(host=bind, port=port, threaded=True, use_reloader=False)
 
 
+def _run_gunicorn(bind, port):
+    """Serve app with gunicorn's threaded worker: keep-alive connections wait
+    in one selector instead of a thread each, at most WEBSERVER_THREADS
+    requests run at once, and static files go out with sendfile(). One
+    worker process, so the response cache and the /api/stream broadcaster
+    are shared by every client. Returns False if gunicorn isn't installed."""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        logger.error('SERVER = gunicorn but gunicorn is not installed '
+                     '(apt install python3-gunicorn); using the development server')
+        return False
+
+    threads = config.WEBSERVER_THREADS
+    # every open /api/stream holds a thread; keep some for everything else
+    stream_cap = max(1, threads - max(4, threads // 4))
+    if config.API_STREAM and config.API_STREAM_MAX_CLIENTS > stream_cap:
+        logger.info('API_STREAM_MAX_CLIENTS %d lowered to %d to leave %d of THREADS free',
+                    config.API_STREAM_MAX_CLIENTS, stream_cap, threads - stream_cap)
+        config.API_STREAM_MAX_CLIENTS = stream_cap
+    options = {
+        'bind': '%s:%d' % (bind, port),
+        'workers': 1,
+        'worker_class': 'gthread',
+        'threads': threads,
+        'worker_connections': config.WEBSERVER_MAX_CONNECTIONS,
+        'keepalive': config.WEBSERVER_KEEPALIVE,
+        'sendfile': True,
+        'graceful_timeout': 5,
+    }
+
+    class GunicornServer(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    logger.info('gunicorn: %d threads, %d connections, keep-alive %ds',
+                threads, options['worker_connections'], options['keepalive'])
+    GunicornServer().run()
+    return True
+
+
 if __name__ == '__main__':
     main()